@@ -9,7 +9,7 @@ import sys
 from cobib import commands, zsh_helper
 from cobib import __version__
 from cobib.config import config
-from cobib.database import read_database
+from cobib.database import backend, read_database
 from cobib.logging import log_to_stream, log_to_file
 from cobib.tui import tui
 
@@ -67,6 +67,18 @@ def main():
         subcmd.execute(args.args)
         return
 
+    if args.command == 'show':
+        # a single entry can be looked up without reading the entire database
+        subcmd = getattr(commands, 'ShowCommand')()
+        subcmd.execute(args.args)
+        return
+
+    if args.command in ('list', 'export') and backend().indexed:
+        # only the entries matching the filter are read (see `cobib.database.select`)
+        subcmd = getattr(commands, args.command.title()+'Command')()
+        subcmd.execute(args.args)
+        return
+
     read_database()
     if not args.command:
         if args.logfile is None:
@@ -2,12 +2,14 @@
 
 import argparse
 import logging
+import re
 import sys
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 from cobib.config import config
 from cobib.database import read_database, write_database
-from cobib.parser import Entry
+from cobib.parser import ARXIV_REGEX, DOI_REGEX, ISBN_REGEX, Entry, stream_bibtex
 from .base_command import ArgumentParser, Command
 from .edit import EditCommand
 
@@ -19,6 +21,9 @@ class AddCommand(Command):
 
     name = 'add'
 
+    # the number of entries which are imported at once from a BibLaTeX file
+    CHUNK_SIZE = 1000
+
     def execute(self, args, out=sys.stdout):
         """Add new entry.
 
@@ -41,6 +46,11 @@ class AddCommand(Command):
                                help="DOI of the new references")
         group_add.add_argument("-i", "--isbn", type=str,
                                help="ISBN of the new references")
+        group_add.add_argument("-y", "--yaml", type=argparse.FileType('r'),
+                               help="YAML bibliographic data (as exported by `export --yaml`)")
+        group_add.add_argument("--bulk", type=argparse.FileType('r'),
+                               help="file listing one DOI, arXiv ID or ISBN per line ('-' reads "
+                               "from stdin)")
         parser.add_argument("tags", nargs=argparse.REMAINDER,
                             help="A list of space-separated tags to associate with this entry." +
                             "\nYou can use quotes to specify tags with spaces in them.")
@@ -54,6 +64,16 @@ class AddCommand(Command):
             print("{}: {}".format(exc.argument_name, exc.message), file=sys.stderr)
             return
 
+        if largs.bulk is not None:
+            self._add_bulk(largs)
+            return
+
+        if largs.bibtex is not None and largs.label is None and largs.file is None \
+                and largs.tags == []:
+            # the new entries need not be modified: import them chunk by chunk
+            self._add_bibtex(largs)
+            return
+
         new_entries = OrderedDict()
 
         edit_entries = False
@@ -69,6 +89,9 @@ class AddCommand(Command):
         elif largs.isbn is not None:
             LOGGER.debug("Adding entries from ISBN '%s'.", largs.isbn)
             new_entries = Entry.from_isbn(largs.isbn)
+        elif largs.yaml is not None:
+            LOGGER.debug("Adding entries from YAML '%s'.", largs.yaml)
+            new_entries = Entry.from_yaml(largs.yaml.read(), string=True)
         elif largs.label is not None:
             LOGGER.warning("No input to parse. Creating new entry '%s' manually.", largs.label)
             new_entries = {
@@ -113,6 +136,36 @@ class AddCommand(Command):
                 read_database()
                 EditCommand().execute([largs.label])
 
+        self._report(new_entries, largs)
+
+    def _add_bulk(self, largs):
+        """Adds the entries of the identifiers listed in the `--bulk` file.
+
+        Args:
+            largs (argparse.Namespace): the parsed arguments.
+        """
+        if largs.label is not None or largs.file is not None or largs.tags != []:
+            msg = "A label, files or tags cannot be specified when adding entries in bulk."
+            LOGGER.error(msg)
+            print(msg, file=sys.stderr)
+            return
+        self._report(self.import_identifiers(largs.bulk), largs)
+
+    def _add_bibtex(self, largs):
+        """Adds the unmodified entries of the `--bibtex` file chunk by chunk.
+
+        Args:
+            largs (argparse.Namespace): the parsed arguments.
+        """
+        self._report(self.import_bibtex(largs.bibtex), largs)
+
+    def _report(self, new_entries, largs):
+        """Commits and reports the entries which have been added to the database.
+
+        Args:
+            new_entries (list): the labels of the added entries.
+            largs (argparse.Namespace): the parsed arguments.
+        """
         self.git(args=vars(largs))
 
         for label in new_entries:
@@ -120,6 +173,134 @@ class AddCommand(Command):
             print(msg)
             LOGGER.info(msg)
 
+    def import_bibtex(self, file):
+        """Imports all entries from a BibLaTeX file.
+
+        The file is parsed and written to the database in chunks of `CHUNK_SIZE` entries such that
+        the memory usage remains bounded even for very large files. Entries whose label already
+        exists in the database (or earlier on in the file) are skipped.
+
+        Args:
+            file (file): the BibLaTeX file object.
+
+        Returns:
+            A list of the labels of the entries which have been added to the database.
+        """
+        LOGGER.debug("Importing entries from BibLaTeX '%s'.", file)
+        # the TUI redirects sys.stderr into a buffer which is no terminal
+        progress = hasattr(sys.stderr, 'isatty') and sys.stderr.isatty()
+        known = set(config.bibliography.keys())
+        new_entries = []
+        for chunk in stream_bibtex(file, self.CHUNK_SIZE):
+            entries = OrderedDict()
+            for label, entry in chunk.items():
+                if label in known:
+                    LOGGER.warning("Label %s already exists! Ignoring the new version.", label)
+                    continue
+                known.add(label)
+                entries[label] = entry
+            new_entries.extend(write_database(entries))
+            LOGGER.info('Imported %d entries so far.', len(new_entries))
+            if progress:
+                print(f"\rImported {len(new_entries)} entries...", end='', file=sys.stderr)
+        if progress:
+            print(file=sys.stderr)
+        return new_entries
+
+    def import_identifiers(self, file):
+        """Imports the entries of many identifiers.
+
+        Every line of the file contains a DOI, an arXiv ID or an ISBN (see `identify`). Empty lines
+        and lines starting with `#` are ignored. The bibliographic data of all identifiers is
+        fetched concurrently by `config.commands.add.workers` threads, which share a pool of
+        connections (see `cobib.parser.http_get`). Entries whose label already exists in the
+        database (or was fetched before) are skipped.
+
+        Args:
+            file (file): the file object listing the identifiers.
+
+        Returns:
+            A list of the labels of the entries which have been added to the database.
+        """
+        LOGGER.debug("Importing entries from the identifiers in '%s'.", file)
+        identifiers = []
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            identifier = self.identify(line)
+            if identifier is None:
+                msg = f"'{line}' is neither a DOI, nor an arXiv ID, nor an ISBN."
+                LOGGER.warning(msg)
+                print(msg, file=sys.stderr)
+                continue
+            identifiers.append(identifier)
+        # the TUI redirects sys.stderr into a buffer which is no terminal
+        progress = hasattr(sys.stderr, 'isatty') and sys.stderr.isatty()
+        known = set(config.bibliography.keys())
+        entries = OrderedDict()
+        with ThreadPoolExecutor(max_workers=config.commands.add.workers) as executor:
+            # the results are collected in the order of the identifiers
+            results = executor.map(self._fetch, identifiers)
+            for count, fetched in enumerate(results, start=1):
+                for label, entry in fetched.items():
+                    if label in known:
+                        LOGGER.warning("Label %s already exists! Ignoring the new version.", label)
+                        continue
+                    known.add(label)
+                    entries[label] = entry
+                if progress:
+                    print(f"\rFetched {count}/{len(identifiers)} identifiers...", end='',
+                          file=sys.stderr)
+        if progress:
+            print(file=sys.stderr)
+        return write_database(entries)
+
+    @staticmethod
+    def identify(identifier):
+        """Determines the kind of an identifier.
+
+        The kind can be given explicitly by one of the prefixes `arxiv:`, `doi:` or `isbn:`.
+        Otherwise, it is guessed from the format of the identifier.
+
+        Args:
+            identifier (str): the identifier.
+
+        Returns:
+            A pair of the kind (`arxiv`, `doi` or `isbn`) and the identifier without any prefix or
+            None if the kind could not be determined.
+        """
+        prefix, _, rest = identifier.partition(':')
+        if prefix.lower() in ('arxiv', 'doi', 'isbn') and rest.strip():
+            return prefix.lower(), rest.strip()
+        if re.match(DOI_REGEX, identifier):
+            return 'doi', identifier
+        if ARXIV_REGEX.fullmatch(identifier):
+            return 'arxiv', identifier
+        if ISBN_REGEX.fullmatch(identifier):
+            return 'isbn', identifier
+        return None
+
+    @staticmethod
+    def _fetch(identifier):
+        """Fetches the entries of an identifier.
+
+        Args:
+            identifier (tuple): a pair as returned by `identify`.
+
+        Returns:
+            The fetched entries or an empty dictionary if they could not be fetched.
+        """
+        kind, identifier = identifier
+        LOGGER.debug("Adding entries from %s '%s'.", kind, identifier)
+        try:
+            return getattr(Entry, f'from_{kind}')(identifier) or {}
+        except Exception as exc:  # pylint: disable=broad-except
+            msg = f"The entries of the {kind} '{identifier}' could not be fetched: {exc}"
+            LOGGER.warning(msg)
+            print(msg, file=sys.stderr)
+            return {}
+
     @staticmethod
     def tui(tui):
         """See base class."""
@@ -7,7 +7,7 @@ import sys
 import tempfile
 
 from cobib.config import config
-from cobib.database import read_database
+from cobib.database import read_database, Transaction
 from cobib.parser import Entry
 from .base_command import ArgumentParser, Command
 
@@ -78,30 +78,16 @@ class EditCommand(Command):
         if prv == nxt:
             LOGGER.info('No changes detected.')
             return
-        file = os.path.expanduser(config.database.file)
-        with open(file, 'r') as bib:
-            lines = bib.readlines()
-        entry_to_be_replaced = False
-        with open(file, 'w') as bib:
-            for line in lines:
-                if line.startswith(largs.label + ':'):
-                    LOGGER.debug('Entry "%s" found. Starting to replace lines.', largs.label)
-                    entry_to_be_replaced = True
-                    continue
-                if entry_to_be_replaced and line.startswith('...'):
-                    LOGGER.debug('Reached end of entry "%s".', largs.label)
-                    entry_to_be_replaced = False
-                    bib.writelines(nxt)
-                    continue
-                if not entry_to_be_replaced:
-                    bib.write(line)
-            if largs.add:
-                # append new entry
-                bib.write('---\n')
-                bib.writelines(nxt)
-                msg = f"'{largs.label}' was added to the database."
-                print(msg)
-                LOGGER.info(msg)
+        if largs.add:
+            # append new entry
+            with Transaction() as transaction:
+                transaction.append(largs.label, '---\n' + nxt)
+            msg = f"'{largs.label}' was added to the database."
+            print(msg)
+            LOGGER.info(msg)
+        else:
+            with Transaction() as transaction:
+                transaction.replace(largs.label, '---\n' + nxt)
 
         self.git(args=vars(largs))
 
@@ -2,11 +2,11 @@
 
 import argparse
 import logging
-import os
 import sys
 from zipfile import ZipFile
 
-from cobib.config import config
+from cobib.database import lookup
+from cobib.parser import to_bibtex_many, to_yaml_many
 from .base_command import ArgumentParser, Command
 from .list import ListCommand
 
@@ -32,6 +32,8 @@ class ExportCommand(Command):
         parser = ArgumentParser(prog="export", description="Export subcommand parser.")
         parser.add_argument("-b", "--bibtex", type=argparse.FileType('a'),
                             help="BibLaTeX output file")
+        parser.add_argument("-y", "--yaml", type=argparse.FileType('a'),
+                            help="YAML output file (in the format of CoBib's YAML database)")
         parser.add_argument("-z", "--zip", type=argparse.FileType('a'),
                             help="zip output file")
         parser.add_argument("-s", "--selection", action="store_true",
@@ -53,35 +55,42 @@ class ExportCommand(Command):
             print("{}: {}".format(exc.argument_name, exc.message), file=sys.stderr)
             return
 
-        if largs.bibtex is None and largs.zip is None:
+        if largs.bibtex is None and largs.yaml is None and largs.zip is None:
             msg = "No output file specified!"
             print("Error: " + msg, file=sys.stderr)
             LOGGER.error(msg)
             return
         if largs.zip is not None:
             largs.zip = ZipFile(largs.zip.name, 'w')
-        out = open(os.devnull, 'w')
         if largs.selection:
             LOGGER.info('Selection given. Interpreting `filter` as a list of labels')
             labels = largs.filter
         else:
             LOGGER.debug('Gathering filtered list of entries to be exported.')
-            labels = ListCommand().execute(largs.filter, out=out)
+            labels = ListCommand().select(largs.filter)
+            if labels is None:
+                return
 
+        entries = []
         try:
             for label in labels:
                 LOGGER.debug('Exporting entry "%s".', label)
-                entry = config.bibliography[label]
-                if largs.bibtex is not None:
-                    entry_str = entry.to_bibtex()
-                    largs.bibtex.write(entry_str)
+                entry = lookup(label)
+                if entry is None:
+                    raise KeyError(label)
+                entries.append(entry)
                 if largs.zip is not None:
                     if 'file' in entry.data.keys() and entry.data['file'] is not None:
                         LOGGER.debug('Adding "%s" associated with "%s" to the zip file.',
                                      entry.data['file'], label)
                         largs.zip.write(entry.data['file'], label+'.pdf')
-        except KeyError:
-            print("Error: No entry with the label '{}' could be found.".format(largs.label))
+        except KeyError as exc:
+            print(f"Error: No entry with the label '{exc.args[0]}' could be found.")
+        if largs.bibtex is not None:
+            # render all entries at once rather than writing them one by one
+            largs.bibtex.write(to_bibtex_many(entries))
+        if largs.yaml is not None:
+            largs.yaml.write(''.join(to_yaml_many(entries)))
 
     @staticmethod
     def tui(tui):
@@ -2,12 +2,16 @@
 
 import argparse
 import logging
+import os
+import re
 import sys
 import textwrap
 from collections import defaultdict
-from operator import itemgetter
+from itertools import chain, islice
 
 from cobib.config import config
+from cobib.database import field_index, fields, select
+from cobib.filter import Filter
 from .base_command import ArgumentParser, Command
 
 LOGGER = logging.getLogger(__name__)
@@ -18,6 +22,21 @@ class ListCommand(Command):
 
     name = 'list'
 
+    # the number of entries from which the column widths are determined in the streaming mode
+    STREAM_SAMPLE_SIZE = 100
+
+    @staticmethod
+    def non_negative_int(string):
+        """Utility method to assert the non-negative integer argument type.
+
+        Args:
+            string (str): the argument string to check.
+        """
+        value = int(string)
+        if value < 0:
+            raise argparse.ArgumentTypeError(f"{string} is negative")
+        return value
+
     def execute(self, args, out=sys.stdout):
         """List entries.
 
@@ -26,84 +45,319 @@ class ListCommand(Command):
         Args: See base class.
 
         Returns:
-            A list with the filtered and sorted labels.
+            A list with the filtered and sorted labels or, in the streaming mode, the number of
+            printed entries.
         """
         LOGGER.debug('Starting List command.')
+        largs = self.parse(args)
+        if largs is None:
+            return None
+        if largs.stream:
+            return self._stream(largs, out)
+        labels, lines, _ = self._page(largs)
+        for line in lines:
+            print(line, file=out)
+        return labels
+
+    def page(self, args, offset=None, limit=None):
+        """Formats a single page of the list.
+
+        In contrast to `execute`, the page is not printed but returned together with the total
+        number of matching entries. This allows the TUI to render the list page by page.
+
+        Args:
+            args (list): the arguments of the `list` command.
+            offset (int, optional): the number of leading entries to skip. This overwrites
+                                    `--offset`.
+            limit (int, optional): the maximum number of entries on the page. This overwrites
+                                   `--limit`.
+
+        Returns:
+            A tuple of the labels of the page, the formatted lines of the page and the total number
+            of entries matching the filter. If the arguments are invalid, None is returned.
+        """
+        largs = self.parse(args)
+        if largs is None:
+            return None
+        if offset is not None:
+            largs.offset = offset
+        if limit is not None:
+            largs.limit = limit
+        return self._page(largs)
+
+    def select(self, args):
+        """Selects the entries matching the filter arguments.
+
+        This evaluates the arguments of the `list` command without formatting or printing the table
+        of entries. It is meant to be used by other commands which operate on a filtered subset of
+        the database.
+
+        Args:
+            args (list): the arguments of the `list` command.
+
+        Returns:
+            A list with the filtered and sorted labels or None if the arguments are invalid.
+        """
+        largs = self.parse(args)
+        if largs is None:
+            return None
+        labels, _ = self._order(largs)
+        return list(labels)
+
+    @staticmethod
+    def _order(largs):
+        """Filters, sorts and pages the entries.
+
+        The entries are sorted by means of the sort index of the field index (see
+        `cobib.database.FieldIndex.sorted`) and only the entries up to the end of the requested page
+        are visited.
+
+        Args:
+            largs (argparse.Namespace): the parsed arguments (see `parse`).
+
+        Returns:
+            A tuple of an iterator over the labels of the requested page and the total number of
+            matching entries.
+        """
+        # the filter is evaluated on the field index rather than on every single entry or, if the
+        # database has not been read yet, by the storage backend
+        matching = select(largs.filter)
+        index = field_index()
+        if largs.sort:
+            LOGGER.debug('Sorting in %s order.', 'reverse' if largs.reverse else 'normal')
+            labels = index.sorted(largs.sort, largs.reverse)
+        elif largs.reverse:
+            # do not sort, but reverse
+            LOGGER.debug('Reversing order.')
+            labels = reversed(config.bibliography.keys())
+        else:
+            labels = iter(config.bibliography.keys())
+        end = None if largs.limit is None else largs.offset + largs.limit
+        return islice((label for label in labels if label in matching), largs.offset, end), \
+            len(matching)
+
+    @staticmethod
+    def _filtered(largs):
+        """Filters and pages the entries in the order of the database.
+
+        In contrast to `_order`, the filter is evaluated on every entry as it is visited rather than
+        on the field index. Thus, the first matching entries are available right away.
+
+        Args:
+            largs (argparse.Namespace): the parsed arguments (see `parse`).
+
+        Returns:
+            An iterator over the labels of the requested page.
+        """
+        bibliography = config.bibliography
+        labels = reversed(bibliography.keys()) if largs.reverse else iter(bibliography.keys())
+        end = None if largs.limit is None else largs.offset + largs.limit
+        return islice((label for label in labels if largs.filter(bibliography[label])),
+                      largs.offset, end)
+
+    @staticmethod
+    def _columns(largs):
+        """Determines the columns of the table.
+
+        Args:
+            largs (argparse.Namespace): the parsed arguments (see `parse`).
+
+        Returns:
+            A list of the fields to be shown.
+        """
+        columns = ['ID', 'title']
+        if largs.sort and largs.sort not in columns:
+            # insert columns which are sorted by at front of list view
+            LOGGER.debug('Sorting by "%s".', largs.sort)
+            columns.insert(1, largs.sort)
+        # filtered columns are still appended
+        columns.extend([arg[0] for arg in largs.filter.filter.keys() if arg[0] not in columns])
+        return columns
+
+    @staticmethod
+    def _row(label, columns, largs):
+        """Gathers a row of the table.
+
+        Args:
+            label (str): the label of the entry.
+            columns (list): the fields to be shown.
+            largs (argparse.Namespace): the parsed arguments (see `parse`).
+
+        Returns:
+            A list of the values of the columns.
+        """
+        entry = config.bibliography[label]
+        row = [entry.data.get(c, '') for c in columns]
+        if not largs.long:
+            title = columns.index('title')
+            row[title] = textwrap.shorten(row[title], 80, placeholder='...')
+        return row
+
+    @staticmethod
+    def _widths(rows, widths):
+        """Widens the columns to fit the rows.
+
+        Args:
+            rows (list): the rows of the table.
+            widths (list): the current column widths.
+
+        Returns:
+            The new column widths.
+        """
+        for row in rows:
+            widths = [max(width, len(col)) for width, col in zip(widths, row)]
+        return widths
+
+    @staticmethod
+    def _format(row, widths):
+        """Formats a row of the table.
+
+        Args:
+            row (list): the values of the columns.
+            widths (list): the column widths.
+
+        Returns:
+            The formatted line.
+        """
+        return '  '.join([f'{col: <{wid}}' for col, wid in zip(row, widths)])
+
+    def _page(self, largs):
+        """Formats a page of the list.
+
+        The column widths are determined from the entries on the page only.
+
+        Args:
+            largs (argparse.Namespace): the parsed arguments (see `parse`).
+
+        Returns:
+            A tuple of the labels of the page, the formatted lines of the page and the total number
+            of entries matching the filter.
+        """
+        labels, total = self._order(largs)
+        labels = list(labels)
+        LOGGER.debug('Entries on the page: %s', labels)
+        columns = self._columns(largs)
+        table = [self._row(label, columns, largs) for label in labels]
+        widths = self._widths(table, [0]*len(columns))
+        LOGGER.debug('Column widths determined to be: %s', widths)
+        lines = [self._format(row, widths) for row in table]
+        return labels, lines, total
+
+    def _stream(self, largs, out):
+        """Prints the list while the entries are gathered.
+
+        The column widths are determined from the first `STREAM_SAMPLE_SIZE` entries only and are
+        not changed afterwards. Unless the list is sorted, the entries are filtered one by one (see
+        `_filtered`). Thus, the first lines are printed right away and only a bounded number of rows
+        is kept in memory. Values which are wider than their column are not cut off.
+
+        Args:
+            largs (argparse.Namespace): the parsed arguments (see `parse`).
+            out (stream): the output stream.
+
+        Returns:
+            The number of printed entries.
+        """
+        if largs.sort or not config.bibliography:
+            # sorting requires all matching entries and an unread database is filtered by the
+            # storage backend (see `cobib.database.select`)
+            labels, _ = self._order(largs)
+        else:
+            labels = self._filtered(largs)
+        columns = self._columns(largs)
+        rows = (self._row(label, columns, largs) for label in labels)
+        sample = list(islice(rows, self.STREAM_SAMPLE_SIZE))
+        widths = self._widths(sample, [0]*len(columns))
+        LOGGER.debug('Column widths sampled to be: %s', widths)
+        printed = 0
+        try:
+            for row in chain(sample, rows):
+                print(self._format(row, widths), file=out)
+                printed += 1
+                if printed == len(sample) and hasattr(out, 'flush'):
+                    # ensure that the first lines appear right away, even if the output is a pipe
+                    out.flush()
+        except BrokenPipeError:
+            # the reading end of the pipe was closed (e.g. by `head`)
+            LOGGER.debug('The output was closed after %d entries.', printed)
+            if out is sys.stdout:
+                # prevent another error when the interpreter flushes the output upon exiting
+                os.dup2(os.open(os.devnull, os.O_WRONLY), out.fileno())
+        return printed
+
+    @staticmethod
+    def parse(args):
+        """Parses the arguments of the `list` command.
+
+        Args:
+            args (list): the arguments of the `list` command.
+
+        Returns:
+            The parsed arguments whose `filter` attribute contains the compiled filter (see
+            `cobib.filter.Filter`) or None if the arguments are invalid.
+        """
         if '--' in args:
+            args = list(args)
             args.remove('--')
         parser = ArgumentParser(prog="list", description="List subcommand parser.",
                                 prefix_chars='+-')
         parser.add_argument('-x', '--or', dest='OR', action='store_true',
                             help="concatenate filters with OR instead of AND")
+        parser.add_argument('-i', '--ignore-case', action='store_true',
+                            help="ignore the case when filtering")
+        parser.add_argument('-e', '--regex', action='store_true',
+                            help="interpret the filter values as regular expressions")
         parser.add_argument('-l', '--long', action='store_true',
                             help="print table in long format (i.e. wrap and don't shorten lines)")
         parser.add_argument('-s', '--sort', help="specify column along which to sort the list")
         parser.add_argument('-r', '--reverse', action='store_true',
                             help="reverses the listing order")
-        unique_keys = set()
-        LOGGER.debug('Gathering possible filter arguments.')
-        for entry in config.bibliography.values():
-            unique_keys.update(entry.data.keys())
-        for key in sorted(unique_keys):
-            parser.add_argument('++'+key, type=str, action='append',
-                                help="include elements with matching "+key)
-            parser.add_argument('--'+key, type=str, action='append',
-                                help="exclude elements with matching "+key)
+        parser.add_argument('--limit', type=ListCommand.non_negative_int,
+                            help="list at most this many entries")
+        parser.add_argument('--offset', type=ListCommand.non_negative_int, default=0,
+                            help="skip this many entries at the start of the list")
+        parser.add_argument('--stream', action='store_true',
+                            help="print the entries right away using column widths which are "
+                            "determined from the first entries only")
+        # The filters are not registered with the parser since one option per field scales badly
+        # with the number of fields. Instead, the remaining arguments are parsed as filters.
+        if '-h' in args or '--help' in args:
+            for key in sorted(fields()):
+                parser.add_argument('++'+key, type=str, action='append',
+                                    help="include elements with matching "+key)
+                parser.add_argument('--'+key, type=str, action='append',
+                                    help="exclude elements with matching "+key)
 
         try:
-            largs = parser.parse_args(args)
+            largs, filters = parser.parse_known_args(args)
         except argparse.ArgumentError as exc:
-            print("{}: {}".format(exc.argument_name, exc.message), file=sys.stderr)
+            print(f"{exc.argument_name}: {exc.message}", file=sys.stderr)
             return None
 
         LOGGER.debug('Constructing filter.')
         _filter = defaultdict(list)
-        for key, val in largs.__dict__.items():
-            if key in ['OR', 'long', 'sort', 'reverse'] or val is None:
-                continue
-            if not isinstance(val, list):
-                val = [val]
-            for i in val:
-                for idx, obj in enumerate(args):
-                    if i == obj:
-                        _filter[tuple([key, args[idx-1][0] == '+'])].append(i)
-                        break
+        # the fields are only gathered if needed because this indexes the entire database
+        known_fields = fields() if filters else set()
+        filters = iter(filters)
+        for arg in filters:
+            name, _, val = arg.partition('=')
+            if name[:2] not in ('++', '--') or name[2:] not in known_fields:
+                parser.error('unrecognized arguments: ' + arg)
+            if not val:
+                val = next(filters, None)
+                if val is None:
+                    print(f"{name}: expected one argument", file=sys.stderr)
+                    return None
+            _filter[(name[2:], name[0] == '+')].append(val)
         LOGGER.debug('Final filter configuration: %s', dict(_filter))
         if largs.OR:
             LOGGER.debug('Filters are combined with logical ORs!')
-
-        columns = ['ID', 'title']
-        if largs.sort and largs.sort not in columns:
-            # insert columns which are sorted by at front of list view
-            LOGGER.debug('Sorting by "%s".', largs.sort)
-            columns.insert(1, largs.sort)
-        # filtered columns are still appended
-        columns.extend([arg[0] for arg in _filter.keys() if arg[0] not in columns])
-        widths = [0]*len(columns)
-        labels = []
-        table = []
-        for key, entry in config.bibliography.items():
-            if entry.matches(_filter, largs.OR):
-                LOGGER.debug('Entry "%s" matches the filter.', key)
-                labels.append(key)
-                table.append([entry.data.get(c, '') for c in columns])
-                if largs.long:
-                    table[-1][1] = table[-1][1]
-                else:
-                    table[-1][1] = textwrap.shorten(table[-1][1], 80, placeholder='...')
-                widths = [max(widths[col], len(table[-1][col])) for col in range(len(widths))]
-        LOGGER.debug('Column widths determined to be: %s', widths)
-        if largs.sort:
-            LOGGER.debug('Sorting table in %s order.', 'reverse' if largs.reverse else 'normal')
-            labels, table = zip(*sorted(zip(labels, table), reverse=largs.reverse,
-                                        key=itemgetter(columns.index(largs.sort))))
-        elif largs.reverse:
-            # do not sort, but reverse
-            LOGGER.debug('Reversing order.')
-            labels, table = labels[::-1], table[::-1]
-        for row in table:
-            print('  '.join([f'{col: <{wid}}' for col, wid in zip(row, widths)]), file=out)
-        return list(labels)
+        try:
+            largs.filter = Filter(_filter, largs.OR, largs.ignore_case, largs.regex)
+        except re.error as exc:
+            print(f"Invalid regular expression: {exc}", file=sys.stderr)
+            return None
+        return largs
 
     @staticmethod
     def tui(tui, sort_mode):
@@ -2,10 +2,10 @@
 
 import argparse
 import logging
-import os
 import sys
 
 from cobib.config import config
+from cobib.database import Transaction
 from .base_command import ArgumentParser, Command
 from .list import ListCommand
 
@@ -17,6 +17,14 @@ class ModifyCommand(Command):
 
     name = 'modify'
 
+    # the separators used for appending to fields which contain a list of values
+    SEPARATORS = {
+        'author': ' and ',
+        'editor': ' and ',
+        'file': ', ',
+        'tags': ', ',
+    }
+
     @staticmethod
     def field_value_pair(string):
         """Utility method to assert the field-value pair argument type.
@@ -45,7 +53,10 @@ class ModifyCommand(Command):
                             "field-value pair properly, especially if the value contains spaces."
                             )
         parser.add_argument("-a", "--append", action="store_true",
-                            help="Appends to the modified field rather than overwriting it.")
+                            help="Appends to the modified field rather than overwriting it. The "
+                            "values of list-like fields are joined by their usual separator (e.g. "
+                            "a comma for `tags` and `and` for `author`) while all other values are "
+                            "separated by a space.")
         parser.add_argument("-s", "--selection", action="store_true",
                             help="When specified, the `filter` argument will be interpreted as "
                             "a list of entry labels rather than arguments for the `list` command.")
@@ -65,50 +76,36 @@ class ModifyCommand(Command):
             print("{}: {}".format(exc.argument_name, exc.message), file=sys.stderr)
             return
 
-        out = open(os.devnull, 'w')
         if largs.selection:
             LOGGER.info('Selection given. Interpreting `filter` as a list of labels')
             labels = largs.filter
         else:
             LOGGER.debug('Gathering filtered list of entries to be modified.')
-            labels = ListCommand().execute(largs.filter, out=out)
+            labels = ListCommand().select(largs.filter)
+            if labels is None:
+                return
 
         field, value = largs.modification
 
-        if largs.append:
-            msg = 'The append-mode of the `modify` command has not been implemented yet.'
-            print(msg)
-            LOGGER.warning(msg)
-            sys.exit(1)
-
-        for label in labels:
-            try:
+        # apply all modifications in memory and write them to the database file at once
+        with Transaction() as transaction:
+            for label in labels:
+                if label not in config.bibliography:
+                    print("Error: No entry with the label '{}' could be found.".format(label))
+                    continue
                 entry = config.bibliography[label]
-                entry.data[field] = value
-
-                file = os.path.expanduser(config.database.file)
-                with open(file, 'r') as bib:
-                    lines = bib.readlines()
-                entry_to_be_replaced = False
-                with open(file, 'w') as bib:
-                    for line in lines:
-                        if line.startswith(label + ':'):
-                            LOGGER.debug('Entry "%s" found. Starting to replace lines.', label)
-                            entry_to_be_replaced = True
-                            continue
-                        if entry_to_be_replaced and line.startswith('...'):
-                            LOGGER.debug('Reached end of entry "%s".', label)
-                            entry_to_be_replaced = False
-                            bib.writelines('\n'.join(entry.to_yaml().split('\n')[1:]))
-                            continue
-                        if not entry_to_be_replaced:
-                            bib.write(line)
-
-                msg = f"'{label}' was modified."
-                print(msg)
-                LOGGER.info(msg)
-            except KeyError:
-                print("Error: No entry with the label '{}' could be found.".format(label))
+                if largs.append and entry.data.get(field, None):
+                    LOGGER.debug("Appending '%s' to the '%s' field of '%s'.", value, field, label)
+                    separator = self.SEPARATORS.get(field, ' ')
+                    entry.data[field] = str(entry.data[field]) + separator + value
+                else:
+                    entry.data[field] = value
+                transaction.replace(label, entry.to_yaml())
+
+        for label in transaction.changed:
+            msg = f"'{label}' was modified."
+            print(msg)
+            LOGGER.info(msg)
 
         self.git(args=vars(largs))
 
@@ -2,13 +2,15 @@
 
 import argparse
 import logging
-import os
 import re
 import shlex
+import sqlite3
 import sys
 
 from cobib import __version__
 from cobib.config import config
+from cobib.database import text_index
+from cobib.search import Query
 from .base_command import ArgumentParser, Command
 from .list import ListCommand
 
@@ -23,8 +25,11 @@ class SearchCommand(Command):
     def execute(self, args, out=sys.stdout):
         """Search database.
 
-        Searches the database recursively (i.e. including any associated files) using `grep` for a
-        query string.
+        Searches the database recursively (i.e. including any associated files) for a query string.
+        By default, the query is a regular expression and all matching entries are listed in the
+        order of the database. In the ranked (and fuzzy) mode, the query is a list of words and the
+        most relevant entries are listed in the order of their relevance (see
+        `cobib.database.TextIndex.rank`).
 
         Args: See base class.
         """
@@ -35,6 +40,12 @@ class SearchCommand(Command):
                             help="number of context lines to provide for each match")
         parser.add_argument("-i", "--ignore-case", action="store_true",
                             help="ignore case for searching")
+        parser.add_argument("--rank", action="store_true",
+                            help="rank the entries by their relevance for the words of the query")
+        parser.add_argument("--fuzzy", action="store_true",
+                            help="like --rank but the words of the query also match similar words")
+        parser.add_argument("-k", "--top", type=ListCommand.non_negative_int, default=10,
+                            help="number of entries to list in the ranked and fuzzy modes")
         parser.add_argument('filter', nargs='*',
                             help="You can specify filters as used by the `list` command in order "
                             "to select a subset of labels to be modified. To ensure this works as "
@@ -51,37 +62,77 @@ class SearchCommand(Command):
             print("{}: {}".format(exc.argument_name, exc.message), file=sys.stderr)
             return None
 
-        labels = ListCommand().execute(largs.filter, out=open(os.devnull, 'w'))
+        labels = ListCommand().select(largs.filter)
+        if labels is None:
+            return None
         LOGGER.debug('Available entries to search: %s', labels)
 
-        ignore_case = config.commands.search.ignore_case or largs.ignore_case
-        re_flags = re.IGNORECASE if ignore_case else 0
-        LOGGER.debug('The search will be performed case %ssensitive', 'in' if ignore_case else '')
+        scores = None
+        if largs.rank or largs.fuzzy:
+            try:
+                ranked = text_index().rank(largs.query, largs.top, largs.fuzzy, set(labels))
+            except (OSError, sqlite3.Error) as exc:
+                LOGGER.error('Could not use the full-text index: %s', exc)
+                ranked = None
+            if ranked is None:
+                print("Ranked searches require the full-text index (see config.database.cache).",
+                      file=sys.stderr)
+                return None
+            scores, words = dict(ranked[0]), ranked[1]
+            # the scores are only shown if they tell the entries apart
+            show_scores = len(set(scores.values())) > 1
+            labels = [label for label, _ in ranked[0]]
+            # the context of the matching words is shown for every ranked entry
+            query = Query('|'.join(re.escape(word) for word in words) or '$^', ignore_case=True)
+        else:
+            ignore_case = config.commands.search.ignore_case or largs.ignore_case
+            LOGGER.debug('The search will be performed case %ssensitive',
+                         'in' if ignore_case else '')
+            try:
+                query = Query(largs.query, ignore_case)
+            except re.error as exc:
+                print(f"Invalid search query: {exc}", file=sys.stderr)
+                return None
+            try:
+                # only the entries found in the full-text index need to be searched
+                candidates = text_index().candidates(query)
+            except (OSError, sqlite3.Error) as exc:
+                LOGGER.warning('Could not use the full-text index: %s', exc)
+                candidates = None
+            if candidates is not None:
+                labels = [label for label in labels if label in candidates]
+        highlight = (config.get_ansi_color('search_query'), '\x1b[0m')
 
         hits = 0
-        output = []
-        for label in labels.copy():
-            entry = config.bibliography[label]
-            matches = entry.search(largs.query, largs.context, ignore_case)
-            if not matches:
-                labels.remove(label)
+        found = []
+        entries = (config.bibliography[label] for label in labels)
+        for entry, matches in query.search_many(entries, largs.context,
+                                                config.commands.search.workers):
+            if not matches and scores is None:
                 continue
+            label = entry.label
+            found.append(label)
 
             hits += len(matches)
             LOGGER.debug('Entry "%s" includes %d hits.', label, hits)
-            title = f"{label} - {len(matches)} match" + ("es" if len(matches) > 1 else "")
+            title = f"{label} - {len(matches)} match" + ("es" if len(matches) != 1 else "")
+            if scores is not None and show_scores:
+                # the scores of small libraries are tiny so they are shown with significant digits
+                title += f" - score {scores[label]:.3g}"
             title = title.replace(label, config.get_ansi_color('search_label') + label + '\x1b[0m')
-            output.append(title)
+            output = [title]
 
             for idx, match in enumerate(matches):
-                for line in match:
-                    line = re.sub(rf'({largs.query})',
-                                  config.get_ansi_color('search_query') + r'\1' + '\x1b[0m',
-                                  line, flags=re_flags)
+                for line, spans in match:
+                    # the spans of the matches are reused rather than searching the line again
+                    line = Query.highlight(line, spans, *highlight)
                     output.append(f"[{idx+1}]\t".expandtabs(8) + line)
+            # the results of every entry are printed as soon as they are available
+            print('\n'.join(output), file=out)
 
-        print('\n'.join(output), file=out)
-        return (hits, labels)
+        if not found:
+            print('', file=out)
+        return (hits, found)
 
     @staticmethod
     def tui(tui):
@@ -6,6 +6,7 @@ import sys
 
 from cobib import __version__
 from cobib.config import config
+from cobib.database import lookup
 from .base_command import ArgumentParser, Command
 
 LOGGER = logging.getLogger(__name__)
@@ -37,11 +38,10 @@ class ShowCommand(Command):
             print("{}: {}".format(exc.argument_name, exc.message), file=sys.stderr)
             return
 
-        try:
-            entry = config.bibliography[largs.label]
-            entry_str = entry.to_bibtex()
-            print(entry_str, file=out)
-        except KeyError:
+        entry = lookup(largs.label)
+        if entry is not None:
+            print(entry.to_bibtex(), file=out)
+        else:
             msg = f"No entry with the label '{largs.label}' could be found."
             LOGGER.error(msg)
             print(msg, file=out)
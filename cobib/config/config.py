@@ -41,6 +41,11 @@ class Config(dict):
 
     DEFAULTS = {
         'commands': {
+            'add': {
+                'rate_limit': 5,
+                'retries': 3,
+                'workers': 8,
+            },
             'edit': {
                 'default_entry_type': 'article',
             },
@@ -48,16 +53,27 @@ class Config(dict):
                 'command': 'xdg-open' if sys.platform.lower() == 'linux' else 'open',
             },
             'search': {
+                'backend': 'builtin',
+                'extraction_cache_size': 64 * 2**20,
+                'extractor': None,
                 'grep': 'grep',
-                'ignore_case': False
+                'ignore_case': False,
+                'workers': None,
             },
         },
         'database': {
+            'backend': 'yaml',
+            'cache': os.path.expanduser('~/.cache/cobib/'),
             'file': os.path.expanduser('~/.local/share/cobib/literature.yaml'),
             'format': {
                 'month': int,
             },
             'git': False,
+            'lock': True,
+            'parallel': {
+                'processes': None,
+                'threshold': 10000,
+            },
         },
         'parsers': {
             'bibtex': {
@@ -355,6 +371,16 @@ class Config(dict):
 
         # COMMANDS section
         LOGGER.debug('Validating the COMMANDS configuration section.')
+        # COMMANDS.ADD section
+        LOGGER.debug('Validating the COMMANDS.ADD configuration section.')
+        self._assert(self.commands.add.rate_limit is None or
+                     (isinstance(self.commands.add.rate_limit, (int, float)) and
+                      self.commands.add.rate_limit > 0),
+                     "config.commands.add.rate_limit should be a positive number or None.")
+        self._assert(isinstance(self.commands.add.retries, int) and self.commands.add.retries >= 0,
+                     "config.commands.add.retries should be a non-negative integer.")
+        self._assert(isinstance(self.commands.add.workers, int) and self.commands.add.workers > 0,
+                     "config.commands.add.workers should be a positive integer.")
         # COMMANDS.EDIT section
         LOGGER.debug('Validating the COMMANDS.EDIT configuration section.')
         self._assert(isinstance(self.commands.edit.default_entry_type, str),
@@ -365,19 +391,45 @@ class Config(dict):
                      "config.commands.open.command should be a string.")
         # COMMANDS.SEARCH section
         LOGGER.debug('Validating the COMMANDS.SEARCH configuration section.')
+        self._assert(self.commands.search.backend in ('builtin', 'grep'),
+                     "config.commands.search.backend should be either 'builtin' or 'grep'.")
+        self._assert(isinstance(self.commands.search.extraction_cache_size, int) and
+                     self.commands.search.extraction_cache_size >= 0,
+                     "config.commands.search.extraction_cache_size should be a non-negative "
+                     "integer.")
+        self._assert(self.commands.search.extractor is None or
+                     callable(self.commands.search.extractor),
+                     "config.commands.search.extractor should be a function or None.")
         self._assert(isinstance(self.commands.search.grep, str),
                      "config.commands.search.grep should be a string.")
         self._assert(isinstance(self.commands.search.ignore_case, bool),
                      "config.commands.search.ignore_case should be a boolean.")
+        self._assert(self.commands.search.workers is None or
+                     (isinstance(self.commands.search.workers, int) and
+                      self.commands.search.workers > 0),
+                     "config.commands.search.workers should be a positive integer or None.")
 
         # DATABASE section
+        self._assert(self.database.backend in ('sqlite', 'yaml'),
+                     "config.database.backend should be either 'sqlite' or 'yaml'.")
+        self._assert(self.database.cache is None or isinstance(self.database.cache, str),
+                     "config.database.cache should be a string or None.")
         self._assert(isinstance(self.database.file, str),
                      "config.database.file should be a string.")
         self._assert(isinstance(self.database.git, bool),
                      "config.database.git should be a boolean.")
+        self._assert(isinstance(self.database.lock, bool),
+                     "config.database.lock should be a boolean.")
         # DATABASE.FORMAT section
         self._assert(self.database.format.month in (int, str),
                      "config.database.format.month should be either the `int` or `str` type.")
+        # DATABASE.PARALLEL section
+        self._assert(self.database.parallel.processes is None or
+                     (isinstance(self.database.parallel.processes, int) and
+                      self.database.parallel.processes > 0),
+                     "config.database.parallel.processes should be a positive integer or None.")
+        self._assert(isinstance(self.database.parallel.threshold, int),
+                     "config.database.parallel.threshold should be an integer.")
 
         # PARSER section
         self._assert(isinstance(self.parsers.bibtex.ignore_non_standard_types, bool),
@@ -452,10 +504,14 @@ class Config(dict):
         return self._bibliography
 
     def set_bibliography(self, bib):
-        """Sets the bibliographic runtime data."""
+        """Sets the bibliographic runtime data.
+
+        Note, that the entries are not copied. This allows the database module to re-use unchanged
+        entries when reloading the database file.
+        """
         LOGGER.debug('Setting bibliographic runtime data.')
         # pylint: disable=attribute-defined-outside-init
-        self._bibliography = copy.deepcopy(bib)
+        self._bibliography = bib
 
     def del_bibliography(self):
         """Deletes the bibliographic runtime data."""
@@ -24,13 +24,48 @@ from cobib.config import config
 # COMMANDS
 # These settings affect some command specific behavior.
 
+# The `add` command fetches the bibliographic data of DOIs, arXiv IDs and ISBNs from online APIs.
+# You can specify the maximum number of requests per second which are sent to each API. Set this
+# to `None` in order to disable the limit.
+config.commands.add.rate_limit = 5
+
+# You can specify how many times a failed request is retried. The delay between the retries
+# increases exponentially.
+config.commands.add.retries = 3
+
+# You can specify the number of threads which fetch the bibliographic data concurrently when many
+# identifiers are added at once (`add --bulk`).
+config.commands.add.workers = 8
+
 # You can specify the default bibtex entry type via the following setting:
 config.commands.edit.default_entry_type = 'article'
 
 # You can specify a custom command which will be used to `open` files associated with your entries.
 config.commands.open.command = 'xdg-open' if sys.platform.lower() == 'linux' else 'open'
 
-# You can specify a custom grep tool which will be used to search through your database and any
+# You can specify how associated files are searched. The `builtin` backend searches the files
+# in-process without starting a subprocess per file. The `grep` backend runs the tool specified
+# below instead.
+config.commands.search.backend = 'builtin'
+
+# The `builtin` backend extracts the text of attached PDF files in order to search them. You can
+# specify a function which takes the path of a PDF file and returns its text. By default (`None`),
+# the optional `pypdf` package is used if it is installed (e.g. via `pip install cobib[pdf]`).
+# Otherwise, a pure-Python extractor is used which supports the PDF files produced by (La)TeX. For
+# example, you can use `pdftotext` of the poppler utilities as follows:
+#
+#     import subprocess
+#     config.commands.search.extractor = lambda file: subprocess.run(
+#         ['pdftotext', '-layout', file, '-'], stdout=subprocess.PIPE, check=True
+#     ).stdout.decode()
+config.commands.search.extractor = None
+
+# The extracted texts are cached in the `text` subdirectory of `config.database.cache`. You can
+# specify the maximum size of this cache in bytes. The least recently used texts are evicted when
+# it grows larger. Set this to `0` in order to disable the cache.
+config.commands.search.extraction_cache_size = 64 * 2**20
+
+# You can specify a custom grep tool which will be used by the `grep` backend to search through any
 # associated files. The default tool (`grep`) will not provide results for attached PDFs but other
 # tools such as [ripgrep-all](https://github.com/phiresky/ripgrep-all) will.
 config.commands.search.grep = 'grep'
@@ -38,6 +73,12 @@ config.commands.search.grep = 'grep'
 # You can specify whether searches should be performed case-insensitive. By default, this is off.
 config.commands.search.ignore_case = False
 
+# You can specify the number of threads which search the entries and their associated files in
+# parallel. This also limits the number of concurrently running search processes. By default
+# (`None`), the number of CPUs plus four (but at most 32) is used. Set this to `1` in order to
+# search the entries one after another.
+config.commands.search.workers = None
+
 
 # DATABASE
 # These settings affect the database in general.
@@ -46,6 +87,18 @@ config.commands.search.ignore_case = False
 # You can use a `~` to represent your `$HOME` directory.
 config.database.file = os.path.expanduser('~/.local/share/cobib/literature.yaml')
 
+# You can specify the format of the database file. By default, it is a YAML file which is easy to
+# read and to track with git. Alternatively, it can be an SQLite database (`'sqlite'`) which is
+# faster to change for large databases. You can convert between the two by exporting the entries of
+# one database with `cobib export --yaml` and adding them to the other with `cobib add --yaml`.
+config.database.backend = 'yaml'
+
+# CoBib stores a binary snapshot of the parsed database in the following directory. As long as the
+# database file does not change, this snapshot is loaded instead of parsing the YAML file again
+# which speeds up the startup for large databases significantly. The same directory holds the
+# full-text index which is used by the `search` command. Set this to `None` to disable both.
+config.database.cache = os.path.expanduser('~/.cache/cobib/')
+
 # CoBib can integrate with `git` in order to automatically track the history of your database.
 # However, by default, this option is disabled. If you want to enable it, simply change the
 # following setting to `True` and initialize your database with `cobib init --git`.
@@ -53,6 +106,11 @@ config.database.file = os.path.expanduser('~/.local/share/cobib/literature.yaml'
 # your name and email address.
 config.database.git = False
 
+# CoBib replaces the database file atomically whenever it is modified. While doing so, it holds an
+# advisory lock such that multiple CoBib processes (e.g. a TUI and a command line call) can not
+# overwrite each other's changes. You can disable this lock if your file system does not support it.
+config.database.lock = True
+
 # DATABASE.FORMAT
 # You can also specify some aspects about the format of the database (currently only one but there
 # will be more in the future).
@@ -61,6 +119,17 @@ config.database.git = False
 # converted automatically. I.e. '8' will become 'aug' if you set this to `str`.
 config.database.format.month = int
 
+# DATABASE.PARALLEL
+# Large databases can be parsed in multiple processes in parallel.
+
+# You can specify the number of processes. By default (`None`), one process per CPU is used. Set
+# this to `1` in order to disable parallel parsing.
+config.database.parallel.processes = None
+
+# You can specify the minimum number of entries which need to be parsed in order to parse them in
+# parallel. For smaller databases, the overhead of starting the processes outweighs the gain.
+config.database.parallel.threshold = 10000
+
 
 # PARSERS
 # These settings affect some parser specific behavior.
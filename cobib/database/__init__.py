@@ -0,0 +1,29 @@
+"""CoBib's database module."""
+
+from .base_backend import Backend
+from .cache import cache_file
+from .database import backend, fields, lookup, read_database, select, write_database, Transaction
+from .field_index import FieldIndex, field_index
+from .sqlite_backend import SqliteBackend
+from .text_index import TextIndex, text_index
+from .yaml_backend import YamlBackend, locate
+
+
+__all__ = [
+    "Backend",
+    "FieldIndex",
+    "SqliteBackend",
+    "TextIndex",
+    "Transaction",
+    "YamlBackend",
+    "backend",
+    "cache_file",
+    "field_index",
+    "fields",
+    "locate",
+    "lookup",
+    "read_database",
+    "select",
+    "text_index",
+    "write_database",
+]
@@ -0,0 +1,94 @@
+"""CoBib database backend interface."""
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+
+class Backend(ABC):
+    """The Backend interface declares the methods to read and change the stored bibliography."""
+
+    name = 'base'
+    # Whether the backend looks up (see `get`) and filters (see `select`) entries without reading
+    # the entire bibliography.
+    indexed = False
+
+    @abstractmethod
+    def read(self, file):
+        """Reads the bibliography.
+
+        Args:
+            file (str): path to the database file.
+
+        Returns:
+            An OrderedDict containing the bibliography.
+
+        Raises:
+            FileNotFoundError: if the database file does not exist.
+        """
+
+    def get(self, file, label):
+        """Looks up a single entry.
+
+        Backends which can look up an entry without reading the entire bibliography should override
+        this method.
+
+        Args:
+            file (str): path to the database file.
+            label (str): the label of the entry.
+
+        Returns:
+            The entry or None if no entry with the given label exists.
+
+        Raises:
+            FileNotFoundError: if the database file does not exist.
+        """
+        return self.read(file).get(label, None)
+
+    def select(self, file, _filter):
+        """Reads the entries which match a filter.
+
+        Backends which can narrow down the matching entries without reading the entire bibliography
+        should override this method.
+
+        Args:
+            file (str): path to the database file.
+            _filter (Filter): the compiled filter (see `cobib.filter.Filter`).
+
+        Returns:
+            An OrderedDict containing the matching entries in the order of the bibliography.
+
+        Raises:
+            FileNotFoundError: if the database file does not exist.
+        """
+        return OrderedDict((label, entry) for label, entry in self.read(file).items()
+                           if _filter(entry))
+
+    def fields(self, file):
+        """Returns the names of all fields which occur in the bibliography.
+
+        Args:
+            file (str): path to the database file.
+
+        Returns:
+            A set of the field names.
+
+        Raises:
+            FileNotFoundError: if the database file does not exist.
+        """
+        return {field for entry in self.read(file).values() for field in entry.data}
+
+    @abstractmethod
+    def commit(self, file, changes, appends):
+        """Applies the changes of a transaction to the stored bibliography.
+
+        Either all or none of the changes must be applied.
+
+        Args:
+            file (str): path to the database file.
+            changes (OrderedDict): maps the labels of existing entries onto their new YAML document
+                                   (see `Entry.to_yaml`) or None if they are to be removed.
+            appends (list[tuple]): the labels and YAML documents of the new entries.
+
+        Returns:
+            A list of the labels of the entries which were actually replaced or removed.
+        """
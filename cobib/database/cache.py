@@ -0,0 +1,28 @@
+"""CoBib's cache files."""
+
+import hashlib
+import os
+
+from cobib.config import config
+
+
+def cache_file(file, extension):
+    """Returns the path of a cache file belonging to the given database file.
+
+    The cache files are stored in the directory configured via `config.database.cache`.
+
+    Args:
+        file (str): path to the database file.
+        extension (str): the file extension of the cache file.
+
+    Returns:
+        The path to the cache file or None if the cache is disabled.
+    """
+    cache = config.database.cache
+    if not cache:
+        return None
+    file = os.path.realpath(file)
+    # the hash of the absolute path ensures that different databases do not share a cache file
+    path_hash = hashlib.sha1(file.encode('utf-8')).hexdigest()[:8]
+    name = os.path.splitext(os.path.basename(file))[0]
+    return os.path.join(os.path.expanduser(cache), f'{name}-{path_hash}.{extension}')
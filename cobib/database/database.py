@@ -0,0 +1,207 @@
+"""Database handler module."""
+
+from collections import OrderedDict
+import logging
+import os
+import sys
+
+from cobib.config import config
+from cobib.parser import to_yaml_many
+from .field_index import field_index
+from .sqlite_backend import SqliteBackend
+from .yaml_backend import YamlBackend
+
+LOGGER = logging.getLogger(__name__)
+
+# The available storage backends.
+BACKENDS = {backend.name: backend for backend in (SqliteBackend, YamlBackend)}
+
+
+def backend():
+    """Returns the storage backend configured via `config.database.backend`."""
+    return BACKENDS[config.database.backend]()
+
+
+def read_database():
+    """Reads the database file.
+
+    The database file pointed to by the configuration file is read in by the configured storage
+    backend (see `backend`). The data is stored as an OrderedDict in the global configuration
+    object.
+    """
+    file = os.path.expanduser(config.database.file)
+    try:
+        LOGGER.info('Loading database file: %s', file)
+        config.bibliography = backend().read(file)
+    except FileNotFoundError:
+        LOGGER.critical("The database file %s does not exist! Please run `cobib init`!", file)
+        sys.exit(1)
+
+
+def lookup(label):
+    """Looks up a single entry.
+
+    If the database has been read (see `read_database`), the entry is taken from the bibliography.
+    Otherwise, it is looked up by the configured storage backend (see `Backend.get`) which may not
+    need to read the entire database.
+
+    Args:
+        label (str): the label of the entry.
+
+    Returns:
+        The entry or None if no entry with the given label exists.
+    """
+    if label in config.bibliography:
+        return config.bibliography[label]
+    file = os.path.expanduser(config.database.file)
+    try:
+        return backend().get(file, label)
+    except FileNotFoundError:
+        LOGGER.critical("The database file %s does not exist! Please run `cobib init`!", file)
+        sys.exit(1)
+
+
+def select(_filter):
+    """Selects the entries which match a filter.
+
+    If the database has been read (see `read_database`), the filter is evaluated on the field index
+    (see `FieldIndex.select`). Otherwise, only the matching entries are read by the configured
+    storage backend (see `Backend.select`) which may not need to read the entire database. These
+    entries make up the bibliography from then on.
+
+    Args:
+        _filter (Filter): the compiled filter (see `cobib.filter.Filter`).
+
+    Returns:
+        The set of labels of the matching entries.
+    """
+    if config.bibliography:
+        return field_index().select(_filter)
+    file = os.path.expanduser(config.database.file)
+    try:
+        config.bibliography = backend().select(file, _filter)
+    except FileNotFoundError:
+        LOGGER.critical("The database file %s does not exist! Please run `cobib init`!", file)
+        sys.exit(1)
+    return set(config.bibliography)
+
+
+def fields():
+    """Returns the names of all fields which occur in the database.
+
+    If the database has been read (see `read_database`), these are taken from the field index.
+    Otherwise, they are looked up by the configured storage backend (see `Backend.fields`).
+
+    Returns:
+        A collection of the field names.
+    """
+    if config.bibliography:
+        return field_index().fields()
+    file = os.path.expanduser(config.database.file)
+    try:
+        return backend().fields(file)
+    except FileNotFoundError:
+        LOGGER.critical("The database file %s does not exist! Please run `cobib init`!", file)
+        sys.exit(1)
+
+
+def write_database(entries):
+    """Writes to the database file.
+
+    Appends the bibliographic data of the provided entries to the database file. If a label already
+    exists in the database, the corresponding entry is skipped.
+
+    Args:
+        entries (list[Entry]): list of new bibliography entries
+
+    Returns:
+        A list of the actually written entries.
+    """
+    new_entries = []
+    for label in entries.keys():
+        if label in config.bibliography.keys():
+            LOGGER.warning("Label %s already exists! Ignoring the new version.", label)
+            continue
+        new_entries.append(label)
+
+    strings = to_yaml_many(entries[label] for label in new_entries)
+    with Transaction() as transaction:
+        for label, string in zip(new_entries, strings):
+            LOGGER.debug('Appending entry to database file: %s', string)
+            transaction.append(label, '\n'.join(string.splitlines()) + '\n')
+
+    return new_entries
+
+
+class Transaction:
+    """Database transaction.
+
+    A transaction collects any number of changes to the database and applies all of them at once
+    when it is committed. It is meant to be used as a context manager which commits the changes upon
+    leaving the context, unless an exception occurred:
+
+        with Transaction() as transaction:
+            transaction.replace(label, entry.to_yaml())
+            transaction.remove(other_label)
+
+    The changes are applied by the configured storage backend (see `backend`) which guarantees that
+    either all or none of them are applied.
+    """
+
+    def __init__(self):
+        """Initializes an empty transaction."""
+        self._changes = OrderedDict()
+        self._appends = []
+        self.changed = []
+
+    def __enter__(self):
+        """Enters the transaction context."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Commits the transaction unless an exception occurred."""
+        if exc_type is None:
+            self.commit()
+        else:
+            LOGGER.warning('Discarding the changes to the database because of: %s', exc_value)
+
+    def replace(self, label, string):
+        """Replaces the YAML document of an existing entry.
+
+        Args:
+            label (str): the label of the entry.
+            string (str): the new YAML document (see `Entry.to_yaml`).
+        """
+        self._changes[str(label)] = string
+
+    def remove(self, label):
+        """Removes the YAML document of an existing entry.
+
+        Args:
+            label (str): the label of the entry.
+        """
+        self._changes[str(label)] = None
+
+    def append(self, label, string):
+        """Appends the YAML document of a new entry.
+
+        Args:
+            label (str): the label of the new entry.
+            string (str): the YAML document (see `Entry.to_yaml`).
+        """
+        self._appends.append((str(label), string))
+
+    def commit(self):
+        """Applies all changes to the database.
+
+        Returns:
+            A list of the labels of the entries which were actually replaced or removed. This list
+            is also stored in the `changed` attribute.
+        """
+        if not self._changes and not self._appends:
+            return self.changed
+        file = os.path.expanduser(config.database.file)
+        self.changed = backend().commit(file, self._changes, self._appends)
+        self._changes = OrderedDict()
+        self._appends = []
+        return self.changed
@@ -0,0 +1,292 @@
+"""CoBib's inverted field index."""
+
+from bisect import bisect_left, insort
+from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
+import logging
+import re
+
+from cobib.config import config
+from cobib.filter import Filter
+from cobib.parser import EntryData
+
+LOGGER = logging.getLogger(__name__)
+
+# The fields whose values are sorted numerically (if possible).
+NUMERIC_FIELDS = {'month', 'number', 'volume', 'year'}
+# The fields whose values are sorted naturally, i.e. with embedded numbers compared numerically.
+NATURAL_FIELDS = {'ID'}
+# Plain filter values consisting of word characters only are looked up in the words of the values.
+WORD_REGEX = re.compile(r'\w+')
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+
+
+def sort_key(field, value):
+    """Computes the sort key of a field value.
+
+    Missing values are sorted first. The values of the `NUMERIC_FIELDS` are compared as numbers
+    (including month names) and sorted before any non-numeric values. The values of the
+    `NATURAL_FIELDS` are compared naturally. All other values are compared case-insensitively while
+    ignoring LaTeX braces.
+
+    Args:
+        field (str): the name of the field.
+        value: the value of the field or None if the field is missing.
+
+    Returns:
+        A tuple which is comparable to the keys of any other value of the same field.
+    """
+    if value is None:
+        return (0,)
+    text = str(value).replace('{', '').replace('}', '').casefold()
+    if field in NUMERIC_FIELDS:
+        if field == 'month' and text[:3] in MONTHS:
+            return (1, 0, MONTHS.index(text[:3]) + 1)
+        try:
+            return (1, 0, float(text))
+        except ValueError:
+            pass
+    if field in NATURAL_FIELDS:
+        return (1, 1, tuple((0, int(part), '') if part.isdigit() else (1, 0, part)
+                            for part in re.split(r'(\d+)', text) if part))
+    return (1, 1, text)
+
+
+class FieldIndex:
+    """Inverted index of the field values of the bibliography.
+
+    For every field, the index maps each distinct value onto the set of labels of the entries which
+    have this value. Additionally, it maps the items of list-like values (e.g. the tags) and the
+    words of all other values onto the labels of the entries containing them. Thus, a plain filter
+    value (see `cobib.filter.Filter`) is looked up directly among the items and, if it consists of
+    word characters only, among the distinct words of the filtered field, which are far fewer than
+    its distinct values. Only other filter values scan the distinct values. In either case, multiple
+    filters are combined through set operations.
+
+    Furthermore, the index provides the labels sorted by a field (see `sorted`). The first request
+    for a field builds a sorted list of the typed sort keys (see `sort_key`) of all entries which is
+    kept sorted from then on. Ties are broken by the order of the database.
+
+    The index is updated incrementally (see `refresh`): only those entries which were added,
+    replaced or modified since the last update are re-indexed.
+    """
+
+    def __init__(self):
+        """Initializes an empty index."""
+        self._bibliography = None
+        self._state = None
+        # label -> (data, revision, values, position) of every indexed entry
+        self._entries = {}
+        # field -> value -> set of labels
+        self._values = defaultdict(lambda: defaultdict(set))
+        # field -> item -> set of labels of the entries whose list-like value contains the item
+        self._items = defaultdict(lambda: defaultdict(set))
+        # field -> word -> set of labels of the entries whose (string) value contains the word
+        self._words = defaultdict(lambda: defaultdict(set))
+        # field -> (sorted list of (key, position, label), label -> key)
+        self._sorted = {}
+        self._positions = 0
+
+    def refresh(self, bibliography):
+        """Updates the index to reflect the current state of the bibliography.
+
+        This is a no-op unless another bibliography is provided, its size changed or any entry was
+        modified since the last update (see `EntryData.generation`).
+
+        Args:
+            bibliography (OrderedDict): the bibliography to index.
+        """
+        if bibliography is self._bibliography and \
+                self._state == (len(bibliography), EntryData.generation):
+            return
+        LOGGER.debug('Updating the field index.')
+        for label in [label for label in self._entries if label not in bibliography]:
+            self._remove(label)
+        # the positions of the entries reflect the order of the database
+        previous = -1
+        ordered = True
+        for label, entry in bibliography.items():
+            data = entry.data
+            indexed = self._entries.get(label, None)
+            if indexed is not None and indexed[0] is data and indexed[1] == data.revision:
+                ordered = ordered and indexed[3] > previous
+                previous = indexed[3]
+                continue
+            if indexed is not None:
+                # a replaced entry keeps its position
+                position = self._remove(label)
+            else:
+                position = self._positions
+                self._positions += 1
+            ordered = ordered and position > previous
+            previous = position
+            self._add(label, data, position)
+        if not ordered:
+            LOGGER.debug('Renumbering the positions of the entries.')
+            for position, label in enumerate(bibliography.keys()):
+                data, revision, values, _ = self._entries[label]
+                self._entries[label] = (data, revision, values, position)
+            self._positions = len(bibliography)
+            self._sorted.clear()
+        self._bibliography = bibliography
+        # accessing the data of lazy entries above may have increased the generation
+        self._state = (len(bibliography), EntryData.generation)
+
+    def fields(self):
+        """Returns the names of all fields which occur in the bibliography.
+
+        The returned view is kept up-to-date with every refresh of the index.
+        """
+        return self._values.keys()
+
+    def sorted(self, field, reverse=False):
+        """Iterates the labels of all entries sorted by a field.
+
+        Args:
+            field (str): the name of the field.
+            reverse (bool): if True, sort in descending order. Ties remain in the order of the
+                            database nonetheless.
+
+        Yields:
+            The labels in sorted order.
+        """
+        if field not in self._sorted:
+            LOGGER.debug('Building the sort index of the "%s" field.', field)
+            keys = {label: sort_key(field, data.get(field, None))
+                    for label, (data, _, _, _) in self._entries.items()}
+            self._sorted[field] = (sorted((key, self._entries[label][3], label)
+                                          for label, key in keys.items()), keys)
+        items = self._sorted[field][0]
+        if not reverse:
+            for _, _, label in items:
+                yield label
+            return
+        for _, ties in groupby(reversed(items), key=itemgetter(0)):
+            for _, _, label in reversed(list(ties)):
+                yield label
+
+    def select(self, _filter):
+        """Selects the entries which match the filter.
+
+        The result is the same as that of the filter applied to every entry: a positive filter item
+        selects the entries whose field matches the value, a negative one all other entries. The
+        selections of all filter items are intersected or, if the filter uses a logical OR, united.
+
+        Args:
+            _filter (Filter): the compiled filter.
+
+        Returns:
+            The set of labels of the matching entries.
+        """
+        selection = set() if _filter.OR else set(self._entries)
+        for field, positive, test, literal in _filter.items:
+            matches = self._matching(field, test, literal)
+            if not positive:
+                matches = set(self._entries) - matches
+            if _filter.OR:
+                selection |= matches
+            else:
+                selection &= matches
+        return selection
+
+    def _matching(self, field, test, literal):
+        """Returns the labels of the entries whose field matches a filter item.
+
+        Args:
+            field (str): the name of the field.
+            test (function): the compiled test of the filter item (see `Filter`).
+            literal (str): the plain value of the filter item or None.
+
+        Returns:
+            The set of labels.
+        """
+        labels = set()
+        if literal is None:
+            for value, entries in self._values.get(field, {}).items():
+                if test(value):
+                    labels |= entries
+            return labels
+        # a list-like value matches if it contains the literal as one of its items
+        labels |= self._items.get(field, {}).get(literal, set())
+        if WORD_REGEX.fullmatch(literal):
+            # the literal can only occur within a single word of a string value
+            for word, entries in self._words.get(field, {}).items():
+                if literal in word:
+                    labels |= entries
+        else:
+            for value, entries in self._values.get(field, {}).items():
+                if isinstance(value, str) and literal in value:
+                    labels |= entries
+        return labels
+
+    def _tokens(self, value):
+        """Returns the token map and the tokens of a normalized value.
+
+        Args:
+            value: the normalized value (see `Filter.normalize`).
+
+        Returns:
+            The items of a list-like value and the `_items` map or the words of any other value and
+            the `_words` map.
+        """
+        if isinstance(value, tuple):
+            return self._items, set(value)
+        return self._words, set(WORD_REGEX.findall(value))
+
+    def _add(self, label, data, position):
+        """Adds an entry to the index.
+
+        Args:
+            label (str): the label of the entry.
+            data (EntryData): the data of the entry.
+            position (int): the position of the entry in the database.
+        """
+        values = {field: Filter.normalize(value) for field, value in data.items()}
+        for field, value in values.items():
+            self._values[field][value].add(label)
+            token_map, tokens = self._tokens(value)
+            for token in tokens:
+                token_map[field][token].add(label)
+        for field, (items, keys) in self._sorted.items():
+            keys[label] = sort_key(field, data.get(field, None))
+            insort(items, (keys[label], position, label))
+        self._entries[label] = (data, data.revision, values, position)
+
+    def _remove(self, label):
+        """Removes an entry from the index.
+
+        Args:
+            label (str): the label of the entry.
+
+        Returns:
+            The position of the removed entry.
+        """
+        _, _, values, position = self._entries.pop(label)
+        for field, value in values.items():
+            token_map, tokens = self._tokens(value)
+            for token in tokens:
+                labels = token_map[field][token]
+                labels.discard(label)
+                if not labels:
+                    del token_map[field][token]
+                    if not token_map[field]:
+                        del token_map[field]
+            labels = self._values[field][value]
+            labels.discard(label)
+            if not labels:
+                del self._values[field][value]
+                if not self._values[field]:
+                    del self._values[field]
+        for items, keys in self._sorted.values():
+            del items[bisect_left(items, (keys.pop(label), position, label))]
+        return position
+
+
+_FIELD_INDEX = FieldIndex()
+
+
+def field_index():
+    """Returns the field index of the currently loaded bibliography (see `FieldIndex`)."""
+    _FIELD_INDEX.refresh(config.bibliography)
+    return _FIELD_INDEX
@@ -0,0 +1,218 @@
+"""CoBib's SQLite database backend."""
+
+from collections import OrderedDict
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+
+from ruamel import yaml
+
+from cobib.parser import Entry
+from .base_backend import Backend
+
+LOGGER = logging.getLogger(__name__)
+
+# The entries are stored in the order in which they were added. The fields of every entry are stored
+# twice: as a JSON object in the `entries` table, from which the entries are constructed, and as
+# field-value pairs in the `fields` table, which is indexed in order to filter the entries. A
+# list-like value is stored as one pair per item.
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    label TEXT NOT NULL UNIQUE,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fields (
+    entry INTEGER NOT NULL REFERENCES entries (id) ON DELETE CASCADE,
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,
+    item INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fields_by_entry ON fields (entry);
+CREATE INDEX IF NOT EXISTS fields_by_value ON fields (field, value);
+'''
+# The version of the `fields` table. Databases with an older version are indexed again.
+FIELDS_VERSION = 1
+# The fields whose values are converted when an entry is read (see `Entry.convert_month`). Their
+# stored values may differ from the filtered ones.
+CONVERTED_FIELDS = {'month'}
+
+
+class SqliteBackend(Backend):
+    """SQLite database backend.
+
+    The database file is an SQLite database. In contrast to the YAML backend, single entries can be
+    looked up (see `get`) and filtered (see `select`) without reading the entire database and
+    changes only touch the affected entries. All changes of a transaction are applied within a
+    single SQLite transaction which also serializes concurrent CoBib processes.
+    """
+
+    name = 'sqlite'
+    indexed = True
+
+    def read(self, file):
+        """See base class."""
+        with contextlib.closing(self._connect(file)) as conn:
+            rows = conn.execute('SELECT label, data FROM entries ORDER BY id').fetchall()
+        bibliography = OrderedDict()
+        for label, data in rows:
+            bibliography[label] = Entry(label, json.loads(data), lazy=True)
+        LOGGER.info('Read %d entries from the database.', len(bibliography))
+        return bibliography
+
+    def select(self, file, _filter):
+        """See base class.
+
+        The candidates of every positive filter item with a plain value (see `cobib.filter.Filter`)
+        are looked up in the `fields` table: an item of a list-like value via the index, a substring
+        of any other value among the values of the filtered field only. Only the candidates are read
+        and the filter is evaluated on them as usual. Negative filter items and those which ignore
+        the case or use regular expressions do not narrow down the candidates.
+        """
+        queries = []
+        params = []
+        for field, positive, _, literal in _filter.items:
+            if positive and literal is not None and field not in CONVERTED_FIELDS:
+                queries.append('SELECT entry FROM fields WHERE field = ? AND '
+                               '(value = ? OR (NOT item AND instr(value, ?) > 0))')
+                params.extend([field, literal, literal])
+            elif _filter.OR:
+                # any entry may match this filter item
+                queries = []
+                break
+        query = 'SELECT label, data FROM entries'
+        if queries:
+            operator = ' UNION ' if _filter.OR else ' INTERSECT '
+            query += ' WHERE id IN (' + operator.join(queries) + ')'
+        else:
+            params = []
+        with contextlib.closing(self._connect(file)) as conn:
+            rows = conn.execute(query + ' ORDER BY id', params).fetchall()
+        LOGGER.info('Read %d candidate entries from the database.', len(rows))
+        bibliography = OrderedDict()
+        for label, data in rows:
+            entry = Entry(label, json.loads(data), lazy=True)
+            if _filter(entry):
+                bibliography[label] = entry
+        return bibliography
+
+    def fields(self, file):
+        """See base class."""
+        with contextlib.closing(self._connect(file)) as conn:
+            return {field for field, in conn.execute('SELECT DISTINCT field FROM fields')}
+
+    def commit(self, file, changes, appends):
+        """See base class."""
+        changed = []
+        with contextlib.closing(self._connect(file)) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for label, string in changes.items():
+                    row = conn.execute('SELECT id FROM entries WHERE label = ?',
+                                       (label,)).fetchone()
+                    if row is None:
+                        LOGGER.warning("No entry with the label '%s' could be found.", label)
+                        continue
+                    LOGGER.debug('Removing the entry "%s".', label)
+                    conn.execute('DELETE FROM entries WHERE id = ?', row)
+                    if string is not None:
+                        # the new version of the entry takes the place of the old one
+                        self._insert(conn, string, row[0])
+                    changed.append(label)
+                for _, string in appends:
+                    self._insert(conn, string)
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        return changed
+
+    def get(self, file, label):
+        """See base class."""
+        with contextlib.closing(self._connect(file)) as conn:
+            row = conn.execute('SELECT data FROM entries WHERE label = ?', (label,)).fetchone()
+        if row is None:
+            return None
+        return Entry(label, json.loads(row[0]), lazy=True)
+
+    @staticmethod
+    def _connect(file):
+        """Connects to the database file.
+
+        Args:
+            file (str): path to the database file.
+
+        Returns:
+            An `sqlite3.Connection` in autocommit mode.
+
+        Raises:
+            FileNotFoundError: if the database file does not exist.
+        """
+        if not os.path.exists(file):
+            # SQLite would silently create a new database
+            raise FileNotFoundError(file)
+        conn = sqlite3.connect(file, isolation_level=None)
+        conn.execute('PRAGMA foreign_keys = ON')
+        conn.executescript(SCHEMA)
+        if conn.execute('PRAGMA user_version').fetchone()[0] < FIELDS_VERSION:
+            SqliteBackend._index_fields(conn)
+        return conn
+
+    @staticmethod
+    def _index_fields(conn):
+        """Indexes the fields of all entries again.
+
+        Args:
+            conn (sqlite3.Connection): the database connection.
+        """
+        LOGGER.info('Indexing the fields of the database.')
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM fields')
+            for entry, data in conn.execute('SELECT id, data FROM entries').fetchall():
+                SqliteBackend._insert_fields(conn, entry, json.loads(data))
+            conn.execute(f'PRAGMA user_version = {FIELDS_VERSION}')
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    @staticmethod
+    def _insert_fields(conn, entry, data):
+        """Inserts the field-value pairs of an entry.
+
+        Args:
+            conn (sqlite3.Connection): the database connection.
+            entry (int): the id of the entry.
+            data (dict): the fields of the entry.
+        """
+        pairs = []
+        for field, value in data.items():
+            if isinstance(value, list):
+                pairs.extend((entry, field, str(item), 1) for item in value)
+            else:
+                pairs.append((entry, field, str(value), 0))
+        conn.executemany('INSERT INTO fields (entry, field, value, item) VALUES (?, ?, ?, ?)',
+                         pairs)
+
+    @staticmethod
+    def _insert(conn, string, position=None):
+        """Inserts the entries of a YAML document.
+
+        An existing entry with the same label is replaced.
+
+        Args:
+            conn (sqlite3.Connection): the database connection.
+            string (str): the YAML document (see `Entry.to_yaml`).
+            position (int, optional): the id to store the (first) entry at.
+        """
+        for label, data in yaml.safe_load(string).items():
+            label = str(label)
+            LOGGER.debug('Inserting the entry "%s".', label)
+            conn.execute('DELETE FROM entries WHERE label = ?', (label,))
+            cursor = conn.execute('INSERT INTO entries (id, label, data) VALUES (?, ?, ?)',
+                                  (position, label, json.dumps(data, default=str)))
+            SqliteBackend._insert_fields(conn, cursor.lastrowid, data)
+            position = None
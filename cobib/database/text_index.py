@@ -0,0 +1,580 @@
+"""CoBib's persistent full-text index."""
+
+import contextlib
+import functools
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import unicodedata
+
+from pylatexenc.latex2text import LatexNodes2Text
+
+from cobib import __version__
+from cobib.config import config
+from cobib.extract import PDF_MAGIC, extract_text
+from cobib.parser import EntryData
+from .cache import cache_file
+
+LOGGER = logging.getLogger(__name__)
+
+# The text of every entry is stored at the row id `2 * id` of the `texts` table and the text of its
+# associated file at the row id `2 * id + 1`, where `id` is the id of the entry in the `entries`
+# table. The trigram tokenizer allows the `texts` table to answer substring queries.
+# The words of the title, the authors, all other fields and the associated file of every entry are
+# stored at the row id `id` of the `words` table in order to rank the entries. The trigrams of all
+# words of this table are stored in the `grams` table in order to look up similar words.
+SCHEMA_VERSION = 2
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    label TEXT NOT NULL UNIQUE,
+    digest TEXT NOT NULL,
+    file TEXT,
+    file_size INTEGER,
+    file_mtime INTEGER,
+    file_indexed INTEGER NOT NULL DEFAULT 0
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS texts USING fts5 (text, tokenize = 'trigram');
+CREATE VIRTUAL TABLE IF NOT EXISTS words USING fts5 (title, author, fields, file);
+CREATE VIRTUAL TABLE IF NOT EXISTS vocabulary USING fts5vocab (words, row);
+CREATE TABLE IF NOT EXISTS terms (
+    term TEXT PRIMARY KEY
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS grams (
+    gram TEXT NOT NULL,
+    term TEXT NOT NULL,
+    PRIMARY KEY (gram, term)
+) WITHOUT ROWID;
+'''
+TABLES = ['meta', 'entries', 'texts', 'words', 'vocabulary', 'terms', 'grams']
+
+# The number of bytes at the beginning of a file which are checked for binary contents.
+BINARY_CHECK_SIZE = 8192
+# The minimum length of a literal for the trigram index to answer a query for it.
+MIN_LITERAL_LENGTH = 3
+# The quantifiers of regular expressions and the minimum number of repetitions of the `{m,n}` form.
+QUANTIFIER_REGEX = re.compile(r'[*+?]|\{(\d*),?\d*\}')
+# The weights of the columns of the `words` table when ranking the entries.
+FIELD_BOOSTS = {'title': 3.0, 'author': 2.0, 'fields': 1.0, 'file': 1.0}
+# The minimum similarity (the Jaccard index of their trigrams) of two words to be considered alike.
+FUZZY_SIMILARITY = 0.4
+# Words of at least this length are also considered alike if they differ by a single edit, because
+# a typo in the middle of a short word leaves only few of its trigrams intact.
+FUZZY_EDIT_LENGTH = 4
+
+
+class TextIndex:
+    """Persistent full-text index of the entries and their associated files.
+
+    The index is an SQLite database which is stored next to the snapshot of the database in the
+    directory configured via `config.database.cache`. It contains the BibLaTeX representation of
+    every entry and the text of its associated file (unless this is a binary file other than a PDF
+    file, whose text is extracted by `cobib.extract`).
+
+    The index answers which entries may match a search query (see `candidates`), such that only
+    these entries need to be searched (see `cobib.search.Query`). Since the query is a regular
+    expression, the index is queried for the literal substrings which every match must contain.
+
+    Furthermore, the index ranks the entries by their relevance for a text query (see `rank`). The
+    relevance is computed by the BM25 function of SQLite over the words of the entries and their
+    associated files with the title and the authors weighted higher (see `FIELD_BOOSTS`).
+    Optionally, the words of the query match similar words, too, in order to tolerate typos.
+
+    The index is updated incrementally (see `refresh`): only the entries whose BibLaTeX
+    representation changed and the files whose size or modification time changed are re-indexed.
+    The entries are not compared at all while the database file and the settings affecting their
+    BibLaTeX representation are unchanged since the last update.
+    """
+
+    def __init__(self):
+        """Initializes the index."""
+        self._bibliography = None
+        self._state = None
+
+    def refresh(self, bibliography):
+        """Updates the index to reflect the current state of the bibliography.
+
+        Args:
+            bibliography (OrderedDict): the bibliography to index.
+        """
+        index_file = self._file()
+        if index_file is None:
+            return
+        try:
+            stat = os.stat(os.path.expanduser(config.database.file))
+            # the BibLaTeX representation of the entries also depends on the CoBib version and the
+            # format of the month (see `Entry.convert_month`)
+            database = f'{__version__}-{config.database.format.month.__name__}-' \
+                f'{stat.st_size}-{stat.st_mtime_ns}-{len(bibliography)}'
+        except OSError:
+            database = None
+        conn = self._connect(index_file)
+        if conn is None:
+            return
+        with contextlib.closing(conn):
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'database'").fetchone()
+                if bibliography is self._bibliography and \
+                        self._state == (len(bibliography), EntryData.generation):
+                    LOGGER.debug('The entries are unchanged since the last update.')
+                elif self._bibliography is None and database is not None and \
+                        row is not None and row[0] == database:
+                    LOGGER.debug('The database file is unchanged since the last update.')
+                else:
+                    self._update_entries(conn, bibliography)
+                self._update_files(conn)
+                if conn.total_changes:
+                    # the revision tells when the words need to be looked up again (see `_similar`)
+                    conn.execute("INSERT INTO meta (key, value) VALUES ('revision', 1) "
+                                 "ON CONFLICT (key) DO UPDATE SET value = value + 1")
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('database', ?)",
+                             (database,))
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        self._bibliography = bibliography
+        # rendering lazy entries above may have increased the generation
+        self._state = (len(bibliography), EntryData.generation)
+
+    def candidates(self, query):
+        """Returns the entries which may match a search query.
+
+        Args:
+            query (Query): the compiled search query.
+
+        Returns:
+            The set of labels of all entries which contain every literal substring of the query or
+            whose associated file could not be indexed. Since the `grep` search backend may find
+            matches in files which the index does not know of, all entries with an associated file
+            are included when it is used. None if the index cannot narrow down the entries, e.g.
+            because it is disabled or the query contains no suitable literals.
+        """
+        index_file = self._file()
+        if index_file is None:
+            return None
+        literals = _literals(query.pattern)
+        if not literals:
+            LOGGER.debug('The query contains no literals to look up in the full-text index.')
+            return None
+        # GLOB is case-sensitive while LIKE ignores the case of ASCII characters
+        operator = 'LIKE' if query.pattern.flags & re.IGNORECASE else 'GLOB'
+        wildcard = '%' if operator == 'LIKE' else '*'
+        unindexed = '' if config.commands.search.backend == 'grep' else ' AND file_indexed = 0'
+        conn = self._connect(index_file)
+        if conn is None:
+            return None
+        with contextlib.closing(conn):
+            rows = conn.execute(
+                'SELECT entries.label FROM texts JOIN entries ON entries.id = texts.rowid / 2 '
+                'WHERE ' + ' AND '.join([f'texts.text {operator} ?'] * len(literals)) + ' '
+                'UNION SELECT label FROM entries WHERE file IS NOT NULL' + unindexed,
+                [wildcard + literal + wildcard for literal in literals]).fetchall()
+        LOGGER.debug('The full-text index found %d candidates.', len(rows))
+        return {label for label, in rows}
+
+    def rank(self, text, top=None, fuzzy=False, labels=None):
+        """Ranks the entries by their relevance for a text query.
+
+        Args:
+            text (str): the text query. Its words are looked up case-insensitively and regardless of
+                        any diacritics. Entries which contain any of them are ranked.
+            top (int, optional): the maximum number of entries to return.
+            fuzzy (bool): if True, the words of the query also match similar words.
+            labels (set, optional): the labels of the entries to rank. By default, all entries are
+                                    ranked.
+
+        Returns:
+            A pair of the list of `(label, score)` pairs of the most relevant entries in descending
+            order of their score and the list of words which were looked up. None if the index is
+            disabled.
+        """
+        index_file = self._file()
+        if index_file is None:
+            return None
+        conn = self._connect(index_file)
+        if conn is None:
+            return None
+        with contextlib.closing(conn):
+            words = sorted(set(_words(text)))
+            if fuzzy:
+                words = sorted({similar for word in words for similar in self._similar(conn, word)})
+            if not words:
+                return [], []
+            weights = ', '.join(str(boost) for boost in FIELD_BOOSTS.values())
+            rows = conn.execute(
+                f'SELECT entries.label, -bm25(words, {weights}) AS score FROM words '
+                'JOIN entries ON entries.id = words.rowid WHERE words MATCH ? '
+                'ORDER BY score DESC, entries.id LIMIT ?',
+                (' OR '.join(f'"{word}"' for word in words),
+                 -1 if top is None or labels is not None else top)).fetchall()
+        if labels is not None:
+            rows = [(label, score) for label, score in rows if label in labels][:top]
+        LOGGER.debug('Ranked %d entries for the words %s.', len(rows), words)
+        return rows, words
+
+    @staticmethod
+    def _similar(conn, word):
+        """Looks up the words of the index which are similar to a word.
+
+        The similarity of two words is the Jaccard index of their sets of trigrams. Additionally,
+        words of at least `FUZZY_EDIT_LENGTH` characters are similar if they differ by a single
+        edit (see `_single_edit`), e.g. a swap of two adjacent characters. The trigrams of all words
+        of the index are stored in the `grams` table which is brought up-to-date with the words of
+        the index first. Only words which share at least one trigram are compared.
+
+        Args:
+            conn (sqlite3.Connection): the index connection.
+            word (str): the word.
+
+        Returns:
+            The list of similar words (including the word itself if it occurs in the index).
+        """
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            revision = conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()
+            grams = conn.execute("SELECT value FROM meta WHERE key = 'grams'").fetchone()
+            if revision != grams:
+                LOGGER.debug('Updating the trigrams of the words of the full-text index.')
+                current = {term for term, in conn.execute('SELECT term FROM vocabulary')}
+                known = {term for term, in conn.execute('SELECT term FROM terms')}
+                for term in known - current:
+                    conn.execute('DELETE FROM terms WHERE term = ?', (term,))
+                    conn.executemany('DELETE FROM grams WHERE gram = ? AND term = ?',
+                                     [(gram, term) for gram in _grams(term)])
+                for term in current - known:
+                    conn.execute('INSERT INTO terms (term) VALUES (?)', (term,))
+                    conn.executemany('INSERT INTO grams (gram, term) VALUES (?, ?)',
+                                     [(gram, term) for gram in _grams(term)])
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('grams', ?)",
+                             (revision[0] if revision else None,))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        grams = _grams(word)
+        rows = conn.execute('SELECT term, COUNT(*) FROM grams WHERE gram IN '
+                            f'({", ".join("?" * len(grams))}) GROUP BY term', sorted(grams))
+        return [term for term, shared in rows
+                if shared / (len(grams) + len(_grams(term)) - shared) >= FUZZY_SIMILARITY or
+                (len(word) >= FUZZY_EDIT_LENGTH and _single_edit(word, term))]
+
+    @staticmethod
+    def _file():
+        """Returns the path of the index file or None if the cache is disabled."""
+        return cache_file(os.path.expanduser(config.database.file), 'text.sqlite')
+
+    @staticmethod
+    def _connect(index_file):
+        """Connects to the index file.
+
+        Args:
+            index_file (str): path to the index file.
+
+        Returns:
+            An `sqlite3.Connection` in autocommit mode or None if SQLite does not support the
+            full-text index.
+        """
+        os.makedirs(os.path.dirname(index_file), exist_ok=True)
+        conn = sqlite3.connect(index_file, isolation_level=None)
+        try:
+            if conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                LOGGER.debug('Creating the full-text index %s.', index_file)
+                conn.executescript(''.join(f'DROP TABLE IF EXISTS {table};\n'
+                                           for table in reversed(TABLES)))
+                conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.executescript(SCHEMA)
+        except sqlite3.OperationalError as exc:
+            LOGGER.warning('The full-text index is not available: %s', exc)
+            conn.close()
+            return None
+        return conn
+
+    @staticmethod
+    def _update_entries(conn, bibliography):
+        """Re-indexes the added or changed entries and removes the deleted ones.
+
+        Args:
+            conn (sqlite3.Connection): the index connection.
+            bibliography (OrderedDict): the bibliography to index.
+        """
+        LOGGER.debug('Updating the entries of the full-text index.')
+        stored = {label: (idx, digest)
+                  for idx, label, digest in conn.execute('SELECT id, label, digest FROM entries')}
+        for label, entry in bibliography.items():
+            text = entry.to_bibtex()
+            digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+            idx, stored_digest = stored.pop(label, (None, None))
+            if stored_digest == digest:
+                continue
+            LOGGER.debug('Indexing the entry "%s".', label)
+            if idx is not None:
+                TextIndex._delete(conn, idx)
+            idx = conn.execute('INSERT INTO entries (label, digest, file) VALUES (?, ?, ?)',
+                               (label, digest, entry.file)).lastrowid
+            conn.execute('INSERT INTO texts (rowid, text) VALUES (?, ?)', (2 * idx, text))
+            data = entry.data
+            conn.execute('INSERT INTO words (rowid, title, author, fields) VALUES (?, ?, ?, ?)',
+                         (idx, _plain(data.get('title', '')), _plain(data.get('author', '')),
+                          ' '.join(_plain(value) for field, value in data.items()
+                                   if field not in ('title', 'author', 'file'))))
+        for idx, _ in stored.values():
+            TextIndex._delete(conn, idx)
+
+    @staticmethod
+    def _update_files(conn):
+        """Re-indexes the associated files whose size or modification time changed.
+
+        Args:
+            conn (sqlite3.Connection): the index connection.
+        """
+        rows = conn.execute('SELECT id, file, file_size, file_mtime FROM entries '
+                            'WHERE file IS NOT NULL').fetchall()
+        for idx, file, size, mtime in rows:
+            try:
+                stat = os.stat(file)
+                current = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                # a missing file is indexed as an empty one
+                current = (-1, -1)
+            if current == (size, mtime):
+                continue
+            conn.execute('DELETE FROM texts WHERE rowid = ?', (2 * idx + 1,))
+            text = _read_text(file) if current != (-1, -1) else ''
+            if text:
+                LOGGER.debug('Indexing the associated file %s.', file)
+                conn.execute('INSERT INTO texts (rowid, text) VALUES (?, ?)', (2 * idx + 1, text))
+            conn.execute('UPDATE words SET file = ? WHERE rowid = ?', (text or '', idx))
+            conn.execute('UPDATE entries SET file_size = ?, file_mtime = ?, file_indexed = ? '
+                         'WHERE id = ?', (*current, int(text is not None), idx))
+
+    @staticmethod
+    def _delete(conn, idx):
+        """Removes an entry and the text of its associated file from the index.
+
+        Args:
+            conn (sqlite3.Connection): the index connection.
+            idx (int): the id of the entry.
+        """
+        conn.execute('DELETE FROM entries WHERE id = ?', (idx,))
+        conn.execute('DELETE FROM texts WHERE rowid IN (?, ?)', (2 * idx, 2 * idx + 1))
+        conn.execute('DELETE FROM words WHERE rowid = ?', (idx,))
+
+
+def _read_text(file):
+    """Reads the text of an associated file.
+
+    Args:
+        file (str): path to the file.
+
+    Returns:
+        The text of the file (see `cobib.extract` for PDF files) or None if it is a binary file or
+        could not be read.
+    """
+    try:
+        with open(file, 'rb') as stream:
+            data = stream.read()
+    except OSError as exc:
+        LOGGER.warning('Could not index the associated file %s: %s', file, exc)
+        return None
+    if data.startswith(PDF_MAGIC):
+        return extract_text(file)
+    if b'\0' in data[:BINARY_CHECK_SIZE]:
+        LOGGER.debug('Not indexing the binary file %s.', file)
+        return None
+    return data.decode('utf-8', errors='replace')
+
+
+@functools.lru_cache(maxsize=None)
+def _latex_decoder():
+    """Returns the decoder used to convert LaTeX into plain text."""
+    return LatexNodes2Text()
+
+
+def _plain(value):
+    """Converts a field value into plain text.
+
+    Args:
+        value: the value of a field.
+
+    Returns:
+        The value without any LaTeX markup.
+    """
+    value = str(value)
+    if '\\' not in value and '{' not in value and '$' not in value:
+        return value
+    try:
+        return _latex_decoder().latex_to_text(value)
+    except Exception:  # pylint: disable=broad-except
+        return value
+
+
+def _words(text):
+    """Splits a text into the words of the index.
+
+    Like the default tokenizer of SQLite's full-text search, the words are case-folded and their
+    diacritics are removed.
+
+    Args:
+        text (str): the text.
+
+    Returns:
+        The list of words.
+    """
+    text = unicodedata.normalize('NFKD', text.casefold())
+    return re.findall(r'[^\W_]+', ''.join(char for char in text if not unicodedata.combining(char)))
+
+
+def _grams(word):
+    """Returns the set of trigrams of a word which is padded on both sides."""
+    word = f'${word}$'
+    return {word[idx:idx+3] for idx in range(len(word) - 2)}
+
+
+def _single_edit(first, second):
+    """Checks whether two words differ by at most a single edit.
+
+    An edit is the insertion, deletion or substitution of a character or the transposition of two
+    adjacent characters.
+
+    Args:
+        first (str): a word.
+        second (str): another word.
+
+    Returns:
+        Whether the words are equal up to a single edit.
+    """
+    if abs(len(first) - len(second)) > 1:
+        return False
+    if len(first) > len(second):
+        first, second = second, first
+    prefix = 0
+    while prefix < len(first) and first[prefix] == second[prefix]:
+        prefix += 1
+    if len(first) < len(second):
+        # an insertion
+        return first[prefix:] == second[prefix+1:]
+    if first[prefix+1:] == second[prefix+1:]:
+        # a substitution (or no edit at all)
+        return True
+    # a transposition
+    return first[prefix:prefix+2] == second[prefix+1:prefix+2] + second[prefix:prefix+1] and \
+        first[prefix+2:] == second[prefix+2:]
+
+
+def _literals(pattern):
+    """Extracts the literal substrings which every match of a regular expression must contain.
+
+    The regular expression is scanned for runs of literal characters. The scan is conservative: a
+    character which is followed by an optional quantifier (e.g. `?` or `*`) and the literals of an
+    optional group are left out, while expressions with alternations, extension groups (`(?...)`)
+    or the verbose flag are not scanned at all.
+
+    Only literals which are long enough to be looked up in the trigram index are returned. When the
+    case is ignored, only ASCII literals are returned because SQLite ignores the case of ASCII
+    characters only.
+
+    Args:
+        pattern (re.Pattern): the compiled regular expression.
+
+    Returns:
+        A list of literal strings. This is empty if the regular expression could not be scanned.
+    """
+    text = pattern.pattern
+    if pattern.flags & re.VERBOSE:
+        return []
+    literals = []
+    # the number of literals in front of every open group
+    groups = []
+    run = ''
+    idx = 0
+    while idx < len(text):
+        char = text[idx]
+        idx += 1
+        literal = group = None
+        if char == '\\':
+            char = text[idx:idx+1]
+            idx += 1
+            if char and not char.isalnum():
+                literal = char
+        elif char == '[':
+            idx = _class_end(text, idx)
+        elif char == '(':
+            if text.startswith('?', idx):
+                if not text.startswith('?:', idx):
+                    return []
+                idx += 2
+            groups.append(len(literals) + 1)
+        elif char == ')':
+            group = groups.pop()
+        elif char == '|':
+            return []
+        elif char not in '.^$':
+            literal = char
+        if literal is not None:
+            run += literal
+        else:
+            literals.append(run)
+            run = ''
+        quantifier = QUANTIFIER_REGEX.match(text, idx)
+        if quantifier is None:
+            continue
+        idx = quantifier.end()
+        optional = quantifier.group() in ('*', '?') or \
+            (quantifier.group().startswith('{') and int(quantifier.group(1) or 0) == 0)
+        if literal is not None:
+            # the repeated character is not adjacent to the following ones
+            literals.append(run[:-1] if optional else run)
+            run = ''
+        elif group is not None and optional:
+            del literals[group:]
+        if text[idx:idx+1] in ('?', '+'):
+            # a lazy or possessive quantifier
+            idx += 1
+    literals.append(run)
+    if pattern.flags & re.IGNORECASE:
+        literals = [part for literal in literals for part in re.split(r'[^\x00-\x7f]', literal)]
+    # the wildcards of LIKE and GLOB cannot be escaped in queries of the trigram index
+    literals = [part for literal in literals for part in re.split(r'[%_*?\[\]]', literal)]
+    return sorted({literal for literal in literals if len(literal) >= MIN_LITERAL_LENGTH})
+
+
+def _class_end(text, idx):
+    """Finds the end of a character class of a regular expression.
+
+    Args:
+        text (str): the regular expression.
+        idx (int): the position after the opening `[` of the character class.
+
+    Returns:
+        The position after the closing `]` of the character class.
+    """
+    if text.startswith('^', idx):
+        idx += 1
+    if text.startswith(']', idx):
+        # a leading `]` is a literal
+        idx += 1
+    while idx < len(text):
+        if text[idx] == '\\':
+            idx += 2
+        elif text[idx] == ']':
+            return idx + 1
+        else:
+            idx += 1
+    return idx
+
+
+_TEXT_INDEX = TextIndex()
+
+
+def text_index():
+    """Returns the full-text index of the currently loaded bibliography (see `TextIndex`)."""
+    _TEXT_INDEX.refresh(config.bibliography)
+    return _TEXT_INDEX
@@ -0,0 +1,701 @@
+"""CoBib's YAML database backend."""
+
+from collections import OrderedDict
+import atexit
+import concurrent.futures
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import pickle
+import re
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    # advisory file locks are not supported on this platform
+    fcntl = None
+
+from cobib import __version__
+from cobib.config import config
+from cobib.parser import Entry, to_yaml_many
+from .base_backend import Backend
+from .cache import cache_file
+
+LOGGER = logging.getLogger(__name__)
+
+# Each YAML document of the database file starts with a `---` and ends with a `...` line.
+DOCUMENT_REGEX = re.compile(rb'^---[ \t]*\r?\n.*?^\.\.\.[ \t]*(?:\r?\n|\Z)',
+                            re.MULTILINE | re.DOTALL)
+
+# The layout of the pickled entries. It must be increased whenever the attributes of `Entry` change
+# such that snapshots written by a development version of CoBib are not reused after an update.
+SNAPSHOT_FORMAT = 5
+
+# The index of the most recently read database file. Each of its documents is stored as a tuple of
+# the start and end byte offsets, the SHA-1 hash of its contents and the labels defined in it. The
+# size and modification time of the file are stored to detect whether the index is still up-to-date.
+# The labels entry maps each label onto the positions of the documents defining it in the index. A
+# label is defined by more than one document only if the database file was edited by hand.
+_INDEX = {'file': None, 'key': None, 'size': None, 'mtime': None, 'documents': [], 'labels': {}}
+# Whether the index in memory has changed since it was last stored next to the database snapshot.
+_INDEX_CHANGED = {'pending': False, 'registered': False}
+
+
+class YamlBackend(Backend):
+    """YAML database backend.
+
+    The database file is a stream of YAML documents (delimited by `---` and `...`), one for each
+    entry. Each document is indexed by its byte offsets and the hash of its contents. When the
+    database file is read again, only those documents which were added or changed since the last
+    read are parsed; all other entries are re-used.
+
+    If a snapshot cache directory is configured, the parsed entries are additionally stored in a
+    binary snapshot. As long as the database file remains unchanged, subsequent reads load this
+    snapshot instead of parsing the YAML file again.
+
+    Existing entries are never modified in-place. Instead, the new contents of the database file are
+    written to a temporary file which is synced to disk and then renamed to replace the database
+    file. Thus, the database file contains either its old or its new contents at all times, even if
+    CoBib is interrupted. New entries, however, are simply appended to the file. Furthermore, unless
+    `config.database.lock` is disabled, an advisory lock is held while committing, such that
+    concurrent CoBib processes can not overwrite each other's changes.
+    """
+
+    name = 'yaml'
+
+    def read(self, file):
+        """See base class."""
+        try:
+            stat = os.stat(file)
+            with open(file, 'rb') as bib:
+                data = bib.read()
+            if _INDEX['file'] == file and _INDEX['key'] == _snapshot_key():
+                # the database was read before: only parse the documents which changed since then
+                reusable = _reusable_entries(_INDEX['documents'], config.bibliography)
+                return _read_documents(file, stat, data, reusable)
+            snapshot = _load_snapshot(file)
+            if snapshot is not None and _snapshot_is_valid(file, snapshot, stat, data):
+                LOGGER.info('Using the database snapshot.')
+                if snapshot['documents'] is None:
+                    # the database file could not be indexed
+                    _INDEX.update(file=None, documents=[], labels={})
+                else:
+                    _set_index(file, stat, snapshot['documents'], store=False)
+                return snapshot['entries']
+            reusable = {}
+            if snapshot is not None and snapshot['documents'] is not None:
+                # even an outdated snapshot provides all of the unchanged entries
+                reusable = _reusable_entries(snapshot['documents'], snapshot['entries'])
+            bibliography = _read_documents(file, stat, data, reusable)
+            _store_snapshot(file, stat, data, bibliography)
+            return bibliography
+        except AttributeError:
+            LOGGER.debug('Initializing an empty database.')
+            _INDEX.update(file=None, documents=[], labels={})
+            return OrderedDict()
+
+    def commit(self, file, changes, appends):
+        """See base class.
+
+        The entries to be replaced or removed are located via the index of the database file (see
+        `locate`). After writing, the index is updated such that subsequent transactions do not need
+        to scan the database file again. The updated index is only stored next to the database
+        snapshot when CoBib exits (see `_store_index_at_exit`) such that a command committing many
+        transactions (e.g. `add --bibtex`) does not rewrite it every time. Transactions which only
+        append new entries leave all existing entries untouched. Thus, these are written to the end
+        of the database file directly rather than rewriting the entire file.
+
+        If the database file can not be indexed, the entire file is rewritten from its parsed
+        entries instead (see `_rewrite`).
+        """
+        with _lock(file):
+            indexed = _ensure_index()
+            if changes and not indexed:
+                LOGGER.warning('The database file could not be indexed. Rewriting it entirely.')
+                return _rewrite(file, config.bibliography, changes, appends)
+            positions = {}
+            changed = []
+            for label, string in changes.items():
+                found = _INDEX['labels'].get(label, None)
+                if not found:
+                    LOGGER.warning("No entry with the label '%s' could be found.", label)
+                    continue
+                LOGGER.debug('Entry "%s" found at %s.', label,
+                             [_INDEX['documents'][position][:2] for position in found])
+                # the last document of a duplicate label defines the entry: the others are removed
+                for position in found[:-1]:
+                    positions[position] = None
+                positions[found[-1]] = string
+                changed.append(label)
+            if positions:
+                with open(file, 'rb') as bib:
+                    data = bib.read()
+                data, documents = _apply(data, _INDEX['documents'], positions, appends)
+                _write_atomically(file, data)
+                _set_index(file, os.stat(file), documents, store=False)
+            else:
+                documents = _append(file, appends)
+                if indexed:
+                    _extend_index(os.stat(file), documents)
+            if indexed:
+                _store_index_at_exit()
+        return changed
+
+
+def locate(label):
+    """Locates the YAML document of an entry in the database file.
+
+    The lookup is based on the index of the database file. If the index in memory is out-of-date,
+    the index stored next to the database snapshot is used. Only if that is out-of-date, too, the
+    database file is read again.
+
+    Args:
+        label (str): the label of the entry.
+
+    Returns:
+        A tuple of the start and end byte offsets of the YAML document in the database file or None
+        if no entry with the given label exists. If several documents define the label, the last
+        one is returned because it defines the entry.
+    """
+    if not _ensure_index():
+        return None
+    found = _INDEX['labels'].get(str(label), None)
+    if not found:
+        return None
+    start, end, _, _ = _INDEX['documents'][found[-1]]
+    return (start, end)
+
+
+@contextlib.contextmanager
+def _lock(file):
+    """Holds an advisory lock on the database file while the context is active.
+
+    The lock is placed on the directory containing the database file rather than on the file itself
+    because the file is replaced upon writing. The lock can be disabled via `config.database.lock`.
+
+    Args:
+        file (str): path to the database file.
+    """
+    if not config.database.lock or fcntl is None:
+        yield
+        return
+    directory = os.path.dirname(os.path.realpath(file))
+    descriptor = os.open(directory, os.O_RDONLY)
+    try:
+        LOGGER.debug('Acquiring the lock on %s.', directory)
+        fcntl.flock(descriptor, fcntl.LOCK_EX)
+        yield
+    finally:
+        # closing the descriptor releases the lock
+        os.close(descriptor)
+
+
+def _write_atomically(file, data, sync=True):
+    """Replaces the contents of a file atomically.
+
+    The data is written to a temporary file in the same directory which is then renamed to replace
+    the original file. Thus, the file contains either its old or its new contents at all times, even
+    if CoBib is interrupted while writing.
+
+    Args:
+        file (str): path to the file.
+        data (bytes): the new contents of the file.
+        sync (bool, optional): whether to sync the file and its directory to disk. This ensures that
+                               the new contents survive a system crash.
+    """
+    # resolve symbolic links in order to replace their target rather than the link itself
+    file = os.path.realpath(file)
+    directory = os.path.dirname(file)
+    LOGGER.debug('Atomically writing %d bytes to %s.', len(data), file)
+    descriptor, tmp_file = tempfile.mkstemp(prefix=f'.{os.path.basename(file)}.', dir=directory)
+    try:
+        with os.fdopen(descriptor, 'wb') as tmp:
+            tmp.write(data)
+            if sync:
+                tmp.flush()
+                os.fsync(tmp.fileno())
+        if os.path.exists(file):
+            # temporary files are only accessible by their owner: preserve the original permissions
+            os.chmod(tmp_file, os.stat(file).st_mode & 0o777)
+        os.replace(tmp_file, file)
+    except BaseException:
+        os.remove(tmp_file)
+        raise
+    if sync:
+        # the rename itself is only persistent once the directory has been synced, too
+        descriptor = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+
+def _apply(data, documents, changes, appends):
+    """Applies the changes to the contents of the database file.
+
+    Args:
+        data (bytes): the contents of the database file.
+        documents (list[tuple]): the index of the database file.
+        changes (dict): maps the positions of the changed documents in the index onto their new
+                        YAML document or None if they are to be removed.
+        appends (list[tuple]): the labels and YAML documents of the new entries.
+
+    Returns:
+        The new contents of the database file and the updated index.
+    """
+    end_of_documents = documents[-1][1] if documents else len(data)
+    first = min(changes) if changes else len(documents)
+    offset = documents[first][0] if first < len(documents) else end_of_documents
+    # the documents in front of the first change remain untouched
+    pieces = [data[:offset]]
+    new_documents = documents[:first]
+    position = offset
+    for idx, (start, end, digest, labels) in enumerate(documents[first:], start=first):
+        if idx not in changes:
+            piece = data[start:end]
+        elif changes[idx] is None:
+            LOGGER.debug('Removing the document of "%s".', '", "'.join(map(str, labels)))
+            continue
+        else:
+            LOGGER.debug('Replacing the document of "%s".', '", "'.join(map(str, labels)))
+            piece = changes[idx].encode('utf-8')
+            # the new document is parsed when the database is read again
+            digest = None
+        pieces.append(piece)
+        new_documents.append((position, position + len(piece), digest, labels))
+        position += len(piece)
+    # keep anything which trails the last document (e.g. whitespace)
+    pieces.append(data[end_of_documents:])
+    data = b''.join(pieces)
+    appended, documents = _appended(data, len(data), appends)
+    return data + appended, new_documents + documents
+
+
+def _rewrite(file, bibliography, changes, appends):
+    """Rewrites the entire database file from its parsed entries.
+
+    Afterwards, every entry is enclosed by a `---` and a `...` line such that the database file can
+    be indexed again.
+
+    Args:
+        file (str): path to the database file.
+        bibliography (OrderedDict): the entries parsed from the database file.
+        changes (dict): maps the labels of the changed entries onto their new YAML document or None
+                        if they are to be removed.
+        appends (list[tuple]): the labels and YAML documents of the new entries.
+
+    Returns:
+        A list of the labels of the entries which were actually replaced or removed.
+    """
+    labels = {str(label): label for label in bibliography}
+    changed = []
+    for label in changes:
+        if label not in labels:
+            LOGGER.warning("No entry with the label '%s' could be found.", label)
+            continue
+        changed.append(label)
+    unchanged = [label for label in labels if label not in changes]
+    strings = dict(zip(unchanged, to_yaml_many(bibliography[labels[label]] for label in unchanged)))
+    strings.update(changes)
+    pieces = ['\n'.join(strings[label].splitlines()) + '\n' for label in labels
+              if strings[label] is not None]
+    pieces.extend(string for _, string in appends)
+    _write_atomically(file, ''.join(pieces).encode('utf-8'))
+    return changed
+
+
+def _append(file, appends):
+    """Appends the new documents to the end of the database file.
+
+    Args:
+        file (str): path to the database file.
+        appends (list[tuple]): the labels and YAML documents of the new entries.
+
+    Returns:
+        The index of the appended documents.
+    """
+    with open(file, 'rb+') as bib:
+        size = bib.seek(0, os.SEEK_END)
+        last = b''
+        if size:
+            bib.seek(size - 1)
+            last = bib.read(1)
+        appended, new_documents = _appended(last, size, appends)
+        LOGGER.debug('Appending %d bytes to %s.', len(appended), file)
+        bib.write(appended)
+        bib.flush()
+        os.fsync(bib.fileno())
+    return new_documents
+
+
+def _appended(data, size, appends):
+    """Joins the new documents which are to be appended.
+
+    Args:
+        data (bytes): the contents (or at least the last byte) of the database file.
+        size (int): the size of the database file.
+        appends (list[tuple]): the labels and YAML documents of the new entries.
+
+    Returns:
+        The bytes to be appended and the index of the new documents.
+    """
+    pieces = []
+    if appends and data and not data.endswith(b'\n'):
+        pieces.append(b'\n')
+        size += 1
+    documents = []
+    for label, string in appends:
+        LOGGER.debug('Appending the document of "%s".', label)
+        piece = string.encode('utf-8')
+        pieces.append(piece)
+        documents.append((size, size + len(piece), None, [label]))
+        size += len(piece)
+    return b''.join(pieces), documents
+
+
+def _ensure_index():
+    """Ensures that the index in memory matches the current database file.
+
+    Returns:
+        Whether the database file could be indexed.
+    """
+    file = os.path.expanduser(config.database.file)
+    stat = os.stat(file)
+    if _INDEX['file'] == file and (_INDEX['size'], _INDEX['mtime']) == \
+            (stat.st_size, stat.st_mtime_ns):
+        return True
+    index = _load_index(file)
+    if index is not None and (index['size'], index['mtime']) == (stat.st_size, stat.st_mtime_ns):
+        LOGGER.debug('Using the stored index of the database file.')
+        _set_index(file, stat, [tuple(document) for document in index['documents']], store=False)
+        return True
+    LOGGER.debug('The index of the database file is out-of-date.')
+    config.bibliography = YamlBackend().read(file)
+    return _INDEX['file'] == file
+
+
+def _set_index(file, stat, documents, store=True):
+    """Sets the index of the database file.
+
+    Args:
+        file (str): path to the database file.
+        stat (os.stat_result): the stat result of the database file.
+        documents (list[tuple]): the indexed documents.
+        store (bool, optional): whether to store the index next to the database snapshot.
+    """
+    _INDEX.update(file=file, key=_snapshot_key(), size=stat.st_size, mtime=stat.st_mtime_ns,
+                  documents=documents)
+    _INDEX['labels'] = {}
+    _index_labels(documents, 0)
+    if store:
+        _store_index(file)
+
+
+def _extend_index(stat, documents):
+    """Extends the index of the database file by the documents which were appended to it.
+
+    Unlike `_set_index`, this only indexes the new documents.
+
+    Args:
+        stat (os.stat_result): the stat result of the database file.
+        documents (list[tuple]): the appended documents.
+    """
+    start = len(_INDEX['documents'])
+    _INDEX['documents'].extend(documents)
+    _INDEX.update(size=stat.st_size, mtime=stat.st_mtime_ns)
+    _index_labels(documents, start)
+
+
+def _index_labels(documents, start):
+    """Maps the labels of the documents onto their positions in the index.
+
+    Args:
+        documents (list[tuple]): the indexed documents.
+        start (int): the position of the first of the documents in the index.
+    """
+    for idx, (_, _, _, labels) in enumerate(documents, start=start):
+        for label in labels:
+            _INDEX['labels'].setdefault(str(label), []).append(idx)
+
+
+def _split_documents(data):
+    """Splits the contents of the database file into its YAML documents.
+
+    Args:
+        data (bytes): the contents of the database file.
+
+    Returns:
+        A list of `(start, end)` byte offsets of the documents or None if the contents do not
+        consist of explicitly delimited documents only.
+    """
+    documents = []
+    position = 0
+    for match in DOCUMENT_REGEX.finditer(data):
+        if data[position:match.start()].strip() or b'\n---' in match.group():
+            # either some content lies outside of a document or a document is not terminated
+            return None
+        documents.append(match.span())
+        position = match.end()
+    if data[position:].strip():
+        return None
+    return documents
+
+
+def _reusable_entries(documents, bibliography):
+    """Gathers the entries which may be re-used when the database file is read again.
+
+    Args:
+        documents (list[tuple]): the document index of the previous read.
+        bibliography (dict): the entries of the previous read.
+
+    Returns:
+        A dictionary mapping the hash of each document to the list of `(label, entry)` pairs which
+        were parsed from it.
+    """
+    reusable = {}
+    for _, _, digest, labels in documents:
+        if all(label in bibliography for label in labels):
+            reusable[digest] = [(label, bibliography[label]) for label in labels]
+    return reusable
+
+
+def _read_documents(file, stat, data, reusable):
+    """Parses the documents of the database file.
+
+    Args:
+        file (str): path to the database file.
+        stat (os.stat_result): the stat result of the database file.
+        data (bytes): the contents of the database file.
+        reusable (dict): the already parsed entries as returned by `_reusable_entries`.
+
+    Returns:
+        An OrderedDict containing the bibliography as per the provided YAML data.
+    """
+    documents = _split_documents(data)
+    if documents is None:
+        LOGGER.warning('The database file %s could not be indexed. Parsing it as a whole.', file)
+        _INDEX.update(file=None, documents=[], labels={})
+        return Entry.from_yaml(data.decode('utf-8'), string=True)
+    digests = [hashlib.sha1(data[start:end]).hexdigest() for start, end in documents]
+    entries = [reusable.pop(digest, None) for digest in digests]
+    unparsed = [idx for idx, reused in enumerate(entries) if reused is None]
+    strings = [data[slice(*documents[idx])].decode('utf-8') for idx in unparsed]
+    for idx, parsed in zip(unparsed, _parse_documents_in_parallel(strings)):
+        entries[idx] = parsed
+    LOGGER.info('Parsed %d out of %d documents of the database file.', len(unparsed),
+                len(documents))
+    bibliography = OrderedDict()
+    index = []
+    for (start, end), digest, document in zip(documents, digests, entries):
+        labels = []
+        for label, entry in document:
+            bibliography[label] = entry
+            labels.append(label)
+        index.append((start, end, digest, labels))
+    _set_index(file, stat, index)
+    return bibliography
+
+
+def _parse_documents(strings):
+    """Parses YAML documents.
+
+    Args:
+        strings (list[str]): the YAML documents.
+
+    Returns:
+        A list with the list of (label, entry) pairs defined by each document.
+    """
+    if not strings:
+        return []
+    # parsing all documents as a single stream is considerably faster than parsing them one by one
+    entries = list(Entry.from_yaml(''.join(strings), string=True).items())
+    if len(entries) == len(strings):
+        return [[entry] for entry in entries]
+    # some documents define more (or less) than one entry: their entries can not be told apart
+    return [list(Entry.from_yaml(string, string=True).items()) for string in strings]
+
+
+def _parse_documents_in_parallel(strings):
+    """Parses YAML documents in multiple processes.
+
+    The documents are parsed in a pool of `config.database.parallel.processes` processes, if their
+    number reaches `config.database.parallel.threshold`. Otherwise, they are parsed sequentially
+    because starting the processes and transferring the entries back outweighs the gain.
+
+    Args:
+        strings (list[str]): the YAML documents.
+
+    Returns:
+        A list with the list of (label, entry) pairs defined by each document, in the same order.
+    """
+    processes = config.database.parallel.processes or os.cpu_count() or 1
+    if processes < 2 or not strings or len(strings) < config.database.parallel.threshold:
+        return _parse_documents(strings)
+    LOGGER.debug('Parsing %d documents in %d processes.', len(strings), processes)
+    # a few batches per process balance the load without transferring too many small messages
+    size = -(-len(strings) // (4 * processes))
+    batches = [strings[idx:idx+size] for idx in range(0, len(strings), size)]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        return [parsed for batch in executor.map(_parse_documents, batches) for parsed in batch]
+
+
+def _snapshot_key():
+    """Returns the settings which must match for parsed entries to be re-usable.
+
+    The snapshot contains fully initialized entries. Thus, it becomes invalid when either the CoBib
+    version or any setting affecting the entry initialization changes.
+    """
+    return (__version__, SNAPSHOT_FORMAT, config.database.format.month.__name__)
+
+
+def _load_snapshot(file):
+    """Loads the snapshot of the database file.
+
+    Args:
+        file (str): path to the database file.
+
+    Returns:
+        The snapshot dictionary or None if no compatible snapshot exists.
+    """
+    snapshot_file = cache_file(file, 'pickle')
+    if snapshot_file is None or not os.path.exists(snapshot_file):
+        return None
+    try:
+        with open(snapshot_file, 'rb') as snapshot:
+            snapshot = pickle.load(snapshot)
+    except (OSError, EOFError, AttributeError, ImportError, pickle.UnpicklingError) as exc:
+        LOGGER.warning('Ignoring the unreadable database snapshot %s: %s', snapshot_file, exc)
+        return None
+    if snapshot.get('key') != _snapshot_key():
+        LOGGER.debug('Discarding the incompatible database snapshot %s.', snapshot_file)
+        return None
+    LOGGER.debug('Loaded database snapshot: %s', snapshot_file)
+    return snapshot
+
+
+def _snapshot_is_valid(file, snapshot, stat, data):
+    """Checks whether the snapshot matches the current contents of the database file.
+
+    This is the case if the file's size and modification time are unchanged. If only the
+    modification time changed (e.g. because the file was touched or checked out again), the snapshot
+    remains valid as long as the SHA-256 hash of the file contents matches.
+
+    Args:
+        file (str): path to the database file.
+        snapshot (dict): the snapshot as returned by `_load_snapshot`.
+        stat (os.stat_result): the stat result of the database file.
+        data (bytes): the contents of the database file.
+
+    Returns:
+        Whether the snapshot is valid.
+    """
+    if snapshot['size'] != stat.st_size:
+        return False
+    if snapshot['mtime'] != stat.st_mtime_ns:
+        if snapshot['digest'] != hashlib.sha256(data).hexdigest():
+            return False
+        # the contents are unchanged: refresh the modification time to speed up the next load
+        snapshot.update(mtime=stat.st_mtime_ns)
+        _write_snapshot(file, snapshot)
+    return True
+
+
+def _store_snapshot(file, stat, data, bibliography):
+    """Stores a snapshot of the database.
+
+    Args:
+        file (str): path to the database file.
+        stat (os.stat_result): the stat result of the database file.
+        data (bytes): the contents of the database file.
+        bibliography (OrderedDict): the entries parsed from the database file.
+    """
+    _write_snapshot(file, {
+        'key': _snapshot_key(),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime_ns,
+        'digest': hashlib.sha256(data).hexdigest(),
+        # the documents are None if the database file could not be indexed
+        'documents': _INDEX['documents'] if _INDEX['file'] == file else None,
+        'entries': bibliography,
+    })
+
+
+def _write_snapshot(file, snapshot):
+    """Writes the snapshot of the database file.
+
+    The snapshot is written atomically (see `_write_atomically`) such that an interrupted write can
+    never leave a corrupted snapshot behind.
+
+    Args:
+        file (str): path to the database file.
+        snapshot (dict): the snapshot dictionary.
+    """
+    snapshot_file = cache_file(file, 'pickle')
+    if snapshot_file is None:
+        return
+    LOGGER.debug('Storing database snapshot: %s', snapshot_file)
+    try:
+        os.makedirs(os.path.dirname(snapshot_file), exist_ok=True)
+        _write_atomically(snapshot_file, pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL),
+                          sync=False)
+    except (OSError, pickle.PicklingError) as exc:
+        LOGGER.warning('Could not store the database snapshot %s: %s', snapshot_file, exc)
+
+
+def _load_index(file):
+    """Loads the index stored next to the snapshot of the database file.
+
+    Args:
+        file (str): path to the database file.
+
+    Returns:
+        The index dictionary or None if no index is stored.
+    """
+    index_file = cache_file(file, 'index.json')
+    if index_file is None or not os.path.exists(index_file):
+        return None
+    try:
+        with open(index_file, 'r', encoding='utf-8') as index:
+            return json.load(index)
+    except (OSError, ValueError) as exc:
+        LOGGER.warning('Ignoring the unreadable database index %s: %s', index_file, exc)
+        return None
+
+
+def _store_index(file):
+    """Stores the index of the database file next to its snapshot.
+
+    Args:
+        file (str): path to the database file.
+    """
+    _INDEX_CHANGED['pending'] = False
+    index_file = cache_file(file, 'index.json')
+    if index_file is None:
+        return
+    LOGGER.debug('Storing database index: %s', index_file)
+    try:
+        os.makedirs(os.path.dirname(index_file), exist_ok=True)
+        index = {key: _INDEX[key] for key in ('size', 'mtime', 'documents')}
+        _write_atomically(index_file, json.dumps(index).encode('utf-8'), sync=False)
+    except OSError as exc:
+        LOGGER.warning('Could not store the database index %s: %s', index_file, exc)
+
+
+def _store_index_at_exit():
+    """Stores the index of the database file once CoBib exits.
+
+    Until then, any number of transactions may update the index in memory without storing it again.
+    """
+    _INDEX_CHANGED['pending'] = True
+    if not _INDEX_CHANGED['registered']:
+        atexit.register(_store_pending_index)
+        _INDEX_CHANGED['registered'] = True
+
+
+def _store_pending_index():
+    """Stores the index of the database file if it changed since it was last stored."""
+    if _INDEX_CHANGED['pending'] and _INDEX['file'] is not None:
+        _store_index(_INDEX['file'])
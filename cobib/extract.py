@@ -0,0 +1,493 @@
+"""CoBib text extraction module."""
+
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import zlib
+
+try:
+    import pypdf
+except ImportError:
+    # the text of PDF files is extracted by `pdf_to_text` instead
+    pypdf = None
+
+from cobib.config import config
+
+LOGGER = logging.getLogger(__name__)
+
+# The first bytes of every PDF file.
+PDF_MAGIC = b'%PDF-'
+
+OBJECT_REGEX = re.compile(rb'(\d+)\s+\d+\s+obj\b(.*?)\bendobj', re.DOTALL)
+STREAM_REGEX = re.compile(rb'\bstream\r?\n')
+REFERENCE = rb'\s*(\d+)\s+\d+\s+R'
+# The tokens of a content stream: literal strings (with one level of nested parentheses), hex
+# strings, array delimiters, names, comments and any other operands or operators.
+TOKEN_REGEX = re.compile(rb'\((?:\\.|[^\\()]|\((?:\\.|[^\\()])*\))*\)|<[0-9A-Fa-f\s]*>|<<|>>|'
+                         rb'\[|\]|/[^\s/\[\]()<>{}%]*|%[^\r\n]*|[^\s/\[\]()<>{}%]+', re.DOTALL)
+INLINE_IMAGE_REGEX = re.compile(rb'\bBI\b.*?\bID\b.*?\bEI\b', re.DOTALL)
+ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f'}
+# Kerning adjustments of TJ arrays which are more negative than this are treated as spaces.
+SPACE_ADJUSTMENT = -200
+# The maximum number of bytes which are decompressed from the streams of a single PDF file.
+MAX_DECODED_SIZE = 64 * 2**20
+
+
+def extract_text(file):
+    """Extracts the text of a PDF file.
+
+    The text is extracted by the extractor configured via `config.commands.search.extractor` or, by
+    default, by `pypdf_to_text` if `pypdf` is installed and by `pdf_to_text` otherwise or if `pypdf`
+    fails (see `default_extractor`). It is cached
+    in the `text` subdirectory of `config.database.cache`, keyed by the path, modification time and
+    size of the file as well as the extractor, until the cache exceeds the size configured via
+    `config.commands.search.extraction_cache_size`. Then, the least recently used texts are evicted.
+
+    Args:
+        file (str): path to the PDF file.
+
+    Returns:
+        The extracted text or None if it could not be extracted.
+    """
+    extractor = config.commands.search.extractor or default_extractor
+    cache_file = None
+    try:
+        stat = os.stat(file)
+        cache_file = _cache_file(file, stat, extractor)
+        if cache_file is not None and os.path.exists(cache_file):
+            LOGGER.debug('Using the cached text of %s.', file)
+            # the modification time of the cached text records when it was used last
+            os.utime(cache_file)
+            with open(cache_file, 'r', encoding='utf-8') as cached:
+                return cached.read()
+    except OSError as exc:
+        LOGGER.warning('Could not read the cached text of %s: %s', file, exc)
+    LOGGER.info('Extracting the text of %s.', file)
+    try:
+        text = extractor(file)
+    except Exception as exc:  # pylint: disable=broad-except
+        LOGGER.warning('Could not extract the text of %s: %s', file, exc)
+        return None
+    if text is not None and cache_file is not None:
+        _store(cache_file, text)
+    return text
+
+
+def default_extractor(file):
+    """Extracts the text of a PDF file by means of `pypdf`, if it is installed, or `pdf_to_text`.
+
+    Args:
+        file (str): path to the PDF file.
+
+    Returns:
+        The text of all pages.
+    """
+    if pypdf is not None:
+        try:
+            return pypdf_to_text(file)
+        except Exception as exc:  # pylint: disable=broad-except
+            LOGGER.info('Falling back to the builtin extractor for %s: %s', file, exc)
+    return pdf_to_text(file)
+
+
+def pypdf_to_text(file):
+    """Extracts the text of a PDF file by means of the optional `pypdf` package.
+
+    Args:
+        file (str): path to the PDF file.
+
+    Returns:
+        The text of all pages.
+    """
+    reader = pypdf.PdfReader(file)
+    return '\n'.join(page.extract_text() or '' for page in reader.pages)
+
+
+def pdf_to_text(file):
+    """Extracts the text of a PDF file in pure Python.
+
+    This fallback extractor supports the common subset of PDF files which are produced by (La)TeX:
+    the pages are read from uncompressed or `FlateDecode`-compressed content streams (including
+    those stored in object streams) and the text is decoded by means of the `ToUnicode` maps of its
+    fonts. Any other text is decoded as Latin-1. Lines are broken whenever the text moves to another
+    line. At most `MAX_DECODED_SIZE` bytes are decompressed in total.
+
+    Args:
+        file (str): path to the PDF file.
+
+    Returns:
+        The text of all pages.
+    """
+    with open(file, 'rb') as stream:
+        data = stream.read()
+    objects = _objects(data)
+    texts = []
+    for page in _pages(data, objects):
+        fonts = {}
+        for name, ref in _fonts(objects, page):
+            fonts[name] = _to_unicode(objects, ref)
+        for ref in _references(objects[page][0], b'Contents'):
+            content = objects.get(ref, (b'', None))[1]
+            if content is not None:
+                texts.append(_content_text(content, fonts))
+    return '\n'.join(texts)
+
+
+def _cache_file(file, stat, extractor):
+    """Returns the path of the cached text of a file or None if the cache is disabled.
+
+    Args:
+        file (str): path to the file.
+        stat (os.stat_result): the stat result of the file.
+        extractor (function): the function which extracts the text.
+    """
+    cache = config.database.cache
+    if not cache or not config.commands.search.extraction_cache_size:
+        return None
+    name = f"{getattr(extractor, '__module__', '')}.{getattr(extractor, '__qualname__', '')}"
+    if extractor is default_extractor and pypdf is not None:
+        # installing or updating `pypdf` changes the extracted texts
+        name += f'\0{pypdf.__version__}'
+    key = f'{os.path.realpath(file)}\0{stat.st_mtime_ns}\0{stat.st_size}\0{name}'
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return os.path.join(os.path.expanduser(cache), 'text', f'{digest}.txt')
+
+
+def _store(cache_file, text):
+    """Stores an extracted text and evicts the least recently used texts from the cache.
+
+    Args:
+        cache_file (str): path to the cached text.
+        text (str): the extracted text.
+    """
+    directory = os.path.dirname(cache_file)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        handle, tmp_file = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(handle, 'w', encoding='utf-8') as tmp:
+            tmp.write(text)
+        os.replace(tmp_file, cache_file)
+        cached = []
+        for name in os.listdir(directory):
+            stat = os.stat(os.path.join(directory, name))
+            cached.append((stat.st_mtime_ns, stat.st_size, name))
+        size = sum(size for _, size, _ in cached)
+        for _, file_size, name in sorted(cached):
+            if size <= config.commands.search.extraction_cache_size:
+                break
+            LOGGER.debug('Evicting the cached text %s.', name)
+            os.remove(os.path.join(directory, name))
+            size -= file_size
+    except OSError as exc:
+        LOGGER.warning('Could not cache the extracted text in %s: %s', directory, exc)
+
+
+def _objects(data):
+    """Parses the objects of a PDF file.
+
+    Args:
+        data (bytes): the contents of the PDF file.
+
+    Returns:
+        A dictionary mapping the object numbers onto pairs of the object (without its stream) and
+        its decoded stream (or None if it has no stream or the stream could not be decoded).
+    """
+    objects = {}
+    budget = MAX_DECODED_SIZE
+    for match in OBJECT_REGEX.finditer(data):
+        body = match.group(2)
+        stream = STREAM_REGEX.search(body)
+        if stream is None:
+            objects[int(match.group(1))] = (body, None)
+            continue
+        head = body[:stream.start()]
+        decoded = _decode(head, body[stream.end():], budget)
+        if decoded is not None:
+            budget -= len(decoded)
+        objects[int(match.group(1))] = (head, decoded)
+    # objects may be stored compressed within object streams
+    for head, stream in list(objects.values()):
+        if stream is None or not re.search(rb'/Type\s*/ObjStm\b', head):
+            continue
+        first = re.search(rb'/First\s+(\d+)', head)
+        if first is None:
+            continue
+        first = int(first.group(1))
+        header = [int(number) for number in stream[:first].split()]
+        numbers, offsets = header[0::2], header[1::2] + [len(stream) - first]
+        for idx, number in enumerate(numbers):
+            objects.setdefault(number, (stream[first+offsets[idx]:first+offsets[idx+1]], None))
+    return objects
+
+
+def _decode(head, stream, limit):
+    """Decodes a stream.
+
+    Args:
+        head (bytes): the stream dictionary.
+        stream (bytes): the raw stream data (possibly followed by `endstream`).
+        limit (int): the maximum number of bytes to decompress.
+
+    Returns:
+        The decoded stream or None if its filters are not supported or it exceeds the limit.
+    """
+    filters = re.search(rb'/Filter\s*(\[[^\]]*\]|/\w+)', head)
+    filters = re.findall(rb'/\w+', filters.group(1)) if filters else []
+    if not filters:
+        return stream[:stream.rfind(b'endstream')]
+    if filters != [b'/FlateDecode']:
+        return None
+    if limit <= 0:
+        LOGGER.warning('Skipping a stream because the decompressed size limit is exhausted.')
+        return None
+    decompressor = zlib.decompressobj()
+    try:
+        # the decompressor ignores any trailing data like `endstream`
+        decoded = decompressor.decompress(stream, limit)
+    except zlib.error:
+        return None
+    if decompressor.unconsumed_tail:
+        LOGGER.warning('Skipping a stream which decompresses to more than %d bytes.', limit)
+        return None
+    return decoded
+
+
+def _pages(data, objects):
+    """Returns the object numbers of the pages in the order of the document.
+
+    Args:
+        data (bytes): the contents of the PDF file.
+        objects (dict): the objects as returned by `_objects`.
+    """
+    root = re.search(rb'/Root' + REFERENCE, data)
+    pages = None
+    if root is not None and int(root.group(1)) in objects:
+        pages = re.search(rb'/Pages' + REFERENCE, objects[int(root.group(1))][0])
+    if pages is None:
+        # fall back to the order of the object numbers
+        return sorted(number for number, (head, _) in objects.items()
+                      if re.search(rb'/Type\s*/Page\b', head))
+    ordered = []
+    stack = [int(pages.group(1))]
+    visited = set()
+    while stack:
+        number = stack.pop()
+        if number in visited or number not in objects:
+            continue
+        visited.add(number)
+        head = objects[number][0]
+        if re.search(rb'/Type\s*/Page\b', head):
+            ordered.append(number)
+        else:
+            stack.extend(reversed(_references(head, b'Kids')))
+    return ordered
+
+
+def _references(head, key):
+    """Returns the object numbers referenced by a key of a dictionary.
+
+    Args:
+        head (bytes): the dictionary.
+        key (bytes): the key whose value is a reference or an array of references.
+    """
+    match = re.search(rb'/' + key + rb'\s*(\[[^\]]*\]|\d+\s+\d+\s+R)', head)
+    if match is None:
+        return []
+    return [int(number) for number in re.findall(REFERENCE, match.group(1))]
+
+
+def _fonts(objects, page):
+    """Returns the names and object numbers of the fonts of a page.
+
+    The resources of a page are looked up in the page itself or inherited from its ancestors.
+
+    Args:
+        objects (dict): the objects as returned by `_objects`.
+        page (int): the object number of the page.
+    """
+    head = objects[page][0]
+    for _ in range(32):
+        resources = re.search(rb'/Resources' + REFERENCE, head)
+        if resources is not None:
+            head = objects.get(int(resources.group(1)), (b'', None))[0]
+        font = re.search(rb'/Font' + REFERENCE, head)
+        if font is not None:
+            font_dict = objects.get(int(font.group(1)), (b'', None))[0]
+        else:
+            font = re.search(rb'/Font\s*<<(.*?)>>', head, re.DOTALL)
+            font_dict = font.group(1) if font is not None else None
+        if font_dict is not None:
+            return [(name, int(ref)) for name, ref in
+                    re.findall(rb'/([^\s/\[\]()<>{}%]+)\s*(\d+)\s+\d+\s+R', font_dict)]
+        parent = re.search(rb'/Parent' + REFERENCE, objects[page][0])
+        if parent is None or int(parent.group(1)) not in objects:
+            break
+        page = int(parent.group(1))
+        head = objects[page][0]
+    return []
+
+
+def _to_unicode(objects, font):
+    """Parses the `ToUnicode` map of a font.
+
+    Args:
+        objects (dict): the objects as returned by `_objects`.
+        font (int): the object number of the font.
+
+    Returns:
+        A dictionary mapping character codes onto text or None if the font has no such map. The
+        dictionary is empty for composite fonts without such a map, whose text cannot be decoded.
+    """
+    head = objects.get(font, (b'', None))[0]
+    ref = _references(head, b'ToUnicode')
+    cmap = objects.get(ref[0], (b'', None))[1] if ref else None
+    if cmap is None:
+        return {} if re.search(rb'/Subtype\s*/Type0\b', head) else None
+    mapping = {}
+    for block in re.findall(rb'beginbfchar(.*?)endbfchar', cmap, re.DOTALL):
+        for source, target in re.findall(rb'<([0-9A-Fa-f]+)>\s*<([0-9A-Fa-f]*)>', block):
+            mapping[bytes.fromhex(source.decode())] = _utf16(target)
+    for block in re.findall(rb'beginbfrange(.*?)endbfrange', cmap, re.DOTALL):
+        for low, high, target in re.findall(
+                rb'<([0-9A-Fa-f]+)>\s*<([0-9A-Fa-f]+)>\s*(<[0-9A-Fa-f]*>|\[[^\]]*\])', block):
+            width = len(low) // 2
+            low, high = int(low, 16), int(high, 16)
+            if target.startswith(b'['):
+                targets = [_utf16(value) for value in re.findall(rb'<([0-9A-Fa-f]*)>', target)]
+            else:
+                first = bytes.fromhex(target[1:-1].decode())
+                # the last byte of the target is incremented for every code of the range
+                targets = [_utf16((first[:-1] + bytes([(first[-1] + idx) % 256])).hex().encode())
+                           for idx in range(min(high - low + 1, 256))] if first else []
+            for idx, text in enumerate(targets[:high - low + 1]):
+                mapping[(low + idx).to_bytes(width, 'big')] = text
+    return mapping
+
+
+def _utf16(hex_string):
+    """Decodes a hexadecimal UTF-16BE string of a `ToUnicode` map."""
+    return bytes.fromhex(hex_string.decode()).decode('utf-16-be', errors='replace')
+
+
+def _content_text(content, fonts):
+    """Extracts the text of a content stream.
+
+    Args:
+        content (bytes): the decoded content stream.
+        fonts (dict): maps the names of the fonts onto their `ToUnicode` maps (see `_to_unicode`).
+
+    Returns:
+        The text of the content stream.
+    """
+    content = INLINE_IMAGE_REGEX.sub(b' ', content)
+    parts = []
+    operands = []
+    arrays = []
+    mapping = None
+    line = None
+    for token in TOKEN_REGEX.findall(content):
+        first = token[:1]
+        if first == b'%':
+            continue
+        if first in b'(<' and token != b'<<':
+            operands.append(_string(token))
+        elif first == b'/' or first in b'+-.0123456789':
+            operands.append(token)
+        elif token == b'[':
+            arrays.append(operands)
+            operands = []
+        elif token == b']':
+            array = operands
+            operands = arrays.pop() if arrays else []
+            operands.append(array)
+        elif token in (b'<<', b'>>'):
+            continue
+        else:
+            if token == b'Tf' and len(operands) >= 2:
+                mapping = fonts.get(operands[-2][1:], None)
+            elif token == b'Tj' and operands:
+                parts.append(_show(operands[-1], mapping))
+            elif token in (b"'", b'"') and operands:
+                parts.extend(['\n', _show(operands[-1], mapping)])
+            elif token == b'TJ' and operands and isinstance(operands[-1], list):
+                for item in operands[-1]:
+                    if isinstance(item, bytearray):
+                        parts.append(_show(item, mapping))
+                    elif _number(item) < SPACE_ADJUSTMENT:
+                        parts.append(' ')
+            elif token in (b'Td', b'TD') and len(operands) >= 2:
+                parts.append('\n' if _number(operands[-1]) else ' ')
+            elif token == b'Tm' and len(operands) >= 6:
+                # a new line starts only if the vertical position changes
+                parts.append(' ' if operands[-1] == line else '\n')
+                line = operands[-1]
+            elif token == b'T*':
+                parts.append('\n')
+            elif token == b'ET':
+                parts.append(' ')
+            operands = []
+    text = ''.join(parts)
+    return '\n'.join(' '.join(line.split()) for line in text.split('\n') if line.strip())
+
+
+def _string(token):
+    """Decodes a literal or hexadecimal string token into a bytearray."""
+    if token[:1] == b'<':
+        digits = re.sub(rb'\s', b'', token[1:-1])
+        if len(digits) % 2:
+            digits += b'0'
+        return bytearray(bytes.fromhex(digits.decode()))
+    value = bytearray()
+    body = token[1:-1]
+    idx = 0
+    while idx < len(body):
+        char = body[idx:idx+1]
+        idx += 1
+        if char != b'\\':
+            value += char
+            continue
+        escaped = body[idx:idx+1]
+        idx += 1
+        if escaped in ESCAPES:
+            value += ESCAPES[escaped]
+        elif escaped.isdigit():
+            octal = re.match(rb'[0-7]{1,3}', body[idx-1:idx+2])
+            if octal is None:
+                continue
+            value.append(int(octal.group(0), 8) % 256)
+            idx += len(octal.group(0)) - 1
+        elif escaped in (b'\r', b'\n'):
+            # line continuation
+            if escaped == b'\r' and body[idx:idx+1] == b'\n':
+                idx += 1
+        else:
+            value += escaped
+    return value
+
+
+def _show(string, mapping):
+    """Decodes a shown string by means of the `ToUnicode` map of the current font.
+
+    Args:
+        string (bytearray): the string.
+        mapping (dict): the `ToUnicode` map or None if the string is decoded as Latin-1.
+    """
+    if not isinstance(string, bytearray):
+        return ''
+    if mapping is None:
+        return bytes(string).decode('latin-1')
+    if not mapping:
+        return ''
+    width = len(next(iter(mapping)))
+    return ''.join(mapping.get(bytes(string[idx:idx+width]), '')
+                   for idx in range(0, len(string), width))
+
+
+def _number(token):
+    """Converts a numeric token into a float (or 0 if it is not a number)."""
+    try:
+        return float(token)
+    except (TypeError, ValueError):
+        return 0
@@ -0,0 +1,105 @@
+"""CoBib filter module."""
+
+import logging
+import re
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Filter:
+    """Compiled filter of entries.
+
+    A filter is specified in the form of a dictionary whose keys consist of pairs of (str, bool)
+    entries where the string indicates the field to match against and the boolean whether a positive
+    (true) or negative (false) match is required. The values are lists of what needs to be matched.
+    Each of these values is a separate filter item and all items are combined by either a logical
+    AND or OR.
+
+    Upon construction, every filter item is compiled into a test function once, such that the filter
+    can be evaluated on many entries without interpreting the filter dictionary again. The test
+    function checks whether a field contains the value, optionally ignoring the case or interpreting
+    the value as a regular expression. Note, that the values of list-like fields contain their list
+    items rather than substrings, unless the case is ignored or a regular expression is used.
+
+    Instances are callable on single entries and are used by `cobib.database.FieldIndex` to select
+    the matching labels of the entire bibliography. To this end, every compiled filter item also
+    provides its plain value (or None if the case is ignored or a regular expression is used) which
+    the index can look up directly.
+    """
+
+    def __init__(self, _filter, _or=False, ignore_case=False, regex=False):
+        """Compiles a filter.
+
+        Args:
+            _filter (dict): dictionary describing the filter as explained above.
+            _or (bool): boolean indicating whether logical OR (true) or AND (false) are used to
+                        combine multiple filter items.
+            ignore_case (bool): if True, ignore the case when matching the values.
+            regex (bool): if True, interpret the values as regular expressions.
+
+        Raises:
+            re.error: if a value is an invalid regular expression.
+        """
+        self.filter = dict(_filter)
+        self.OR = _or  # pylint: disable=invalid-name
+        self.ignore_case = ignore_case
+        self.regex = regex
+        literal = not (ignore_case or regex)
+        self.items = [(field, positive, self._compile(val), val if literal else None)
+                      for (field, positive), values in self.filter.items() for val in values]
+        LOGGER.debug('Compiled %d filter items.', len(self.items))
+
+    def __call__(self, entry):
+        """Checks whether an entry matches the filter.
+
+        Args:
+            entry (Entry): the entry to check.
+
+        Returns:
+            Boolean indicating whether the entry matches the filter.
+        """
+        data = entry.data
+        matches = (test(self.normalize(data[field])) == positive if field in data else not positive
+                   for field, positive, test, _ in self.items)
+        if self.OR:
+            return any(matches)
+        return all(matches)
+
+    def _compile(self, val):
+        """Compiles a single filter value into a test function.
+
+        Args:
+            val (str): the value to match.
+
+        Returns:
+            A function which checks whether a (normalized) field value matches.
+        """
+        if self.regex:
+            pattern = re.compile(val, re.IGNORECASE if self.ignore_case else 0)
+            return lambda value: pattern.search(str(value)) is not None
+        if self.ignore_case:
+            val = val.lower()
+            return lambda value: val in str(value).lower()
+        return lambda value: val in value
+
+    @staticmethod
+    def normalize(value):
+        """Converts a field value into a hashable value which supports the same containment checks.
+
+        Args:
+            value: the value of a field.
+
+        Returns:
+            The value itself if it is a string, a tuple of its items if it is a list and its string
+            representation otherwise.
+        """
+        if isinstance(value, str):
+            return value
+        if isinstance(value, list):
+            normalized = tuple(value)
+            try:
+                hash(normalized)
+                return normalized
+            except TypeError:
+                pass
+        return str(value)
@@ -1,20 +1,27 @@
 """CoBib parsing module."""
 
 from collections import OrderedDict
+import functools
 import json
 import logging
 import os
 import re
-import subprocess
 import sys
+import threading
+import time
+from urllib.parse import urlparse
 
 from bs4 import BeautifulSoup
 from pylatexenc.latexencode import UnicodeToLatexEncoder
+from requests.adapters import HTTPAdapter
 from ruamel import yaml
+from urllib3.util.retry import Retry
 import bibtexparser
 import requests
 
 from cobib.config import config
+from cobib.filter import Filter
+from cobib.search import Query
 
 LOGGER = logging.getLogger(__name__)
 
@@ -25,11 +32,17 @@ DOI_HEADER = {'Accept': "application/x-bibtex"}
 DOI_REGEX = r'(10\.[0-9a-zA-Z]+\/(?:(?!["&\'])\S)+)\b'
 # arXiv URL according to docs from here https://arxiv.org/help/oa
 ARXIV_URL = "https://export.arxiv.org/api/query?id_list="
+# arXiv regex used for matching new-style (e.g. 1234.56789) and old-style (e.g. hep-th/9901001) IDs
+ARXIV_REGEX = re.compile(r'(?:\d{4}\.\d{4,5}|[a-z-]+(?:\.[a-z]{2})?/\d{7})(?:v\d+)?', re.I)
 # ISBN regex used for matching ISBNs (adapted from https://github.com/xlcnd/isbnlib)
 ISBN_REGEX = re.compile(r'97[89]{1}(?:-?\d){10}|\d{9}[0-9X]{1}|'
                         r'[-0-9X]{10,16}', re.I | re.M | re.S)
 # ISBN-API: https://openlibrary.org/dev/docs/api/books
 ISBN_URL = "https://openlibrary.org/api/books?bibkeys=ISBN:"
+# YAML documents as written by the YAML dumper with explicit start and end markers
+YAML_DOCUMENT_REGEX = re.compile(r'^---\n.*?^\.\.\.\n', re.MULTILINE | re.DOTALL)
+# BibLaTex declarations which are not entries
+BIBTEX_SPECIAL_REGEX = re.compile(r'@(?:comment|preamble|string)\s*[{(]', re.I)
 # biblatex default types and required values taken from their docs: https://ctan.org/pkg/biblatex
 BIBTEX_TYPES = {
     'article': ['author', 'title', 'journal', 'year'],
@@ -42,6 +55,214 @@ BIBTEX_TYPES = {
     }
 
 
+@functools.lru_cache(maxsize=None)
+def latex_encoder(warn=False):
+    """Returns the encoder used to escape special characters.
+
+    The encoder is created only once for each setting of `warn` and shared among all entries.
+
+    Args:
+        warn (bool, optional): if True, the encoder warns about unknown characters.
+
+    Returns:
+        A `pylatexenc.latexencode.UnicodeToLatexEncoder`.
+    """
+    return UnicodeToLatexEncoder(non_ascii_only=True,
+                                 replacement_latex_protection='braces-all',
+                                 unknown_char_policy='keep',
+                                 unknown_char_warning=warn)
+
+
+@functools.lru_cache(maxsize=4096)
+def escape_latex(value, warn=False):
+    """Escapes the special characters of a string.
+
+    The results are memoized because many values (e.g. journal names or authors) recur across the
+    entries of a bibliography.
+
+    Args:
+        value (str): the string to escape.
+        warn (bool, optional): if True, warns about unknown characters.
+
+    Returns:
+        The string with all non-ASCII characters replaced by their LaTeX representation.
+    """
+    if all(ord(char) < 128 for char in value):
+        # only non-ASCII characters get replaced
+        return value
+    return latex_encoder(warn).unicode_to_latex(value)
+
+
+@functools.lru_cache(maxsize=None)
+def yaml_dumper():
+    """Returns the dumper used to convert entries to YAML.
+
+    The dumper is created only once and shared among all entries.
+
+    Returns:
+        An `Entry.YamlDumper`.
+    """
+    yml = Entry.YamlDumper()
+    yml.explicit_start = True
+    yml.explicit_end = True
+    return yml
+
+
+# The HTTP status codes of responses whose requests are retried.
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+@functools.lru_cache(maxsize=None)
+def _http_session(retries, pool_size):
+    """Creates an HTTP session.
+
+    Args:
+        retries (int): the number of retries of failed requests.
+        pool_size (int): the number of connections which are kept alive per host.
+
+    Returns:
+        A `requests.Session`.
+    """
+    session = requests.Session()
+    # failed requests are retried after exponentially increasing delays (or as requested by the
+    # server via the `Retry-After` header) and the last response is returned once the retries are
+    # exhausted such that `http_get` can report its status
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=RETRY_STATUSES,
+                  raise_on_status=False)
+    adapter = HTTPAdapter(pool_maxsize=pool_size, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class RateLimiter:
+    """Limits the rate of requests per host.
+
+    The limiter is shared by all threads: every request reserves the next free time slot of its host
+    and waits until this slot has come.
+    """
+
+    def __init__(self):
+        """Initializes the limiter."""
+        self._lock = threading.Lock()
+        self._slots = {}
+
+    def wait(self, url, rate):
+        """Waits until a request may be sent.
+
+        Args:
+            url (str): the URL of the request.
+            rate (float): the maximum number of requests per second to the host of the URL.
+        """
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._slots.get(host, now))
+            self._slots[host] = slot + 1 / rate
+        if slot > now:
+            LOGGER.debug('Delaying the request to %s by %.2f seconds.', host, slot - now)
+            time.sleep(slot - now)
+
+
+_RATE_LIMITER = RateLimiter()
+
+
+def http_get(url, **kwargs):
+    """Sends a GET request through the shared HTTP session.
+
+    All requests share one session such that connections are pooled and kept alive. The requests are
+    rate limited per host and retried according to the `config.commands.add` settings.
+
+    Args:
+        url (str): the URL.
+        kwargs: any additional keyword arguments of `requests.Session.get`.
+
+    Returns:
+        The `requests.Response`.
+
+    Raises:
+        requests.exceptions.RequestException: if the request failed, including responses whose
+            status is still one of `RETRY_STATUSES` after the last retry.
+    """
+    settings = config.commands.add
+    if settings.rate_limit:
+        _RATE_LIMITER.wait(url, settings.rate_limit)
+    response = _http_session(settings.retries, settings.workers).get(url, **kwargs)
+    if response.status_code in RETRY_STATUSES:
+        response.raise_for_status()
+    return response
+
+
+class EntryData(dict):
+    """Dictionary of the fields of an entry.
+
+    It counts its modifications such that renderings of the entry can be cached until it changes.
+    Additionally, the class-wide `generation` counts the creations and modifications of all
+    instances (as well as the creations of all entries) such that indexes over many entries can
+    cheaply tell whether any entry changed.
+    """
+
+    generation = 0
+
+    def __init__(self, *args, **kwargs):
+        """Initializes the dictionary (see `dict`)."""
+        super().__init__(*args, **kwargs)
+        self.revision = 0
+        EntryData.generation += 1
+
+    def __reduce__(self):
+        """Pickles the dictionary by its items.
+
+        Otherwise, pickle restores the items through `__setitem__` before the revision exists.
+        """
+        return (EntryData, (dict(self),))
+
+    def _modified(self):
+        """Counts a modification."""
+        self.revision += 1
+        EntryData.generation += 1
+
+    def __setitem__(self, key, value):
+        """See base class."""
+        super().__setitem__(key, value)
+        self._modified()
+
+    def __delitem__(self, key):
+        """See base class."""
+        super().__delitem__(key)
+        self._modified()
+
+    def __ior__(self, other):
+        """See base class."""
+        self.update(other)
+        return self
+
+    def clear(self):
+        """See base class."""
+        super().clear()
+        self._modified()
+
+    def pop(self, *args):
+        """See base class."""
+        self._modified()
+        return super().pop(*args)
+
+    def popitem(self):
+        """See base class."""
+        self._modified()
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        """See base class."""
+        self._modified()
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        """See base class."""
+        super().update(*args, **kwargs)
+        self._modified()
+
+
 class Entry:
     """Bibliography entry class.
 
@@ -61,32 +282,71 @@ class Entry:
             if inefficient:
                 return stream.getvalue()
 
-    def __init__(self, label, data, suppress_warnings=True):
+    def __init__(self, label, data, suppress_warnings=True, lazy=False):
         """Initializes the Entry object.
 
         Args:
             label (str): Database Id used for this entry.
             data (dict): Dictionary of fields specifying this entry.
             suppress_warnings (bool): if True, suppresses warnings.
+            lazy (bool, optional): if True, the special characters are escaped and the month is
+                                   converted only once the data of this entry is accessed for the
+                                   first time. This speeds up reading large databases of which
+                                   most entries are never looked at.
         """
         label = str(label)
         LOGGER.debug('Initializing entry: %s', label)
         self._label = label
-        self.data = data.copy()
-        self.escape_special_chars(suppress_warnings)
-        month_type = config.database.format.month
-        if month_type:
-            self.convert_month(month_type)
-        if self.data['ID'] != self._label:
+        self._suppress_warnings = suppress_warnings
+        self._data = None
+        self._bibtex = None
+        self._yaml = None
+        self._raw = data
+        # the data of a lazy entry is created later: indexes must notice the new entry nonetheless
+        EntryData.generation += 1
+        if data['ID'] != self._label:
             # sanity check for matching label and ID
             LOGGER.warning("Mismatching label '%s' and ID '%s'. Overwriting ID with label.",
-                           self._label, self.data['ID'])
-            self.set_label = self._label
+                           self._label, data['ID'])
+            self._raw = dict(data, ID=self._label)
+        if not lazy:
+            self._normalize()
 
     def __repr__(self):
         """Returns the entry in its bibtex format."""
         return self.to_bibtex()
 
+    def __getstate__(self):
+        """Returns the state of this entry for pickling without its cached renderings."""
+        state = self.__dict__.copy()
+        state['_bibtex'] = None
+        state['_yaml'] = None
+        return state
+
+    @property
+    def data(self):
+        """Returns the dictionary of fields of this entry."""
+        if self._raw is not None:
+            self._normalize()
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        """Sets the dictionary of fields of this entry."""
+        self._raw = None
+        self._data = data if isinstance(data, EntryData) else EntryData(data)
+        self._bibtex = None
+        self._yaml = None
+
+    def _normalize(self):
+        """Escapes the special characters and converts the month of the raw data of this entry."""
+        LOGGER.debug('Normalizing entry: %s', self._label)
+        self.data = EntryData(self._raw)
+        self.escape_special_chars(self._suppress_warnings)
+        month_type = config.database.format.month
+        if month_type:
+            self.convert_month(month_type)
+
     @property
     def label(self):
         """Returns the database Id of this entry."""
@@ -160,18 +420,13 @@ class Entry:
         Args:
             suppress_warnings (bool): if True, suppresses warnings.
         """
-        enc = UnicodeToLatexEncoder(non_ascii_only=True,
-                                    replacement_latex_protection='braces-all',
-                                    unknown_char_policy='keep',
-                                    unknown_char_warning=not suppress_warnings or
-                                    LOGGER.isEnabledFor(10))  # 10 = DEBUG logging level
+        warn = not suppress_warnings or LOGGER.isEnabledFor(10)  # 10 = DEBUG logging level
         for key, value in self.data.items():
             if key in ('ID', 'file'):
                 # do NOT these fields and keep any special characters
-                self.data[key] = value
                 continue
             if isinstance(value, str):
-                self.data[key] = enc.unicode_to_latex(value)
+                self.data[key] = escape_latex(value, warn)
 
     def matches(self, _filter, _or):
         """Check whether the filter matches.
@@ -181,6 +436,8 @@ class Entry:
         indicates the field to match against and the boolean whether a positive (true) or negative
         (false) match is required. The value obviously refers to what needs to be matched.
 
+        In order to check many entries, compile the filter once via `cobib.filter.Filter` instead.
+
         Args:
             _filter (dict): dictionary describing the filter as explained above.
             _or (bool): boolean indicating whether logical OR (true) or AND (false) are used to
@@ -190,25 +447,14 @@ class Entry:
             Boolean indicating whether this entry matches the filter.
         """
         LOGGER.debug('Checking whether entry %s matches.', self.label)
-        match_list = []
-        for key, values in _filter.items():
-            if key[0] not in self.data.keys():
-                match_list.append(not key[1])
-                continue
-            for val in values:
-                if val not in self.data[key[0]]:
-                    match_list.append(not key[1])
-                else:
-                    match_list.append(key[1])
-        if _or:
-            return any(m for m in match_list)
-        return all(m for m in match_list)
+        return Filter(_filter, _or)(self)
 
     def search(self, query, context=1, ignore_case=False):
         """Search entry contents for query string.
 
         The search will try its best to recursively query all the data associated with this entry
-        for the given query string.
+        for the given query string. In order to search many entries, compile the query once via
+        `cobib.search.Query` instead.
 
         Args:
             query (str): text to search for.
@@ -218,54 +464,43 @@ class Entry:
         Returns:
             A list of lists containing the context for each match associated with this entry.
         """
-        LOGGER.debug('Searching entry %s for %s.', self.label, query)
-        matches = []
-        bibtex = str(self).split('\n')
-        re_flags = re.IGNORECASE if ignore_case else 0
-        for idx, line in enumerate(bibtex):
-            if re.search(rf'{query}', line, flags=re_flags):
-                # add new match
-                matches.append([])
-                # upper context
-                for string in bibtex[max(idx-context, 0):min(idx+1, len(bibtex))]:
-                    if not re.search(rf'{query}', string, flags=re_flags):
-                        matches[-1].append(string)
-                # matching line itself
-                matches[-1].append(line)
-                # lower context
-                for string in bibtex[max(idx+1, 0):min(idx+context+1, len(bibtex))]:
-                    if not re.search(rf'{query}', string, flags=re_flags):
-                        matches[-1].append(string)
-                    else:
-                        break
-
-        if self.file and os.path.exists(self.file):
-            grep_prog = config.commands.search.grep
-            LOGGER.debug('Searching associated file %s with %s', self.file, grep_prog)
-            grep = subprocess.Popen([grep_prog, f'-C{context}', query, self.file],
-                                    stdout=subprocess.PIPE)
-            # extract results
-            results = grep.stdout.read().decode().split('--')
-            for match in results:
-                if match:
-                    matches.append([line.strip() for line in match.split('\n') if line.strip()])
-
-        return matches
+        return [[line for line, _ in match]
+                for match in Query(query, ignore_case).search(self, context)]
 
     def to_bibtex(self):
-        """Returns the entry in biblatex format."""
-        database = bibtexparser.bibdatabase.BibDatabase()
-        database.entries = [self.data]
+        """Returns the entry in biblatex format.
+
+        The output is identical to that of `bibtexparser.dumps` with its default writer settings. It
+        is cached until the data of this entry changes.
+        """
+        data = self.data
+        if self._bibtex is not None and self._bibtex[0] == data.revision:
+            return self._bibtex[1]
         LOGGER.debug('Converting entry %s to BibTex format.', self.label)
-        return bibtexparser.dumps(database)
+        fields = ['@' + data['ENTRYTYPE'] + '{' + data['ID']]
+        for field in sorted(data):
+            if field in ('ENTRYTYPE', 'ID'):
+                continue
+            value = data[field]
+            if not isinstance(value, str):
+                raise TypeError(f"The field {field} in entry {data['ID']} must be a string")
+            fields.append(' ' + field + ' = {' + value + '}')
+        bibtex = ',\n'.join(fields) + '\n}\n\n'
+        self._bibtex = (data.revision, bibtex)
+        return bibtex
 
     def to_yaml(self):
-        """Returns the entry in YAML format."""
-        yml = Entry.YamlDumper()
-        yml.explicit_start = True
-        yml.explicit_end = True
+        """Returns the entry in YAML format.
+
+        The output is cached until the data of this entry changes.
+        """
+        data = self.data
+        if self._yaml is not None and self._yaml[0] == data.revision:
+            return self._yaml[1]
         LOGGER.debug('Converting entry %s to YAML format.', self.label)
-        return yml.dump({self._label: dict(sorted(self.data.items()))})
+        string = yaml_dumper().dump({self._label: dict(sorted(data.items()))})
+        self._yaml = (data.revision, string)
+        return string
 
     @staticmethod
     def from_bibtex(file, string=False):
@@ -292,21 +527,29 @@ class Entry:
         return bib
 
     @staticmethod
-    def from_yaml(file):
+    def from_yaml(file, string=False):
         """Creates a new bibliography from a YAML source file.
 
+        The entries are created lazily, i.e. their data is normalized only once it gets accessed.
+
         Args:
-            file (file): path to YAML file from which to load database.
+            file (str or file): string with YAML data or path to YAML file from which to load
+                                database.
+            string (bool, optional): indicates whether the file argument is of string or file type.
 
         Returns:
             An OrderedDict containing the bibliography as per the provided YAML file.
         """
+        if string:
+            LOGGER.debug('Loading YAML string.')
+        else:
+            LOGGER.debug('Loading YAML data from file: %s.', file)
+            with open(file, 'r') as database:
+                file = database.read()
         bib = OrderedDict()
-        LOGGER.debug('Loading YAML data from file: %s.', file)
-        with open(file, 'r') as database:
-            for entry in yaml.safe_load_all(database):
-                for label, data in entry.items():
-                    bib[label] = Entry(label, data)
+        for entry in yaml.safe_load_all(file):
+            for label, data in entry.items():
+                bib[label] = Entry(label, data, lazy=True)
         return bib
 
     @staticmethod
@@ -328,9 +571,9 @@ class Entry:
             return {}
         LOGGER.info('Gathering BibTex data for DOI: %s.', doi)
         try:
-            page = requests.get(DOI_URL+doi, headers=DOI_HEADER, timeout=10)
-        except requests.exceptions.ReadTimeout as exc:
-            msg = 'The DOI API timed out: ' + str(exc)
+            page = http_get(DOI_URL+doi, headers=DOI_HEADER, timeout=10)
+        except requests.exceptions.RequestException as exc:
+            msg = 'The DOI API could not be reached: ' + str(exc)
             LOGGER.warning(msg)
             print(msg, file=sys.stderr)
             return {}
@@ -347,7 +590,13 @@ class Entry:
             An OrderedDict containing the bibliographic data of the provided arXiv ID.
         """
         LOGGER.info('Gathering BibTex data for arXiv ID: %s.', arxiv)
-        page = requests.get(ARXIV_URL+arxiv)
+        try:
+            page = http_get(ARXIV_URL+arxiv, timeout=10)
+        except requests.exceptions.RequestException as exc:
+            msg = 'The arXiv API could not be reached: ' + str(exc)
+            LOGGER.warning(msg)
+            print(msg, file=sys.stderr)
+            return {}
         xml = BeautifulSoup(page.text, features='html.parser')
         if xml.feed.entry.title.contents[0] == 'Error':
             msg = 'The arXiv API returned the following error: ' + \
@@ -415,7 +664,13 @@ class Entry:
         assert re.match(ISBN_REGEX, isbn)
         LOGGER.info('Gathering BibTex data for ISBN: %s.', isbn)
         isbn_plain = ''.join([i for i in isbn if i.isdigit()])
-        page = requests.get(ISBN_URL+isbn_plain+'&jscmd=data&format=json', timeout=5)
+        try:
+            page = http_get(ISBN_URL+isbn_plain+'&jscmd=data&format=json', timeout=5)
+        except requests.exceptions.RequestException as exc:
+            msg = 'The ISBN API could not be reached: ' + str(exc)
+            LOGGER.warning(msg)
+            print(msg, file=sys.stderr)
+            return {}
         contents = dict(json.loads(page.content))
         if not contents:
             msg = f'No data was found for ISBN: {isbn}. If you think this is an error and the ' + \
@@ -454,3 +709,96 @@ class Entry:
         bib = OrderedDict()
         bib[entry['ID']] = Entry(entry['ID'], entry)
         return bib
+
+
+def to_bibtex_many(entries):
+    """Returns many entries in biblatex format.
+
+    Args:
+        entries (iterable[Entry]): the entries to convert. Their order is preserved.
+
+    Returns:
+        A single string with the concatenated biblatex representation of all entries.
+    """
+    return ''.join([entry.to_bibtex() for entry in entries])
+
+
+def to_yaml_many(entries):
+    """Returns many entries in YAML format.
+
+    All entries without an up-to-date cached YAML document are dumped into a single stream,
+    which avoids the overhead of setting up the dumper for every single entry. If the stream can
+    not be split into one document per entry, the entries are dumped one by one instead.
+
+    Args:
+        entries (iterable[Entry]): the entries to convert.
+
+    Returns:
+        A list of the YAML documents of the entries in the same order.
+    """
+    # pylint: disable=protected-access
+    entries = list(entries)
+    outdated = [entry for entry in entries
+                if entry._yaml is None or entry._yaml[0] != entry.data.revision]
+    if outdated:
+        LOGGER.debug('Converting %d entries to YAML format.', len(outdated))
+        stream = yaml.compat.StringIO()
+        yaml_dumper().dump_all([{entry.label: dict(sorted(entry.data.items()))}
+                                for entry in outdated], stream)
+        strings = YAML_DOCUMENT_REGEX.findall(stream.getvalue())
+        if len(strings) == len(outdated):
+            for entry, string in zip(outdated, strings):
+                entry._yaml = (entry.data.revision, string)
+        else:
+            # a value containing a line like `...` splits the stream differently: the entries are
+            # dumped one by one instead
+            LOGGER.debug('The YAML stream could not be split into its documents.')
+    return [entry.to_yaml() for entry in entries]
+
+
+def stream_bibtex(file, chunk_size=1000):
+    """Creates new bibliographies from a BibLaTex source file chunk by chunk.
+
+    In contrast to `Entry.from_bibtex`, the source file is read line by line and parsed in chunks of
+    at most `chunk_size` entries. Thus, even very large files can be imported with bounded
+    memory. String definitions remain available to the entries of all subsequent chunks.
+
+    Args:
+        file (file): BibLaTex file object.
+        chunk_size (int, optional): the maximum number of entries per chunk.
+
+    Yields:
+        An OrderedDict containing the bibliography of the next chunk of the BibLaTex data.
+    """
+    bparser = bibtexparser.bparser.BibTexParser()
+    bparser.ignore_nonstandard_types = config.parsers.bibtex.ignore_non_standard_types
+
+    def parse(lines):
+        # only the string definitions are kept from one chunk to the next
+        bparser.bib_database.entries = []
+        bparser.bib_database.comments = []
+        bparser.bib_database.preambles = []
+        bparser.parse(''.join(lines))
+        bib = OrderedDict()
+        for entry in bparser.bib_database.entries:
+            bib[entry['ID']] = Entry(entry['ID'], entry, suppress_warnings=False)
+        return bib
+
+    LOGGER.debug('Streaming BibTex data from file: %s.', file)
+    lines = []
+    count = 0
+    depth = 0
+    for line in file:
+        # a new entry starts with an `@` outside of any braces
+        if depth <= 0 and line.lstrip().startswith('@'):
+            if count == chunk_size:
+                yield parse(lines)
+                lines = []
+                count = 0
+            if not BIBTEX_SPECIAL_REGEX.match(line.lstrip()):
+                count += 1
+            depth = 0
+        lines.append(line)
+        depth += line.count('{') - line.count('}')
+    if ''.join(lines).strip():
+        yield parse(lines)
@@ -0,0 +1,297 @@
+"""CoBib search module."""
+
+from bisect import bisect_right
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import mmap
+import os
+import re
+import subprocess
+
+from cobib.config import config
+from cobib.extract import PDF_MAGIC, extract_text
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Query:
+    """Compiled search query.
+
+    The query is compiled into a regular expression once and can then be used to search any number
+    of entries. An entry is searched in a single pass over its (cached) BibLaTeX representation and
+    the positions of the matches are mapped onto the lines of this representation by means of their
+    offsets. Like a search of every single line, matches do not span multiple lines: a line in which
+    a match starts but does not end is searched on its own.
+
+    Every match is reported with its context lines and the spans of the query within each line such
+    that the matches can be highlighted without searching the lines again (see `highlight`).
+
+    Associated files are searched by the backend configured via `config.commands.search.backend`.
+    The `builtin` backend memory-maps the file and searches its bytes in-process (or the extracted
+    text of a PDF file, see `cobib.extract`), while the `grep` backend runs the program configured
+    via `config.commands.search.grep` once per file.
+    """
+
+    def __init__(self, query, ignore_case=False):
+        """Compiles a query.
+
+        Args:
+            query (str): text to search for. This is interpreted as a regular expression.
+            ignore_case (bool): if True, ignore case when searching.
+
+        Raises:
+            re.error: if the query is an invalid regular expression.
+        """
+        self.query = query
+        self.pattern = re.compile(query, re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
+        try:
+            # files are searched on their UTF-8 encoded bytes
+            self.bytes_pattern = re.compile(query.encode('utf-8'), self.pattern.flags & ~re.UNICODE)
+        except (re.error, ValueError):
+            LOGGER.debug('The query cannot be compiled for searching bytes.')
+            self.bytes_pattern = None
+
+    def search(self, entry, context=1):
+        """Searches an entry and its associated file.
+
+        Args:
+            entry (Entry): the entry to search.
+            context (int): number of context lines to provide for each match.
+
+        Returns:
+            A list of lists containing the context for each match associated with this entry. Every
+            line of the context is a pair of the line and the list of spans of the query in it.
+        """
+        LOGGER.debug('Searching entry %s for %s.', entry.label, self.query)
+        text = entry.to_bibtex()
+        matches = []
+        if self.pattern.search(text) is not None:
+            matches = self._search_text(text, context)
+        if entry.file and os.path.exists(entry.file):
+            matches.extend(self._search_file(entry.file, context))
+        return matches
+
+    def search_many(self, entries, context=1, workers=None):
+        """Searches many entries concurrently.
+
+        The entries (including their associated files) are searched by a pool of threads. Since
+        every thread runs at most one search at a time, the number of concurrent subprocesses which
+        search the associated files is bounded by the number of threads, too. The results are
+        yielded in the order of the entries as soon as they are available, while only a bounded
+        number of searches is queued ahead.
+
+        Args:
+            entries (iterable): the entries to search.
+            context (int): number of context lines to provide for each match.
+            workers (int, optional): the number of threads. This defaults to the number of CPUs
+                                     plus four (but at most 32), since the threads mostly wait for
+                                     subprocesses. If it is 1, the entries are searched one after
+                                     another.
+
+        Yields:
+            Pairs of an entry and its matches as returned by `search`.
+        """
+        workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        if workers == 1:
+            for entry in entries:
+                yield entry, self.search(entry, context)
+            return
+        queued = 4 * workers
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            try:
+                for entry in entries:
+                    pending.append((entry, executor.submit(self.search, entry, context)))
+                    if len(pending) >= queued:
+                        entry, future = pending.popleft()
+                        yield entry, future.result()
+                while pending:
+                    entry, future = pending.popleft()
+                    yield entry, future.result()
+            finally:
+                # the remaining searches are not needed if the caller stopped early
+                for _, future in pending:
+                    future.cancel()
+
+    def _search_text(self, text, context):
+        """Searches a text.
+
+        Args:
+            text (str): the text to search.
+            context (int): number of context lines to provide for each match.
+
+        Returns:
+            The matches in the same format as returned by `search`.
+        """
+        lines = text.split('\n')
+        offsets = [0]
+        for line in lines:
+            offsets.append(offsets[-1] + len(line) + 1)
+        spans = defaultdict(list)
+        position = 0
+        while position is not None:
+            restart = None
+            for match in self.pattern.finditer(text, position):
+                idx = bisect_right(offsets, match.start()) - 1
+                if match.end() > offsets[idx] + len(lines[idx]):
+                    # the match spans multiple lines: like `_search_lines`, search this line on its
+                    # own and continue with the next line
+                    line_spans = [m.span() for m in self.pattern.finditer(lines[idx])]
+                    if line_spans:
+                        spans[idx] = line_spans
+                    else:
+                        spans.pop(idx, None)
+                    restart = offsets[idx + 1]
+                    break
+                spans[idx].append((match.start() - offsets[idx], match.end() - offsets[idx]))
+            position = restart
+
+        matches = []
+        for idx in sorted(spans):
+            # upper context
+            matches.append([(lines[line], []) for line in range(max(idx-context, 0), idx)
+                            if line not in spans])
+            # matching line itself
+            matches[-1].append((lines[idx], spans[idx]))
+            # lower context
+            for line in range(idx+1, min(idx+context+1, len(lines))):
+                if line in spans:
+                    break
+                matches[-1].append((lines[line], []))
+        return matches
+
+    def _search_file(self, file, context):
+        """Searches a file.
+
+        Args:
+            file (str): path to the file.
+            context (int): number of context lines to provide for each match.
+
+        Returns:
+            The matches in the same format as returned by `search`.
+        """
+        if config.commands.search.backend == 'grep':
+            return self._grep_file(file, context)
+        LOGGER.debug('Searching associated file %s', file)
+        try:
+            with open(file, 'rb') as stream:
+                if os.fstat(stream.fileno()).st_size == 0:
+                    # empty files cannot be memory-mapped
+                    return []
+                with mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    if data[:len(PDF_MAGIC)] == PDF_MAGIC:
+                        text = extract_text(file)
+                        return self._search_lines(text, self.pattern, '\n', context) if text else []
+                    if self.bytes_pattern is not None:
+                        return self._search_lines(data, self.bytes_pattern, b'\n', context)
+                    text = data[:].decode('utf-8', errors='replace')
+                    return self._search_lines(text, self.pattern, '\n', context)
+        except (OSError, ValueError) as exc:
+            LOGGER.warning('Could not search the associated file %s: %s', file, exc)
+            return []
+
+    def _search_lines(self, data, pattern, newline, context):
+        """Searches the lines of a buffer like `grep` does.
+
+        Every line which contains a match is reported together with its context lines. Like the
+        output of `grep`, overlapping or adjacent contexts are merged into a single match and blank
+        lines are omitted.
+
+        Args:
+            data (bytes-like or str): the buffer to search.
+            pattern (re.Pattern): the compiled query matching the type of the buffer.
+            newline (bytes or str): the line separator matching the type of the buffer.
+            context (int): number of context lines to provide for each match.
+
+        Returns:
+            The matches in the same format as returned by `search`.
+        """
+        size = len(data)
+        groups = []
+        position = 0
+        while position <= size:
+            match = pattern.search(data, position)
+            if match is None or (match.start() == size and data[size-1:] == newline):
+                break
+            start = data.rfind(newline, 0, match.start()) + 1
+            end = data.find(newline, match.start())
+            end = size if end == -1 else end
+            position = end + 1
+            if match.end() > end and pattern.search(data, start, end) is None:
+                # the match spans multiple lines
+                continue
+            first, last = start, end
+            for _ in range(context):
+                if first == 0:
+                    break
+                first = data.rfind(newline, 0, first - 1) + 1
+            for _ in range(context):
+                if last + 1 >= size:
+                    break
+                last = data.find(newline, last + 1)
+                last = size if last == -1 else last
+            if groups and first <= groups[-1][1] + 1:
+                groups[-1][1] = max(groups[-1][1], last)
+            else:
+                groups.append([first, last])
+
+        matches = []
+        for first, last in groups:
+            text = data[first:last]
+            if not isinstance(text, str):
+                text = text.decode('utf-8', errors='replace')
+            lines = [line.strip() for line in text.split('\n') if line.strip()]
+            matches.append([(line, [m.span() for m in self.pattern.finditer(line)])
+                            for line in lines])
+        return matches
+
+    def _grep_file(self, file, context):
+        """Searches a file with the configured `grep` program.
+
+        Args:
+            file (str): path to the file.
+            context (int): number of context lines to provide for each match.
+
+        Returns:
+            The matches in the same format as returned by `search`.
+        """
+        grep_prog = config.commands.search.grep
+        LOGGER.debug('Searching associated file %s with %s', file, grep_prog)
+        with subprocess.Popen([grep_prog, '-n', f'-C{context}', '-e', self.query, file],
+                              stdout=subprocess.PIPE) as grep:
+            # extract results: the line numbers distinguish the separators from lines with `--`
+            results = grep.stdout.read().decode(errors='replace').split('\n')
+        matches = []
+        group = []
+        for line in results + ['--']:
+            if line == '--':
+                if group:
+                    matches.append(group)
+                group = []
+                continue
+            line = re.sub(r'^\d+[:-]', '', line).strip()
+            if line:
+                group.append((line, [m.span() for m in self.pattern.finditer(line)]))
+        return matches
+
+    @staticmethod
+    def highlight(line, spans, start, end):
+        """Highlights the spans of a line.
+
+        Args:
+            line (str): the line.
+            spans (list): the spans to highlight.
+            start (str): the string to insert in front of every span.
+            end (str): the string to insert after every span.
+
+        Returns:
+            The highlighted line.
+        """
+        parts = []
+        previous = 0
+        for first, last in spans:
+            parts.extend([line[previous:first], start, line[first:last], end])
+            previous = last
+        parts.append(line[previous:])
+        return ''.join(parts)
@@ -200,8 +200,10 @@ class Frame:
         """Updates the default list view."""
         LOGGER.debug('Re-populating the viewport with the list command.')
         self.buffer.clear()
-        labels = ListCommand().execute(STATE.list_args, out=self.buffer)
-        labels = labels or []  # convert to empty list if labels is None
+        page = ListCommand().page(STATE.list_args)
+        _, lines, total = page or ([], [], 0)  # the page is None for invalid arguments
+        for line in lines:
+            self.buffer.write(line)
         # populate buffer with the list
         if STATE.mode != Mode.LIST.value:
             STATE.current_line = STATE.previous_line
@@ -220,7 +222,7 @@ class Frame:
         # display buffer in viewport
         self.view(ansi_map=self.tui.ANSI_MAP)
         # update top statusbar
-        STATE.topstatus = "CoBib v{} - {} Entries".format(__version__, len(labels))
+        STATE.topstatus = "CoBib v{} - {} Entries".format(__version__, total)
         self.tui.statusbar(self.tui.topbar, STATE.topstatus)
         # if cursor position is out-of-view (due to e.g. top-line reset in Show command), reset the
         # top-line such that the current line becomes height again
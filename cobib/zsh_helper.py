@@ -5,7 +5,7 @@ import os
 
 from cobib import commands
 from cobib.config import config
-from cobib.database import read_database
+from cobib.database import field_index, read_database
 
 
 def list_commands():
@@ -23,10 +23,7 @@ def list_tags():
 def list_filters():
     """Lists all field names available for filtering."""
     read_database()
-    filters = set()
-    for entry in config.bibliography.values():
-        filters.update(entry.data.keys())
-    return filters
+    return set(field_index().fields())
 
 
 def example_config():
@@ -26,9 +26,12 @@ setup(
     author_email='rmax@ethz.ch',
     platforms=['any'],
     packages=['cobib'],
-    package_data={'cobib': ['commands/*', 'config/*', 'tui/*']},
+    package_data={'cobib': ['commands/*', 'config/*', 'database/*', 'tui/*']},
     python_requires='>=3.5',
     install_requires=REQUIREMENTS,
+    extras_require={
+        'pdf': ['pypdf'],
+    },
     entry_points={
         'console_scripts': [
             'cobib = cobib.__main__:main'
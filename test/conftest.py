@@ -0,0 +1,17 @@
+"""Shared fixtures of CoBib's tests."""
+
+import pytest
+from cobib.config import config
+
+
+@pytest.fixture(autouse=True)
+def cache_directory(tmp_path_factory):
+    """Keeps the caches of every test in a temporary directory.
+
+    Otherwise, the tests would write into the cache directory of the user (see
+    `config.database.cache`). Since the fixtures of the tests reset the configuration to its
+    defaults when cleaning up, the directory is configured anew before every test.
+    """
+    config.database.cache = str(tmp_path_factory.mktemp('cache'))
+    yield
+    config.database.cache = str(tmp_path_factory.getbasetemp() / 'cache')
@@ -6,6 +6,7 @@ import os
 import re
 import subprocess
 import sys
+from collections import OrderedDict
 from datetime import datetime
 from io import StringIO
 from itertools import zip_longest
@@ -13,9 +14,11 @@ from pathlib import Path
 from shutil import rmtree
 
 import pytest
+import requests
 from cobib import commands
 from cobib.config import config
-from cobib.database import read_database
+from cobib.database import SqliteBackend, read_database
+from cobib.parser import Entry
 
 
 def assert_git_commit_message(command, args):
@@ -120,8 +123,13 @@ def test_init(init_setup, safe):
 @pytest.mark.parametrize(['args', 'expected'], [
         [[], ['einstein', 'latexcompanion', 'knuthwebsite']],
         [['-r'], ['knuthwebsite', 'latexcompanion', 'einstein']],
-        [['-s', 'year'], ['einstein', 'knuthwebsite', 'latexcompanion']],
-        [['-r', '-s', 'year'], ['latexcompanion', 'knuthwebsite', 'einstein']],
+        [['-s', 'year'], ['knuthwebsite', 'einstein', 'latexcompanion']],
+        [['-r', '-s', 'year'], ['latexcompanion', 'einstein', 'knuthwebsite']],
+        [['--limit', '2'], ['einstein', 'latexcompanion']],
+        [['--offset', '1'], ['latexcompanion', 'knuthwebsite']],
+        [['-r', '--offset', '1', '--limit', '1'], ['latexcompanion']],
+        [['-s', 'year', '--limit', '2'], ['knuthwebsite', 'einstein']],
+        [['-r', '-s', 'year', '--offset', '1', '--limit', '5'], ['einstein', 'knuthwebsite']],
     ])
 def test_list(setup, args, expected):
     """Test list command.
@@ -163,6 +171,79 @@ def test_list_with_missing_keys(setup):
         assert line.split()[0] in expected
 
 
+@pytest.mark.parametrize(['args', 'expected'], [
+        [['-i', '++author', 'KNUTH'], ['knuthwebsite']],
+        [['-e', '++year', '^19'], ['einstein', 'latexcompanion']],
+        [['-e', '-i', '--title', '^the'], ['einstein', 'knuthwebsite']],
+        [['-x', '++year', '1905', '++ENTRYTYPE', 'misc'], ['einstein', 'knuthwebsite']],
+        [['++year=1905'], ['einstein']],
+    ])
+def test_list_filter_modes(setup, args, expected):
+    """Test the filter modes of the list command.
+
+    Args:
+        setup: runs pytest fixture.
+        args: arguments for the list command call.
+        expected: expected result.
+    """
+    assert commands.ListCommand().execute(args, out=StringIO()) == expected
+    assert commands.ListCommand().select(args) == expected
+
+
+def test_list_page(setup):
+    """Test formatting a single page of the list.
+
+    Args:
+        setup: runs pytest fixture.
+    """
+    labels, lines, total = commands.ListCommand().page(['-s', 'title'], offset=0, limit=1)
+    assert labels == ['knuthwebsite']
+    assert total == 3
+    # the column widths are determined by the entries on the page only
+    assert lines == ['knuthwebsite  Knuth: Computers and Typesetting']
+
+
+def test_list_stream(setup, monkeypatch):
+    """Test the streaming mode of the list command.
+
+    Args:
+        setup: runs pytest fixture.
+        monkeypatch: pytest fixture.
+    """
+    file = StringIO()
+    expected = commands.ListCommand().execute(['-s', 'year'], out=file)
+    streamed = StringIO()
+    assert commands.ListCommand().execute(['-s', 'year', '--stream'], out=streamed) == \
+        len(expected)
+    assert streamed.getvalue() == file.getvalue()
+    # unless the list is sorted, the entries are filtered one by one rather than by the field index
+    monkeypatch.setattr(commands.list, 'field_index', lambda: pytest.fail('built the field index'))
+    args = ['-r', '--offset', '1', '++ENTRYTYPE', 'book', '-x', '++year', '1905']
+    monkeypatch.setattr(commands.list, 'fields', lambda: {'ENTRYTYPE', 'year'})
+    streamed = StringIO()
+    assert commands.ListCommand().execute(args + ['--stream'], out=streamed) == 1
+    assert streamed.getvalue().startswith('einstein ')
+    monkeypatch.undo()
+    # the column widths are determined from the sampled entries only
+    monkeypatch.setattr(commands.ListCommand, 'STREAM_SAMPLE_SIZE', 1)
+    streamed = StringIO()
+    commands.ListCommand().execute(['--stream'], out=streamed)
+    lines = streamed.getvalue().splitlines()
+    assert lines[0].startswith('einstein  Zur')
+    assert lines[1].startswith('latexcompanion  The')
+
+
+def test_list_unknown_filter(setup):
+    """Test that filters of unknown fields are rejected.
+
+    Args:
+        setup: runs pytest fixture.
+    """
+    with pytest.raises(SystemExit):
+        commands.ListCommand().execute(['++unknown', 'value'], out=StringIO())
+    assert commands.ListCommand().execute(['++year'], out=StringIO()) is None
+
+
 def test_show(setup):
     """Test show command.
 
@@ -264,10 +345,25 @@ def test_add(database_setup):
                 'bibtex': bibtex,
                 'doi': None,
                 'isbn': None,
+                'yaml': None,
+                'bulk': None,
                 'tags': [],
             })
 
 
+def test_add_in_chunks(database_setup, monkeypatch):
+    """Test add command importing a BibLaTeX file in multiple chunks."""
+    monkeypatch.setattr(commands.AddCommand, 'CHUNK_SIZE', 2)
+    commands.AddCommand().execute(['-b', './test/example_literature.bib'])
+    # importing the same entries again does not add any duplicates
+    read_database()
+    commands.AddCommand().execute(['-b', './test/example_literature.bib'])
+    with open('/tmp/cobib_test/database.yaml', 'r') as file:
+        with open('./test/example_literature.yaml', 'r') as expected:
+            for line, truth in zip_longest(file, expected):
+                assert line == truth
+
+
 def test_add_overwrite_label(database_setup):
     """Test add command while specifying a label manually.
 
@@ -288,6 +384,52 @@ def test_add_overwrite_label(database_setup):
             assert line == truth
 
 
+def test_add_bulk(database_setup, monkeypatch, capsys):
+    """Test add command fetching many identifiers concurrently."""
+    def fetch(kind):
+        def from_identifier(identifier):
+            if identifier == '10.1000/fail':
+                raise requests.exceptions.ConnectionError('unreachable')
+            label = re.sub(r'\W', '_', f'{kind}_{identifier}')
+            return OrderedDict([(label, Entry(label, {'ENTRYTYPE': 'misc', 'ID': label}))])
+        return from_identifier
+    for kind in ('arxiv', 'doi', 'isbn'):
+        monkeypatch.setattr(Entry, f'from_{kind}', fetch(kind))
+    monkeypatch.setattr(sys, 'stdin', StringIO('\n'.join([
+        '# a comment',
+        '10.1021/acs.chemrev.8b00803',
+        '',
+        '1812.09976',
+        'hep-th/9901001v2',
+        '3860704443',
+        'arXiv:1812.09976',
+        'isbn:978-3-16-148410-0',
+        '10.1000/fail',
+        'unknown',
+    ])))
+    commands.AddCommand().execute(['--bulk', '-'])
+    read_database()
+    assert list(config.bibliography.keys()) == [
+        'doi_10_1021_acs_chemrev_8b00803',
+        'arxiv_1812_09976',
+        'arxiv_hep_th_9901001v2',
+        'isbn_3860704443',
+        'isbn_978_3_16_148410_0',
+    ]
+    stdout, stderr = capsys.readouterr()
+    assert "'isbn_978_3_16_148410_0' was added to the database." in stdout
+    assert "The entries of the doi '10.1000/fail' could not be fetched: unreachable" in stderr
+    assert "'unknown' is neither a DOI, nor an arXiv ID, nor an ISBN." in stderr
+
+
+def test_add_bulk_with_label(database_setup, capsys):
+    """Test add command refusing a label when adding entries in bulk."""
+    commands.AddCommand().execute(['--bulk', './test/example_literature.bib', '-l', 'dummy'])
+    assert 'cannot be specified' in capsys.readouterr().err
+    read_database()
+    assert not config.bibliography
+
+
 @pytest.mark.parametrize(['labels'], [
         [['knuthwebsite']],
         [['knuthwebsite', 'latexcompanion']],
@@ -313,11 +455,12 @@ def test_delete(database_setup, labels):
         assert_git_commit_message('delete', {'labels': labels})
 
 
-@pytest.mark.parametrize(['modification', 'filters', 'selection'], [
-        ['tags:test', ['einstein'], True],
-        ['tags:test', ['++ID', 'einstein'], False],
+@pytest.mark.parametrize(['modification', 'filters', 'selection', 'append'], [
+        ['tags:test', ['einstein'], True, False],
+        ['tags:test', ['++ID', 'einstein'], False, False],
+        ['tags:test', ['einstein'], True, True],
     ])
-def test_modify(database_setup, modification, filters, selection, append=False):
+def test_modify(database_setup, modification, filters, selection, append):
     """Test modify command."""
     git = database_setup
     # NOTE: again, we depend on AddCommand to work.
@@ -339,6 +482,23 @@ def test_modify(database_setup, modification, filters, selection, append=False):
                                              'filter': filters})
 
 
+def test_modify_append(database_setup):
+    """Test the append mode of the modify command."""
+    commands.AddCommand().execute(['-b', './test/example_literature.bib'])
+    read_database()
+    commands.ModifyCommand().execute(['tags:first', '-s', '--', 'einstein', 'latexcompanion'])
+    commands.ModifyCommand().execute(['-a', 'tags:second', '-s', '--', 'einstein'])
+    commands.ModifyCommand().execute(['-a', 'note:some', '-s', '--', 'einstein'])
+    commands.ModifyCommand().execute(['-a', 'note:text', '-s', '--', 'einstein'])
+    assert config.bibliography['einstein'].data['tags'] == 'first, second'
+    assert config.bibliography['einstein'].data['note'] == 'some text'
+    assert config.bibliography['latexcompanion'].data['tags'] == 'first'
+    # the database file must contain the same data
+    read_database()
+    assert config.bibliography['einstein'].data['tags'] == 'first, second'
+    assert config.bibliography['latexcompanion'].data['tags'] == 'first'
+
+
 # TODO: figure out some very crude and basic way of testing this
 def test_edit():
     """Test edit command."""
@@ -415,6 +575,49 @@ def test_export(setup):
     os.remove('/tmp/cobib_test_export.bib')
 
 
+def test_export_yaml(database_setup):
+    """Test exporting the database to YAML and importing it again."""
+    commands.AddCommand().execute(['-b', './test/example_literature.bib'])
+    read_database()
+    commands.ExportCommand().execute(['-y', '/tmp/cobib_test_export.yaml'])
+    with open('/tmp/cobib_test_export.yaml', 'r') as file:
+        with open('./test/example_literature.yaml', 'r') as expected:
+            for line, truth in zip_longest(file, expected):
+                assert line == truth
+    # import the exported entries into a new database
+    config.database.backend = 'sqlite'
+    config.database.file = '/tmp/cobib_test/database.sqlite'
+    Path(config.database.file).touch()
+    read_database()
+    commands.AddCommand().execute(['-y', '/tmp/cobib_test_export.yaml'])
+    read_database()
+    assert list(config.bibliography.keys()) == ['einstein', 'latexcompanion', 'knuthwebsite']
+    # clean up file system
+    os.remove('/tmp/cobib_test_export.yaml')
+    os.remove('/tmp/cobib_test/database.sqlite')
+
+
+def test_list_sqlite(database_setup, monkeypatch):
+    """Test that list and export only read the matching entries of an SQLite database."""
+    config.database.backend = 'sqlite'
+    config.database.file = '/tmp/cobib_test/database.sqlite'
+    Path(config.database.file).touch()
+    read_database()
+    commands.AddCommand().execute(['-y', './test/example_literature.yaml'])
+    monkeypatch.setattr(SqliteBackend, 'read', lambda *args: pytest.fail('read the database'))
+    del config.bibliography
+    assert commands.ListCommand().execute(['++author', 'Knuth'], out=StringIO()) == \
+        ['knuthwebsite']
+    assert list(config.bibliography) == ['knuthwebsite']
+    del config.bibliography
+    commands.ExportCommand().execute(['-b', '/tmp/cobib_test_export.bib', '-s', '--', 'einstein'])
+    with open('/tmp/cobib_test_export.bib', 'r') as file:
+        assert file.read().startswith('@article{einstein,')
+    # clean up file system
+    os.remove('/tmp/cobib_test_export.bib')
+    os.remove('/tmp/cobib_test/database.sqlite')
+
+
 def test_export_selection(setup):
     """Test the `selection` interface of the export command.
 
@@ -479,3 +682,29 @@ def test_search(setup, args, expected, config_overwrite):
             assert exp in line
         if line and not (line.endswith('match') or line.endswith('matches')):
             assert re.match(r'\[[0-9]+\]', line)
+
+
+def test_search_ranked(setup, tmp_path):
+    """Test the ranked and fuzzy modes of the search command."""
+    config.database.cache = str(tmp_path)
+    file = StringIO()
+    hits, labels = commands.SearchCommand().execute(['knuth companion', '--rank', '-c', '0'],
+                                                    out=file)
+    assert labels == ['knuthwebsite', 'latexcompanion']
+    assert hits == 5
+    titles = [re.sub(r'\x1b\[[0-9;]+m', '', line) for line in file.getvalue().split('\n')
+              if line and not line.startswith('[')]
+    assert [re.sub(r'score \S+', 'score', title) for title in titles] == [
+        'knuthwebsite - 3 matches - score', 'latexcompanion - 2 matches - score'
+    ]
+    scores = [float(title.rsplit(' ', 1)[1]) for title in titles]
+    assert scores[0] != scores[1]
+    # the scores are omitted if they are all equal
+    file = StringIO()
+    commands.SearchCommand().execute(['knuth', '--rank', '-c', '0'], out=file)
+    assert 'score' not in file.getvalue()
+    _, labels = commands.SearchCommand().execute(['knuth companion', '--rank', '-k', '1'],
+                                                 out=StringIO())
+    assert labels == ['knuthwebsite']
+    _, labels = commands.SearchCommand().execute(['compagnion', '--fuzzy'], out=StringIO())
+    assert labels == ['latexcompanion']
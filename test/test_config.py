@@ -55,13 +55,25 @@ def test_base_config(setup):
 
 
 @pytest.mark.parametrize(['sections', 'field'], [
+        [['commands', 'add'], 'rate_limit'],
+        [['commands', 'add'], 'retries'],
+        [['commands', 'add'], 'workers'],
         [['commands', 'edit'], 'default_entry_type'],
         [['commands', 'open'], 'command'],
+        [['commands', 'search'], 'backend'],
+        [['commands', 'search'], 'extraction_cache_size'],
+        [['commands', 'search'], 'extractor'],
         [['commands', 'search'], 'grep'],
         [['commands', 'search'], 'ignore_case'],
+        [['commands', 'search'], 'workers'],
+        [['database'], 'backend'],
+        [['database'], 'cache'],
         [['database'], 'file'],
         [['database'], 'git'],
+        [['database'], 'lock'],
         [['database', 'format'], 'month'],
+        [['database', 'parallel'], 'processes'],
+        [['database', 'parallel'], 'threshold'],
         [['parsers', 'bibtex'], 'ignore_non_standard_types'],
         [['tui'], 'default_list_args'],
         [['tui'], 'prompt_before_quit'],
@@ -0,0 +1,585 @@
+"""Tests for CoBib's database module."""
+# pylint: disable=unused-argument, redefined-outer-name, protected-access
+
+from collections import OrderedDict
+import contextlib
+from importlib import import_module
+import os
+from pathlib import Path
+import re
+from shutil import copyfile, rmtree
+import sqlite3
+
+import pytest
+from cobib import database
+from cobib.database import yaml_backend
+from cobib.database.field_index import sort_key
+from cobib.config import config
+from cobib.filter import Filter
+from cobib.parser import Entry
+from cobib.search import Query
+
+TMP_DIR = '/tmp/cobib_test_database'
+
+
+@pytest.fixture
+def setup():
+    """Setup."""
+    os.makedirs(TMP_DIR, exist_ok=True)
+    copyfile('./test/example_literature.yaml', TMP_DIR + '/database.yaml')
+    config.database.file = TMP_DIR + '/database.yaml'
+    config.database.cache = TMP_DIR + '/cache/'
+    # start without any previously read database
+    yaml_backend._INDEX.update(file=None, key=None, documents=[])
+    yield setup
+    # clean up file system
+    rmtree(TMP_DIR)
+    # clean up config
+    config.defaults()
+    try:
+        del config.bibliography
+    except KeyError:
+        pass
+
+
+def fail(*args, **kwargs):
+    """Replaces a function in order to assert that it is not called."""
+    raise AssertionError('This function should not have been called!')
+
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """Records the YAML strings which are parsed by Entry.from_yaml."""
+    strings = []
+    original = Entry.from_yaml
+
+    def recording_from_yaml(file, string=False):
+        strings.append(file)
+        return original(file, string=string)
+
+    monkeypatch.setattr(Entry, 'from_yaml', recording_from_yaml)
+    yield strings
+
+
+def test_read_database(setup):
+    """Test reading the database."""
+    database.read_database()
+    assert list(config.bibliography.keys()) == ['einstein', 'latexcompanion', 'knuthwebsite']
+
+
+def test_snapshot(setup, monkeypatch):
+    """Test that the snapshot is stored and used on the next read."""
+    database.read_database()
+    assert os.path.exists(database.cache_file(config.database.file, "pickle"))
+    reference = {label: entry.data for label, entry in config.bibliography.items()}
+    yaml_backend._INDEX.update(file=None, key=None, documents=[])
+    monkeypatch.setattr(Entry, 'from_yaml', fail)
+    database.read_database()
+    assert {label: entry.data for label, entry in config.bibliography.items()} == reference
+
+
+def test_snapshot_touched(setup, monkeypatch):
+    """Test that the snapshot remains valid if only the modification time changed."""
+    database.read_database()
+    stat = os.stat(config.database.file)
+    os.utime(config.database.file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    yaml_backend._INDEX.update(file=None, key=None, documents=[])
+    monkeypatch.setattr(Entry, 'from_yaml', fail)
+    database.read_database()
+    assert 'einstein' in config.bibliography.keys()
+
+
+def test_snapshot_invalidation(setup):
+    """Test that the snapshot is invalidated when the database changes."""
+    database.read_database()
+    with open(config.database.file, 'a') as file:
+        with open('./test/example_duplicate_entry.yaml', 'r') as extra:
+            file.write(extra.read())
+    database.read_database()
+    assert 'duplicate_resolver' in config.bibliography.keys()
+
+
+def test_snapshot_disabled(setup):
+    """Test that no snapshot is written when the cache is disabled."""
+    config.database.cache = None
+    database.read_database()
+    assert not os.path.exists(TMP_DIR + '/cache/')
+
+
+def test_incremental_read(setup, parsed):
+    """Test that reading the database again only parses the changed documents."""
+    database.read_database()
+    einstein = config.bibliography['einstein']
+    with open(config.database.file, 'r') as file:
+        contents = file.read()
+    with open(config.database.file, 'w') as file:
+        file.write(contents.replace('The \\LaTeX\\ Companion', 'The Companion'))
+    parsed.clear()
+    database.read_database()
+    assert len(parsed) == 1
+    assert config.bibliography['einstein'] is einstein
+    assert config.bibliography['latexcompanion'].data['title'] == 'The Companion'
+    assert list(config.bibliography.keys()) == ['einstein', 'latexcompanion', 'knuthwebsite']
+
+
+def test_read_outdated_snapshot(setup, parsed):
+    """Test that an outdated snapshot still provides the unchanged entries."""
+    database.read_database()
+    with open(config.database.file, 'a') as file:
+        with open('./test/example_duplicate_entry.yaml', 'r') as extra:
+            file.write(extra.read())
+    yaml_backend._INDEX.update(file=None, key=None, documents=[])
+    parsed.clear()
+    database.read_database()
+    assert len(parsed) == 1
+    assert list(config.bibliography.keys()) == ['einstein', 'latexcompanion', 'knuthwebsite',
+                                                'duplicate_resolver']
+
+
+def test_split_documents():
+    """Test splitting the database contents into its documents."""
+    data = b'---\na:\n  ID: a\n...\n---\nb:\n  ID: b\n...\n'
+    assert yaml_backend._split_documents(data) == [(0, 19), (19, 38)]
+    # unterminated documents can not be indexed
+    assert yaml_backend._split_documents(b'---\na:\n  ID: a\n---\nb:\n  ID: b\n...\n') is None
+
+
+def test_locate(setup):
+    """Test locating the YAML document of an entry."""
+    database.read_database()
+    start, end = database.locate('latexcompanion')
+    with open(config.database.file, 'rb') as file:
+        document = file.read()[start:end]
+    assert document.startswith(b'---\nlatexcompanion:\n')
+    assert document.endswith(b'...\n')
+    assert database.locate('unknown') is None
+
+
+def test_locate_with_stored_index(setup, parsed):
+    """Test that the stored index is used when the index in memory is missing."""
+    database.read_database()
+    yaml_backend._INDEX.update(file=None, key=None, documents=[])
+    parsed.clear()
+    assert database.locate('knuthwebsite') is not None
+    assert not parsed
+
+
+def test_transaction(setup, monkeypatch):
+    """Test replacing, removing and appending documents of the database file."""
+    database.read_database()
+    entry = config.bibliography['latexcompanion']
+    entry.data['title'] = 'The Companion'
+    with open('./test/example_duplicate_entry.yaml', 'r') as extra:
+        appended = extra.read()
+    with database.Transaction() as transaction:
+        transaction.remove('einstein')
+        transaction.replace('latexcompanion', entry.to_yaml())
+        transaction.remove('unknown')
+        transaction.append('duplicate_resolver', appended)
+    assert transaction.changed == ['einstein', 'latexcompanion']
+
+    # the index is updated without having to read the database file again
+    monkeypatch.setattr(yaml_backend.YamlBackend, 'read', fail)
+    with open(config.database.file, 'rb') as file:
+        contents = file.read()
+    start, end = database.locate('latexcompanion')
+    assert contents[start:end] == entry.to_yaml().encode('utf-8')
+    start, end = database.locate('knuthwebsite')
+    assert contents[start:end].startswith(b'---\nknuthwebsite:\n')
+    start, end = database.locate('duplicate_resolver')
+    assert contents[start:end] == appended.encode('utf-8')
+    assert end == len(contents)
+    assert database.locate('einstein') is None
+
+
+@pytest.mark.parametrize(['remove'], [[True], [False]])
+def test_duplicate_label(setup, remove):
+    """Test changing an entry whose label is defined by several documents of the database file."""
+    with open(config.database.file, 'a') as file:
+        file.write('---\neinstein:\n  ENTRYTYPE: misc\n  ID: einstein\n  title: Duplicate\n...\n')
+    database.read_database()
+    assert config.bibliography['einstein'].data['title'] == 'Duplicate'
+    start, _ = database.locate('einstein')
+    with open(config.database.file, 'rb') as file:
+        assert file.read()[start:].startswith(b'---\neinstein:\n  ENTRYTYPE: misc\n')
+    with database.Transaction() as transaction:
+        if remove:
+            transaction.remove('einstein')
+        else:
+            transaction.replace('einstein',
+                                '---\neinstein:\n  ENTRYTYPE: misc\n  ID: einstein\n...\n')
+    assert transaction.changed == ['einstein']
+    with open(config.database.file, 'r') as file:
+        # every document of the label is removed or replaced by a single one
+        assert file.read().count('einstein:') == (0 if remove else 1)
+    database.read_database()
+    assert ('einstein' in config.bibliography) is not remove
+
+
+def test_index_stored_at_exit(setup, monkeypatch):
+    """Test that committing transactions only stores the index of the database file at exit."""
+    database.read_database()
+    stored = []
+    monkeypatch.setattr(yaml_backend, '_store_index', stored.append)
+    monkeypatch.setitem(yaml_backend._INDEX_CHANGED, 'registered', False)
+    monkeypatch.setattr(yaml_backend.atexit, 'register', lambda func: None)
+    for label in ('first', 'second'):
+        with database.Transaction() as transaction:
+            transaction.append(label, f'---\n{label}:\n  ENTRYTYPE: misc\n...\n')
+    assert not stored
+    yaml_backend._store_pending_index()
+    assert stored == [config.database.file]
+    assert database.locate('second') is not None
+
+
+@pytest.mark.parametrize(['untidy'], [
+        [lambda data: data.replace(b'\n', b'\r\n')],
+        [lambda data: data[len(b'---\n'):]],
+    ])
+def test_transaction_untidy_file(setup, untidy):
+    """Test changing a database file with CRLF line endings or missing document delimiters."""
+    with open(config.database.file, 'rb') as file:
+        data = untidy(file.read())
+    with open(config.database.file, 'wb') as file:
+        file.write(data)
+    database.read_database()
+    entry = config.bibliography['latexcompanion']
+    entry.data['title'] = 'The Companion'
+    with database.Transaction() as transaction:
+        transaction.remove('einstein')
+        transaction.replace('latexcompanion', entry.to_yaml())
+    assert transaction.changed == ['einstein', 'latexcompanion']
+    database.read_database()
+    assert 'einstein' not in config.bibliography
+    assert config.bibliography['latexcompanion'].data['title'] == 'The Companion'
+    assert 'knuthwebsite' in config.bibliography
+
+
+def test_transaction_discarded(setup):
+    """Test that a transaction is discarded when an exception occurs."""
+    database.read_database()
+    with open(config.database.file, 'rb') as file:
+        reference = file.read()
+    with pytest.raises(RuntimeError):
+        with database.Transaction() as transaction:
+            transaction.remove('einstein')
+            raise RuntimeError
+    with open(config.database.file, 'rb') as file:
+        assert file.read() == reference
+
+
+def test_transaction_permissions(setup):
+    """Test that the database file keeps its permissions when it is replaced."""
+    os.chmod(config.database.file, 0o640)
+    database.read_database()
+    with database.Transaction() as transaction:
+        transaction.remove('einstein')
+    assert os.stat(config.database.file).st_mode & 0o777 == 0o640
+    # no temporary files are left behind
+    assert sorted(os.listdir(TMP_DIR)) == ['cache', 'database.yaml']
+
+
+def test_parallel_read(setup):
+    """Test parsing the database in multiple processes."""
+    database.read_database()
+    reference = {label: dict(entry.data) for label, entry in config.bibliography.items()}
+    config.database.cache = None
+    config.database.parallel.processes = 2
+    config.database.parallel.threshold = 1
+    yaml_backend._INDEX.update(file=None, key=None, documents=[])
+    database.read_database()
+    assert {label: dict(entry.data) for label, entry in config.bibliography.items()} == reference
+    assert list(config.bibliography.keys()) == list(reference.keys())
+    assert database.locate('knuthwebsite') is not None
+
+
+@pytest.fixture
+def sqlite_setup(setup):
+    """Setup of an empty SQLite database."""
+    config.database.backend = 'sqlite'
+    config.database.file = TMP_DIR + '/database.sqlite'
+    Path(config.database.file).touch()
+    database.read_database()
+    yield sqlite_setup
+
+
+def test_sqlite_backend(sqlite_setup):
+    """Test writing to and reading from the SQLite backend."""
+    entries = Entry.from_yaml('./test/example_literature.yaml')
+    assert database.write_database(entries) == ['einstein', 'latexcompanion', 'knuthwebsite']
+    database.read_database()
+    assert list(config.bibliography.keys()) == ['einstein', 'latexcompanion', 'knuthwebsite']
+    assert config.bibliography['einstein'].data == entries['einstein'].data
+
+
+def test_sqlite_transaction(sqlite_setup):
+    """Test replacing and removing entries of the SQLite backend."""
+    database.write_database(Entry.from_yaml('./test/example_literature.yaml'))
+    database.read_database()
+    entry = config.bibliography['einstein']
+    entry.data['title'] = 'Relativity'
+    with database.Transaction() as transaction:
+        transaction.replace('einstein', entry.to_yaml())
+        transaction.remove('latexcompanion')
+        transaction.remove('unknown')
+    assert transaction.changed == ['einstein', 'latexcompanion']
+    database.read_database()
+    # the replaced entry keeps its position
+    assert list(config.bibliography.keys()) == ['einstein', 'knuthwebsite']
+    assert config.bibliography['einstein'].data['title'] == 'Relativity'
+
+
+def test_sqlite_lookup(sqlite_setup, monkeypatch):
+    """Test looking up single entries of the SQLite backend."""
+    database.write_database(Entry.from_yaml('./test/example_literature.yaml'))
+    backend = database.SqliteBackend()
+    assert backend.get(config.database.file, 'knuthwebsite').data['ENTRYTYPE'] == 'misc'
+    assert backend.get(config.database.file, 'unknown') is None
+    # the database does not need to be read in order to look up an entry
+    del config.bibliography
+    monkeypatch.setattr(database.SqliteBackend, 'read', fail)
+    assert database.lookup('einstein').data['year'] == '1905'
+    assert database.lookup('unknown') is None
+
+
+@pytest.mark.parametrize(['_filter', '_or'], [
+    [{}, False],
+    [{('author', True): ['Knuth', 'Einstein']}, False],
+    [{('author', True): ['Knuth', 'Einstein']}, True],
+    [{('ENTRYTYPE', True): ['book'], ('year', False): ['1905']}, True],
+    [{('tags', True): ['physics']}, False],
+    [{('tags', True): ['phys']}, False],
+    [{('month', True): ['aug']}, False],
+    [{('unknown', True): ['value']}, True],
+])
+def test_sqlite_select(sqlite_setup, monkeypatch, _filter, _or):
+    """Test filtering the entries of the SQLite backend without reading the entire database."""
+    entries = Entry.from_yaml('./test/example_literature.yaml')
+    entries['einstein'].data['tags'] = ['physics', 'relativity']
+    entries['einstein'].data['month'] = 'aug'
+    database.write_database(entries)
+    database.read_database()
+    expected = {label for label, entry in config.bibliography.items()
+                if entry.matches(_filter, _or)}
+    assert database.fields() == database.SqliteBackend().fields(config.database.file)
+    del config.bibliography
+    monkeypatch.setattr(database.SqliteBackend, 'read', fail)
+    assert database.select(Filter(_filter, _or)) == expected
+    # only the matching entries are read
+    assert set(config.bibliography) == expected
+
+
+def test_sqlite_fields_upgrade(sqlite_setup):
+    """Test that the fields of a database without a fields index are indexed when connecting."""
+    database.write_database(Entry.from_yaml('./test/example_literature.yaml'))
+    with contextlib.closing(sqlite3.connect(config.database.file)) as conn:
+        conn.execute('DELETE FROM fields')
+        conn.execute('PRAGMA user_version = 0')
+        conn.commit()
+    del config.bibliography
+    assert database.select(Filter({('author', True): ['Knuth']})) == {'knuthwebsite'}
+
+
+@pytest.mark.parametrize(['_filter', '_or'], [
+    [{}, False],
+    [{}, True],
+    [{('year', True): ['1905']}, False],
+    [{('year', False): ['1905']}, False],
+    [{('author', True): ['Knuth', 'Einstein']}, False],
+    [{('author', True): ['Knuth', 'Einstein']}, True],
+    [{('ENTRYTYPE', True): ['book'], ('year', False): ['1905']}, True],
+    [{('publisher', False): ['Addison']}, False],
+    [{('unknown', True): ['value']}, True],
+])
+def test_field_index(setup, _filter, _or):
+    """Test that the field index selects the same entries as `Entry.matches`."""
+    database.read_database()
+    expected = {label for label, entry in config.bibliography.items()
+                if entry.matches(_filter, _or)}
+    assert database.field_index().select(Filter(_filter, _or)) == expected
+
+
+def test_field_index_refresh(setup):
+    """Test that the field index is updated when the bibliography changes."""
+    database.read_database()
+    index = database.field_index()
+    assert index.select(Filter({('year', True): ['2020']})) == set()
+    config.bibliography['einstein'].data['year'] = '2020'
+    assert database.field_index().select(Filter({('year', True): ['2020']})) == {'einstein'}
+    # a newly read bibliography is indexed again
+    with open(config.database.file, 'a') as file:
+        with open('./test/example_duplicate_entry.yaml', 'r') as extra:
+            file.write(extra.read())
+    database.read_database()
+    assert database.field_index().select(Filter({('author', True): ['Knuth']})) == \
+        {'knuthwebsite', 'duplicate_resolver'}
+    # an entry which is replaced by a lazy one is indexed again
+    data = dict(config.bibliography['einstein'].data, year='2021')
+    config.bibliography['einstein'] = Entry('einstein', data, lazy=True)
+    assert database.field_index().select(Filter({('year', True): ['2021']})) == {'einstein'}
+
+
+@pytest.mark.parametrize(['_filter'], [
+    [{('tags', True): ['physics']}],
+    [{('tags', True): ['phys']}],
+    [{('tags', True): ['quantum physics']}],
+    [{('title', True): ['Compan']}],
+    [{('title', True): ['The LaTeX']}],
+    [{('author', False): ['Knuth']}],
+])
+def test_field_index_tokens(setup, _filter):
+    """Test that looking up the items and words of the values selects the same entries."""
+    database.read_database()
+    config.bibliography['einstein'].data['tags'] = ['physics', 'quantum physics']
+    config.bibliography['latexcompanion'].data['tags'] = 'astrophysics'
+    config.bibliography['knuthwebsite'].data['tags'] = ['phys']
+    expected = {label for label, entry in config.bibliography.items() if Filter(_filter)(entry)}
+    assert database.field_index().select(Filter(_filter)) == expected
+    # removing the entries from the index removes their items and words, too
+    del config.bibliography['einstein'].data['tags']
+    config.bibliography['latexcompanion'].data['title'] = 'Unrelated'
+    index = database.field_index()
+    assert 'physics' not in index._items['tags']
+    assert 'Companion' not in index._words['title']
+
+
+def test_field_index_fields(setup):
+    """Test that the field index keeps track of the available fields."""
+    database.read_database()
+    assert 'publisher' in database.field_index().fields()
+    del config.bibliography['latexcompanion'].data['publisher']
+    assert 'publisher' not in database.field_index().fields()
+    config.bibliography['einstein'].data['tags'] = 'physics'
+    assert 'tags' in database.field_index().fields()
+
+
+@pytest.mark.parametrize(['field', 'values'], [
+    ['year', [None, '999', '1905', '2020', 'forthcoming']],
+    ['month', [None, 'jan', '2', 'mar', 'December']],
+    ['ID', [None, 'Author2', 'author10', 'Author10b']],
+    ['title', [None, 'a title', '{B}ook', 'The Companion']],
+])
+def test_sort_key(field, values):
+    """Test that the sort keys order the values of a field as intended."""
+    keys = [sort_key(field, value) for value in values]
+    assert keys == sorted(keys)
+
+
+def test_field_index_sorted(setup):
+    """Test that the sort index is kept up-to-date and keeps the order of the database for ties."""
+    database.read_database()
+    index = database.field_index()
+    assert list(index.sorted('year')) == ['knuthwebsite', 'einstein', 'latexcompanion']
+    assert list(index.sorted('year', reverse=True)) == ['latexcompanion', 'einstein',
+                                                        'knuthwebsite']
+    config.bibliography['latexcompanion'].data['year'] = '1905'
+    index = database.field_index()
+    assert list(index.sorted('year')) == ['knuthwebsite', 'einstein', 'latexcompanion']
+    assert list(index.sorted('year', reverse=True)) == ['einstein', 'latexcompanion',
+                                                        'knuthwebsite']
+    # a changed order of the database is picked up as well
+    config.bibliography = OrderedDict((label, config.bibliography[label])
+                                      for label in ['latexcompanion', 'knuthwebsite', 'einstein'])
+    config.bibliography['knuthwebsite'].data['year'] = '2000'
+    index = database.field_index()
+    assert list(index.sorted('year')) == ['latexcompanion', 'einstein', 'knuthwebsite']
+
+
+def test_text_index(setup, monkeypatch):
+    """Test that the full-text index narrows down the candidates of a search query."""
+    database.read_database()
+    database.text_index()
+    assert os.path.exists(TMP_DIR + '/cache/')
+    # the entries are not compared again as long as the database file is unchanged
+    monkeypatch.setattr(database.TextIndex, '_update_entries', fail)
+    index = database.TextIndex()
+    index.refresh(config.bibliography)
+    assert index.candidates(Query('Einstein')) == {'einstein'}
+    assert index.candidates(Query('EINSTEIN')) == set()
+    assert index.candidates(Query('EINSTEIN', ignore_case=True)) == {'einstein'}
+    assert index.candidates(Query('(Ein)+stein, [A-Z]')) == set()
+    # queries without sufficiently long literals cannot be answered by the index
+    assert index.candidates(Query('Einstein|Knuth')) is None
+    assert index.candidates(Query('a?b')) is None
+    assert index.candidates(Query('(?i)EINSTEIN')) is None
+
+
+@pytest.mark.parametrize(['pattern', 'literals'], [
+    [r'Ein(st)?ein\.[a-z]+, Albert{2}', [', Albert', 'Ein', 'ein.']],
+    ['(Ein)+stein, [A-Z]', ['Ein', 'stein, ']],
+    ['Einst?ein', ['Eins', 'ein']],
+    [r'\(?Knuth[]|)]*\|', ['Knuth']],
+    ['Einstein|Knuth', []],
+    ['(?i)EINSTEIN', []],
+])
+def test_text_index_literals(pattern, literals):
+    """Test that only literals which every match contains are extracted from a query."""
+    _literals = import_module('cobib.database.text_index')._literals
+    assert _literals(re.compile(pattern)) == literals
+
+
+def test_text_index_refresh(setup):
+    """Test that the full-text index is updated when the entries or their files change."""
+    database.read_database()
+    assert database.text_index().candidates(Query('Relativity')) == set()
+    config.bibliography['einstein'].data['note'] = 'Relativity'
+    assert database.text_index().candidates(Query('Relativity')) == {'einstein'}
+    with open(TMP_DIR + '/notes.txt', 'w') as file:
+        file.write('Some notes on the theory of relativity.\n')
+    config.bibliography['knuthwebsite'].data['file'] = TMP_DIR + '/notes.txt'
+    assert database.text_index().candidates(Query('theory of')) == {'knuthwebsite'}
+    with open(TMP_DIR + '/notes.txt', 'w') as file:
+        file.write('Some other notes.\n')
+    assert database.text_index().candidates(Query('theory of')) == set()
+    # binary files cannot be indexed and always need to be searched
+    with open(TMP_DIR + '/notes.txt', 'wb') as file:
+        file.write(b'\0theory of relativity')
+    assert database.text_index().candidates(Query('Knuth')) == {'knuthwebsite'}
+    assert database.text_index().candidates(Query('Einstein')) == {'einstein', 'knuthwebsite'}
+
+
+def test_text_index_month_format(setup):
+    """Test that the full-text index is updated when the format of the month changes."""
+    with open(config.database.file, 'r') as file:
+        data = file.read().replace("  year: '1905'\n", "  month: aug\n  year: '1905'\n", 1)
+    with open(config.database.file, 'w') as file:
+        file.write(data)
+    config.database.format.month = int
+    database.read_database()
+    assert database.text_index().candidates(Query('aug')) == set()
+    # another process reads the database with another format of the month
+    config.database.format.month = str
+    database.read_database()
+    index = database.TextIndex()
+    index.refresh(config.bibliography)
+    assert index.candidates(Query('aug')) == {'einstein'}
+
+
+def test_text_index_rank(setup):
+    """Test ranking the entries by their relevance for a text query."""
+    database.read_database()
+    index = database.text_index()
+    ranked, words = index.rank('Knuth companion')
+    assert words == ['companion', 'knuth']
+    assert [label for label, _ in ranked] == ['knuthwebsite', 'latexcompanion']
+    assert ranked[0][1] > ranked[1][1] > 0
+    assert [label for label, _ in index.rank('Knuth companion', top=1)[0]] == ['knuthwebsite']
+    assert [label for label, _ in index.rank('Knuth companion', labels={'latexcompanion'})[0]] == \
+        ['latexcompanion']
+    # diacritics and LaTeX markup are ignored
+    assert [label for label, _ in index.rank('körper')[0]] == ['einstein']
+    # typos are tolerated in the fuzzy mode only
+    assert index.rank('elektrodinamik')[0] == []
+    ranked, words = index.rank('elektrodinamik', fuzzy=True)
+    assert words == ['elektrodynamik']
+    assert [label for label, _ in ranked] == ['einstein']
+    # a single edit is tolerated even if few trigrams are shared
+    for typo in ('einstien', 'einsten'):
+        ranked, words = index.rank(typo, fuzzy=True)
+        assert 'einstein' in words
+        assert [label for label, _ in ranked] == ['einstein']
+    # the similar words are updated with the index
+    config.bibliography['knuthwebsite'].data['note'] = 'Elektrodynamics'
+    ranked, words = database.text_index().rank('elektrodinamik', fuzzy=True)
+    assert words == ['elektrodynamics', 'elektrodynamik']
+    assert {label for label, _ in ranked} == {'einstein', 'knuthwebsite'}
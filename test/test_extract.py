@@ -0,0 +1,123 @@
+"""Tests for CoBib's extract module."""
+# pylint: disable=unused-argument, redefined-outer-name, protected-access
+
+import os
+import zlib
+import pytest
+from cobib import extract
+from cobib.config import config
+from cobib.parser import Entry
+from cobib.search import Query
+
+CONTENT = (b'BT /F1 12 Tf 72 720 Td (Zur Elektrodynamik) Tj 0 -14 Td '
+           b'[(bewegter) -250 (K\\366) 20 (rper)] TJ /F2 12 Tf 0 -14 Td <0002000300010004> Tj ET')
+CMAP = (b'begincmap 1 beginbfchar <0001> <00FC> endbfchar '
+        b'1 beginbfrange <0002> <0004> <0061> endbfrange endcmap')
+
+
+def write_pdf(file, content=CONTENT):
+    """Writes a minimal PDF file with a compressed content stream and two fonts."""
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /Resources << /Font << /F1 5 0 R /F2 6 0 R >> >> '
+        b'/Contents 4 0 R >>',
+        b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(zlib.compress(content))
+        + zlib.compress(content) + b'\nendstream',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+        b'<< /Type /Font /Subtype /Type0 /ToUnicode 7 0 R >>',
+        b'<< /Length %d >>\nstream\n' % len(CMAP) + CMAP + b'\nendstream',
+    ]
+    with open(file, 'wb') as pdf:
+        pdf.write(b'%PDF-1.4\n')
+        offsets = []
+        for idx, obj in enumerate(objects):
+            offsets.append(pdf.tell())
+            pdf.write(b'%d 0 obj\n' % (idx + 1) + obj + b'\nendobj\n')
+        xref = pdf.tell()
+        pdf.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+        pdf.write(b''.join(b'%010d 00000 n \n' % offset for offset in offsets))
+        pdf.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+                  % (len(objects) + 1, xref))
+
+
+@pytest.fixture
+def setup(tmp_path):
+    """Setup."""
+    config.database.cache = str(tmp_path / 'cache')
+    yield tmp_path
+    config.defaults()
+
+
+def test_pdf_to_text(setup):
+    """Test extracting the text of a PDF file."""
+    write_pdf(setup / 'paper.pdf')
+    assert extract.pdf_to_text(str(setup / 'paper.pdf')) == \
+        'Zur Elektrodynamik\nbewegter Körper\nabüc'
+
+
+def test_pypdf_to_text(setup):
+    """Test extracting the text of a PDF file by means of the optional pypdf package."""
+    pytest.importorskip('pypdf')
+    write_pdf(setup / 'paper.pdf')
+    assert 'Zur Elektrodynamik' in extract.pypdf_to_text(str(setup / 'paper.pdf'))
+
+
+def test_extract_text_cache(setup):
+    """Test that extracted texts are cached until the file changes."""
+    calls = []
+    config.commands.search.extractor = lambda file: calls.append(file) or 'text'
+    file = str(setup / 'paper.pdf')
+    write_pdf(file)
+    assert extract.extract_text(file) == 'text'
+    assert extract.extract_text(file) == 'text'
+    assert calls == [file]
+    write_pdf(file, content=b'BT (Changed) Tj ET')
+    assert extract.extract_text(file) == 'text'
+    assert calls == [file, file]
+
+
+def test_extract_text_eviction(setup):
+    """Test that the least recently used texts are evicted from the cache."""
+    config.commands.search.extractor = lambda file: 'x' * 100
+
+    def cache_file(file):
+        return extract._cache_file(file, os.stat(file), config.commands.search.extractor)
+
+    config.commands.search.extraction_cache_size = 250
+    files = [str(setup / f'paper{idx}.pdf') for idx in range(3)]
+    for idx, file in enumerate(files):
+        write_pdf(file)
+        extract.extract_text(file)
+        # ensure distinct modification times of the cached texts
+        os.utime(cache_file(file), ns=(idx, idx))
+    extract.extract_text(files[0])
+    cached = {file for file in files if os.path.exists(cache_file(file))}
+    assert cached == {files[0], files[2]}
+
+
+def test_extract_text_extractor(setup):
+    """Test that the texts of different extractors are cached separately."""
+    file = str(setup / 'paper.pdf')
+    write_pdf(file)
+    config.commands.search.extractor = extract.pdf_to_text
+    assert extract.extract_text(file).startswith('Zur Elektrodynamik')
+    config.commands.search.extractor = lambda file: 'other'
+    assert extract.extract_text(file) == 'other'
+
+
+def test_pdf_to_text_limit(setup, monkeypatch):
+    """Test that streams are not decompressed beyond the size limit."""
+    write_pdf(setup / 'paper.pdf', content=CONTENT + b' ' * 1000)
+    monkeypatch.setattr(extract, 'MAX_DECODED_SIZE', 500)
+    assert extract.pdf_to_text(str(setup / 'paper.pdf')) == ''
+
+
+def test_search_pdf(setup):
+    """Test that the builtin search backend searches the extracted text of PDF files."""
+    config.commands.search.extractor = extract.pdf_to_text
+    write_pdf(setup / 'paper.pdf')
+    entry = Entry('einstein', {'ENTRYTYPE': 'article', 'ID': 'einstein',
+                               'file': str(setup / 'paper.pdf')})
+    assert Query('Körper').search(entry) == [[('Zur Elektrodynamik', []),
+                                               ('bewegter Körper', [(9, 15)]), ('abüc', [])]]
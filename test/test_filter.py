@@ -0,0 +1,41 @@
+"""Tests for CoBib's filter module."""
+
+import re
+import pytest
+from cobib.filter import Filter
+from cobib.parser import Entry
+
+EXAMPLE_ENTRY = Entry('Cao_2019', {
+    'ENTRYTYPE': 'article',
+    'ID': 'Cao_2019',
+    'author': 'Yudong Cao and Jonathan Romero',
+    'tags': ['quantum', 'chemistry'],
+    'title': 'Quantum Chemistry in the Age of Quantum Computing',
+    'year': '2019',
+})
+
+
+@pytest.mark.parametrize(['_filter', 'kwargs', 'expected'], [
+    [{('title', True): ['Quantum']}, {}, True],
+    [{('title', True): ['quantum']}, {}, False],
+    [{('title', True): ['quantum']}, {'ignore_case': True}, True],
+    [{('title', False): ['quantum']}, {'ignore_case': True}, False],
+    [{('year', True): [r'^20\d\d$']}, {'regex': True}, True],
+    [{('year', True): [r'^19\d\d$']}, {'regex': True}, False],
+    [{('author', True): ['^yudong']}, {'regex': True, 'ignore_case': True}, True],
+    [{('tags', True): ['quantum']}, {}, True],
+    [{('tags', True): ['quant']}, {}, False],
+    [{('title', True): ['Age'], ('year', True): ['2020']}, {}, False],
+    [{('title', True): ['Age'], ('year', True): ['2020']}, {'_or': True}, True],
+    [{}, {}, True],
+    [{}, {'_or': True}, False],
+])
+def test_filter(_filter, kwargs, expected):
+    """Test compiled filters."""
+    assert Filter(_filter, **kwargs)(EXAMPLE_ENTRY) == expected
+
+
+def test_filter_invalid_regex():
+    """Test that invalid regular expressions are rejected upon compilation."""
+    with pytest.raises(re.error):
+        Filter({('title', True): ['(']}, regex=True)
@@ -1,8 +1,13 @@
 """Tests for CoBib's parsing module."""
 
+import io
 from os import path
 from pathlib import Path
+import pickle
+import re
+import bibtexparser
 import pytest
+import requests
 from cobib import parser
 from cobib.config import config
 
@@ -102,7 +107,32 @@ def test_match_with_wrong_key():
 
 def test_to_bibtex():
     """Test to bibtex conversion."""
-    pytest.skip("Testing this string is too ambigious. Assumed to be tested by bibtexparser.")
+    entry = parser.Entry(EXAMPLE_ENTRY_DICT['ID'], EXAMPLE_ENTRY_DICT)
+    database = bibtexparser.bibdatabase.BibDatabase()
+    database.entries = [dict(entry.data)]
+    assert entry.to_bibtex() == bibtexparser.dumps(database)
+
+
+def test_to_bibtex_cache():
+    """Test that the cached bibtex string is invalidated when the entry changes."""
+    entry = parser.Entry(EXAMPLE_ENTRY_DICT['ID'], EXAMPLE_ENTRY_DICT)
+    assert entry.to_bibtex() is entry.to_bibtex()
+    entry.data['title'] = 'Another Title'
+    assert ' title = {Another Title},' in entry.to_bibtex()
+    entry.set_tags = ['foo']
+    assert ' tags = {foo},' in entry.to_bibtex()
+    del entry.data['tags']
+    assert 'tags' not in entry.to_bibtex()
+
+
+def test_to_bibtex_many():
+    """Test the conversion of many entries at once."""
+    entries = parser.Entry.from_yaml('test/example_literature.yaml').values()
+    database = bibtexparser.bibdatabase.BibDatabase()
+    database.entries = [dict(entry.data) for entry in entries]
+    writer = bibtexparser.bwriter.BibTexWriter()
+    writer.order_entries_by = None
+    assert parser.to_bibtex_many(entries) == bibtexparser.dumps(database, writer)
 
 
 def test_to_yaml():
@@ -113,6 +143,34 @@ def test_to_yaml():
         assert yaml_str == file.read()
 
 
+def test_to_yaml_cache():
+    """Test that the cached YAML document is invalidated when the entry changes."""
+    entry = parser.Entry(EXAMPLE_ENTRY_DICT['ID'], EXAMPLE_ENTRY_DICT)
+    assert entry.to_yaml() is entry.to_yaml()
+    entry.data['title'] = 'Another Title'
+    assert '  title: Another Title\n' in entry.to_yaml()
+
+
+def test_to_yaml_many():
+    """Test the conversion of many entries at once."""
+    entries = list(parser.Entry.from_yaml('test/example_literature.yaml').values())
+    reference = [parser.Entry(entry.label, dict(entry.data)).to_yaml() for entry in entries]
+    entries[0].to_yaml()
+    assert parser.to_yaml_many(entries) == reference
+    with open('test/example_literature.yaml', 'r') as file:
+        assert ''.join(reference) == file.read()
+
+
+def test_to_yaml_many_unsplittable(monkeypatch):
+    """Test that the entries are dumped one by one if the stream can not be split."""
+    entries = list(parser.Entry.from_yaml('test/example_literature.yaml').values())
+    reference = [parser.Entry(entry.label, dict(entry.data)).to_yaml() for entry in entries]
+    # the greedy pattern matches the entire stream as a single document
+    monkeypatch.setattr(parser, 'YAML_DOCUMENT_REGEX',
+                        re.compile(r'^---\n.*^\.\.\.\n', re.MULTILINE | re.DOTALL))
+    assert parser.to_yaml_many(entries) == reference
+
+
 @pytest.mark.parametrize('month_type', [int, str])
 def test_parser_from_bibtex_as_str(month_type):
     """Test parsing a bibtex string.
@@ -152,6 +210,29 @@ def test_parser_from_bibtex_as_file(month_type):
         assert entry.data == reference
 
 
+def test_parser_stream_bibtex():
+    """Test parsing a bibtex file in chunks."""
+    root = path.abspath(path.dirname(__file__))
+    config.load(Path(root + '/debug.py'))
+    with open('test/example_literature.bib', 'r') as bibtex_file:
+        reference = parser.Entry.from_bibtex(bibtex_file, string=False)
+    with open('test/example_literature.bib', 'r') as bibtex_file:
+        chunks = list(parser.stream_bibtex(bibtex_file, chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    entries = [entry for chunk in chunks for entry in chunk.values()]
+    assert [entry.data for entry in entries] == [entry.data for entry in reference.values()]
+
+
+def test_stream_bibtex_strings():
+    """Test that string definitions are available in all subsequent chunks."""
+    bibtex = io.StringIO('@string{acs = "American Chemical Society"}\n'
+                         '@article{a,\n author = {A},\n publisher = acs\n}\n'
+                         '@article{b,\n author = {B},\n publisher = acs\n}\n')
+    chunks = list(parser.stream_bibtex(bibtex, chunk_size=1))
+    assert [list(chunk.keys()) for chunk in chunks] == [['a'], ['b']]
+    assert chunks[1]['b'].data['publisher'] == 'American Chemical Society'
+
+
 @pytest.mark.parametrize('month_type', [int, str])
 def test_parser_from_yaml_as_file(month_type):
     """Test parsing a yaml file.
@@ -252,6 +333,44 @@ def test_parser_from_arxiv_invalid():
     assert entries == {}
 
 
+def test_rate_limiter(monkeypatch):
+    """Test that the rate limiter spaces the requests per host."""
+    now = [0.0]
+    delays = []
+    monkeypatch.setattr(parser.time, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(parser.time, 'sleep', delays.append)
+    limiter = parser.RateLimiter()
+    for _ in range(3):
+        limiter.wait('https://export.arxiv.org/abs/1812.09976', rate=4)
+    limiter.wait('https://doi.org/10.1021/acs.chemrev.8b00803', rate=4)
+    assert delays == [0.25, 0.5]
+
+
+def test_http_get_failure(monkeypatch, capsys):
+    """Test that failed requests are reported rather than raised by the fetchers."""
+    root = path.abspath(path.dirname(__file__))
+    config.load(Path(root + '/debug.py'))
+    config.commands.add.rate_limit = None
+    # the exhausted retries return the last response instead of raising a RetryError
+    session = parser._http_session(2, 1)  # pylint: disable=protected-access
+    adapter = session.get_adapter('https://doi.org')
+    assert adapter.max_retries.raise_on_status is False
+    response = requests.models.Response()
+    response.status_code = 503
+    monkeypatch.setattr(requests.Session, 'get', lambda *args, **kwargs: response)
+    with pytest.raises(requests.exceptions.HTTPError):
+        parser.http_get('https://doi.org/10.1021/acs.chemrev.8b00803')
+    assert parser.Entry.from_doi('10.1021/acs.chemrev.8b00803') == {}
+    assert parser.Entry.from_isbn('978-1-449-35573-9') == {}
+
+    def fail(*args, **kwargs):
+        raise requests.exceptions.RetryError('Max retries exceeded')
+
+    monkeypatch.setattr(requests.Session, 'get', fail)
+    assert parser.Entry.from_arxiv('1812.09976') == {}
+    assert capsys.readouterr().err.count('could not be reached') == 3
+
+
 @pytest.mark.parametrize('month_type', [int, str])
 def test_escape_special_chars(month_type):
     """Test escaping special characters.
@@ -284,3 +403,50 @@ def test_unchanged_umlaut_in_label():
         entries = parser.Entry.from_bibtex(bibtex_file, string=False)
         entry = list(entries.values())[0]
         assert entry.data == reference
+
+
+def test_lazy_entry():
+    """Test that a lazy entry is only normalized upon accessing its data."""
+    root = path.abspath(path.dirname(__file__))
+    config.load(Path(root + '/debug.py'))
+    config.database.format.month = str
+    data = EXAMPLE_ENTRY_DICT.copy()
+    data['title'] = 'Quantum Chemistry in the Age of Quantum Cömputing'
+    entry = parser.Entry('Cao_2019', data, lazy=True)
+    assert entry._raw is data  # pylint: disable=protected-access
+    assert entry.data['title'] == 'Quantum Chemistry in the Age of Quantum C{\\"o}mputing'
+    assert entry.data['month'] == 'aug'
+    assert entry._raw is None  # pylint: disable=protected-access
+    # the original data is left untouched
+    assert data['month'] == '8'
+
+
+@pytest.mark.parametrize(['lazy'], [[True], [False]])
+def test_pickle_entry(lazy):
+    """Test that an entry survives a pickle round-trip.
+
+    Args:
+        lazy (bool): whether the entry is pickled before its data is normalized.
+    """
+    root = path.abspath(path.dirname(__file__))
+    config.load(Path(root + '/debug.py'))
+    config.database.format.month = str
+    entry = parser.Entry('Cao_2019', EXAMPLE_ENTRY_DICT.copy(), lazy=lazy)
+    assert pickle.loads(pickle.dumps(parser.EntryData({'a': '1'}))) == {'a': '1'}
+    copy = pickle.loads(pickle.dumps(entry))
+    assert copy.data == entry.data
+    assert copy.data['month'] == 'aug'
+    # the copy still tracks its modifications
+    bibtex = copy.to_bibtex()
+    copy.data['title'] = 'Modified'
+    assert copy.to_bibtex() != bibtex
+
+
+def test_escape_latex():
+    """Test the memoized escaping of special characters."""
+    parser.escape_latex.cache_clear()
+    assert parser.escape_latex('Einführung') == 'Einf{\\"u}hrung'
+    assert parser.escape_latex('Einführung') == 'Einf{\\"u}hrung'
+    assert parser.escape_latex.cache_info().hits == 1
+    assert parser.escape_latex('plain ASCII') == 'plain ASCII'
+    assert parser.latex_encoder(False) is parser.latex_encoder(False)
@@ -0,0 +1,102 @@
+"""Tests for CoBib's search module."""
+
+import re
+import pytest
+from cobib.config import config
+from cobib.parser import Entry
+from cobib.search import Query
+
+EXAMPLE_ENTRY = Entry('einstein', {
+    'ENTRYTYPE': 'article',
+    'ID': 'einstein',
+    'author': 'Albert Einstein',
+    'doi': 'http://dx.doi.org/10.1002/andp.19053221004',
+    'journal': 'Annalen der Physik',
+    'title': 'Zur Elektrodynamik bewegter K{\\"o}rper',
+    'year': '1905',
+})
+
+
+def test_query():
+    """Test searching an entry."""
+    matches = Query('Ein').search(EXAMPLE_ENTRY)
+    assert matches == [[('@article{einstein,', []),
+                        (' author = {Albert Einstein},', [(18, 21)]),
+                        (' doi = {http://dx.doi.org/10.1002/andp.19053221004},', [])]]
+
+
+def test_query_context():
+    """Test that the context of a match stops at the next match."""
+    matches = Query('einstein', ignore_case=True).search(EXAMPLE_ENTRY, context=2)
+    assert [[line for line, _ in match] for match in matches] == [
+        ['@article{einstein,'],
+        [' author = {Albert Einstein},', ' doi = {http://dx.doi.org/10.1002/andp.19053221004},',
+         ' journal = {Annalen der Physik},'],
+    ]
+    assert matches[0][0][1] == [(9, 17)]
+
+
+def test_query_same_as_lines():
+    """Test that the single-pass search finds the same lines as searching every line."""
+    # some matches of the entire text extend past the end of a line, e.g. `1905},\n}`
+    for query in ['e', '^ ', '}$', r'\d+', 'an', 'x*', r'\d+\W+', r'\W+', r'\s+']:
+        pattern = re.compile(query)
+        expected = [(line, [m.span() for m in pattern.finditer(line)])
+                    for line in EXAMPLE_ENTRY.to_bibtex().split('\n') if pattern.search(line)]
+        matches = Query(query).search(EXAMPLE_ENTRY, context=0)
+        assert [line for match in matches for line in match] == expected
+
+
+def test_query_invalid():
+    """Test that invalid queries are rejected upon compilation."""
+    with pytest.raises(re.error):
+        Query('(')
+
+
+@pytest.mark.parametrize('workers', [1, 3, None])
+def test_query_search_many(workers):
+    """Test that searching many entries in parallel preserves their order."""
+    entries = [Entry(f'entry{idx}', {'ENTRYTYPE': 'misc', 'ID': f'entry{idx}',
+                                     'note': 'match' if idx % 3 else 'none'}) for idx in range(50)]
+    query = Query('match')
+    results = list(query.search_many(entries, workers=workers))
+    assert [entry for entry, _ in results] == entries
+    assert [matches for _, matches in results] == [query.search(entry) for entry in entries]
+
+
+def test_highlight():
+    """Test highlighting the spans of a line."""
+    assert Query.highlight('abcabc', [(0, 1), (3, 4)], '<', '>') == '<a>bc<a>bc'
+    assert Query.highlight('abc', [], '<', '>') == 'abc'
+
+
+FILE_CONTENTS = '''Some notes
+--
+on the theory of relativity
+
+by Albert Einstein.
+Relativity -- the special and general theory
+a
+b
+theory
+'''
+
+
+@pytest.mark.parametrize('query', ['theory', 'Relativity', '--', '^[ab]$', 'x*', r'\.$'])
+@pytest.mark.parametrize('context', [0, 1, 2])
+def test_query_file(tmp_path, query, context):
+    """Test that the builtin file search finds the same matches as `grep`."""
+    file = tmp_path / 'notes.txt'
+    file.write_text(FILE_CONTENTS)
+    entry = Entry('notes', {'ENTRYTYPE': 'misc', 'ID': 'notes', 'file': str(file)})
+    try:
+        config.commands.search.backend = 'grep'
+        expected = Query(query).search(entry, context)
+        config.commands.search.backend = 'builtin'
+        assert Query(query).search(entry, context) == expected
+        # queries which cannot be compiled into a bytes pattern search the decoded file
+        query = Query(query)
+        query.bytes_pattern = None
+        assert query.search(entry, context) == expected
+    finally:
+        config.defaults()
@@ -224,7 +224,7 @@ def assert_select_show_view(screen, current):
             'current': 1, 'expected': ['knuthwebsite', 'einstein']}],
         ['syear\n', assert_list_view, {
             'current': 1, 'expected': [
-                'latexcompanion', 'knuthwebsite', 'einstein', 'dummy_entry_for_scroll_testing'
+                'latexcompanion', 'einstein', 'knuthwebsite', 'dummy_entry_for_scroll_testing'
             ]}],
         ['/einstein\njj', assert_search_view, {
             'label': 'einstein',